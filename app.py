@@ -1,6 +1,10 @@
+import os
+
 from dash import Dash
 from layout import app_layout
 from callbacks import register_callbacks
+import registry
+from dev import metrics
 
 external_stylesheets = [
     "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.3/css/all.min.css"
@@ -11,8 +15,30 @@ app = Dash(
     external_stylesheets=external_stylesheets
 )
 app.layout = app_layout
+# WSGI application for production servers: gunicorn app:server
+server = app.server
 
 register_callbacks(app)
 
+# Prometheus metrics on /metrics, unless NHL_METER_METRICS=0
+metrics.register_route(app.server)
+
+@app.server.route("/healthz")
+def healthz():
+    # the process is up and serving requests
+    return {"status": "ok"}
+
+@app.server.route("/readyz")
+def readyz():
+    # only send graph requests once they will not wait on loading data or models
+    if registry.ready():
+        return {"status": "ready"}
+    return {"status": "loading"}, 503
+
+# load data and models in the background, the layout renders without them
+# gunicorn.conf.py loads them itself, before forking the workers
+if os.environ.get("NHL_METER_PRELOAD") != "1":
+    registry.warm(background=True)
+
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0")
@@ -1,36 +1,79 @@
 import json
 import os
-
-os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"  # silence TensorFlow warnings
+import threading
+import time
+import uuid
 
 import numpy as np
-import pandas as pd
 import plotly.graph_objects as go
+from dash import no_update
 from dash.dependencies import Input, Output, State
-from keras.models import load_model
 
-from dev import meter
+import registry
+from dev import curves, live, meter, metrics
 from dev.graphing import gutils
 
-# Load data and models
-games = pd.read_parquet("data/games.parquet")
-slices = pd.read_parquet("data/time_slices.parquet")
-ot_pbp = pd.concat([
-    pd.read_parquet("data/regular_ot_pbp.parquet"),
-    pd.read_parquet("data/playoff_ot_pbp.parquet")
-])
-one_hot_columns = json.load(open("dev/models/one_hot_columns.json", 'r'))
-model_regulation = load_model("dev/models/meter_lstm16d2.keras")
-model_overtime = load_model("dev/models/meter_ot_lstm16d1.keras")
+# data and models load on first use, see registry.py
+teams = registry.teams()
+
+# game seconds replayed per second in live mode
+replay_speed = float(os.environ.get("NHL_METER_REPLAY_SPEED", 60))
+
+# read from the figure cache when scraped, zero until the first graph is drawn
+metrics.Gauge("nhl_meter_figure_cache_hit_ratio", "Fraction of figure cache lookups served from memory or disk.",
+              lambda: registry.figure_cache_store().stats()["hit_rate"] if registry.figure_cache_store.loaded() else 0)
+metrics.Gauge("nhl_meter_figure_cache_bytes", "Size of the figures held in memory.",
+              lambda: registry.figure_cache_store().stats()["bytes"] if registry.figure_cache_store.loaded() else 0)
+
+# live replays in this process by browser tab, as the game selection, its session following its own feed,
+# and the lock its polls take turns on
+live_sessions = {}
+# last poll of each tab's replay, replays of tabs closed without turning them off are dropped after `live_timeout` seconds
+live_polled = {}
+live_timeout = 60
+# held only to read and change the two dicts, never while loading plays or running the models
+live_lock = threading.Lock()
+
+def drop_stale_sessions(now: float):
+    # called holding live_lock
+    for client_id in [client_id for client_id, polled in live_polled.items() if now - polled > live_timeout]:
+        live_sessions.pop(client_id, None)
+        live_polled.pop(client_id, None)
+
+def team_colors(home: str, away: str) -> tuple[tuple[str, str], tuple[str, str]]:
+    """Full names and colors of both teams, ensuring the colors are different."""
+    idx = 0
+    home_name_color = gutils.team_name_color(home, idx)
+    away_name_color = gutils.team_name_color(away, idx)
+    while away_name_color[1] == home_name_color[1]:
+        idx += 1
+        away_name_color = gutils.team_name_color(away, idx)
 
-teams = games["Home_Team"].unique()
-teams.sort()
+    return home_name_color, away_name_color
+
+def start_live_session(game: int, season: int, feed: live.Feed | None = None) -> live.LiveSession:
+    """Follow a game's feed, by default replaying the game from the reduced play-by-play as if it were in progress."""
+    game_data = registry.games_index().get(game, season).iloc[0]
+    # starting Elo is only in the time slices and their exported features
+    store = registry.feature_store()
+    if store is not None and (game, season) in store:
+        elo = dict(zip(store.columns, store.regulation(game, season)[0].tolist()))
+    else:
+        elo = registry.slices().get(game, season).iloc[0]
+
+    live_game = live.LiveGame(
+        game_data["Home_Team"], game_data["Away_Team"], elo["away_elo"], elo["home_elo"], game_data["Playoff"],
+        registry.model_regulation(), registry.model_overtime(), registry.one_hot_columns()
+    )
+    feed = feed or live.ReplayFeed.from_parquet("data/pbp_reduced.parquet", game, season, replay_speed)
+    return live.LiveSession(live_game, feed)
 
 def register_callbacks(app):
     @app.callback(
         Output("away-dropdown", "options"),
         [Input("home-dropdown", "value")]
     )
+    @metrics.instrument_callback("update_away_dropdown")
     def update_away_dropdown(home):
         indices = np.where(teams == home)
         return np.delete(teams, indices)
@@ -43,6 +86,7 @@ def register_callbacks(app):
         State("away-dropdown", "value"),
         prevent_initial_call=True
     )
+    @metrics.instrument_callback("switch_home_away")
     def switch_home_away(n_clicks, home, away):
         return away, home
 
@@ -51,7 +95,9 @@ def register_callbacks(app):
         [Input("home-dropdown", "value"),
         Input("away-dropdown", "value")]
     )
+    @metrics.instrument_callback("update_game_dropdown")
     def update_game_dropdown(home, away):
+        games = registry.games()
         mask = (games["Home_Team"] == home) & (games["Away_Team"] == away)
         games_reduced = games[mask]
 
@@ -66,6 +112,7 @@ def register_callbacks(app):
         Input("away-dropdown", "value"),
         Input("game-dropdown", "value")]
     )
+    @metrics.instrument_callback("update_figure")
     def update_figure(home, away, game_season):
         if not game_season:
             # prevent drawing incomplete dropdown selection
@@ -73,42 +120,133 @@ def register_callbacks(app):
 
         game, season = [int(x) for x in game_season.split('.')]
 
+        # serve figures already built for this game and model
+        with metrics.stage("update_figure", "cache_lookup"):
+            cache = registry.figure_cache_store()
+            key = cache.key(home, away, game, season, registry.curve_version())
+            cached = cache.get(key)
+        metrics.cache_requests.inc(cache="figure", result="miss" if cached is None else "hit")
+        if cached is not None:
+            with metrics.stage("update_figure", "serialization"):
+                return json.loads(cached)
+
         # find team full names and colors
-        idx = 0
-        home_name_color = gutils.team_name_color(home, idx)
-        away_name_color = gutils.team_name_color(away, idx)
-        while away_name_color[1] == home_name_color[1]:  # ensure colors are different
-            idx += 1
-            away_name_color = gutils.team_name_color(away, idx)
-
-        time_elapsed, probabilities = meter.predict_regulation(game, season, slices, model_regulation)
-        mask = (slices["game"] == game) & (slices["season"] == season)
-        scores = (slices[mask]["home_score"], slices[mask]["away_score"])
-
-        # handle overtime games
-        mask = (games["Game_Id"] == game) & (games["Season"] == season)
-        game_data = games[mask].iloc[0]
-        if game_data["Period"] > 3:
-            time_elapsed_ot, probabilities_ot = meter.predict_overtime(game, season, ot_pbp, model_overtime, one_hot_columns)
-
-            # remove last data point of regulation to prevent overlap
-            time_elapsed = pd.concat([time_elapsed[:-1], time_elapsed_ot])
-            probabilities = np.concatenate((probabilities[:-1], probabilities_ot))
-
-            # extend scores and convert to numpy arrays
-            length = len(probabilities_ot) - 2  # one data point each removed from end of regulation and overtime
-            scores = (
-                np.concatenate([scores[0].values, np.full(length, scores[0].iloc[-1]), [game_data["Home_Score"]]]),
-                np.concatenate([scores[1].values, np.full(length, scores[1].iloc[-1]), [game_data["Away_Score"]]])
+        home_name_color, away_name_color = team_colors(home, away)
+
+        with metrics.stage("update_figure", "index_lookup"):
+            curve = curves.lookup_curve(registry.curve_store(), game, season)
+        metrics.cache_requests.inc(cache="curve", result="miss" if curve is None else "hit")
+        store = registry.feature_store()
+        if curve is None and store is not None and (game, season) in store:
+            # run the models on the memory-mapped features shared by every worker
+            curve = meter.predict_game_features(
+                game, season, registry.games_index(), store, registry.batched_regulation(), registry.batched_overtime()
             )
+        elif curve is None:
+            # not precomputed, run the models
+            curve = meter.predict_game(
+                game, season, registry.games_index(), registry.slices(), registry.ot_pbp(),
+                registry.batched_regulation(), registry.batched_overtime(), registry.one_hot_columns()
+            )
+        time_elapsed, probabilities, scores = curve
+
+        with metrics.stage("update_figure", "figure_build"):
+            fig = gutils.graph_probabilities_plotly(
+                time_elapsed,
+                probabilities,
+                scores,
+                home_name_color,
+                away_name_color,
+            )
+            fig.update_layout(height=800)
+
+        # serialize once for the cache, and return the same plain dict a cache hit does
+        with metrics.stage("update_figure", "serialization"):
+            figure = fig.to_json()
+            cache.put(key, figure)
+            return json.loads(figure)
+
+    @app.callback(
+        Output("client-id", "data"),
+        Input("page-load", "pathname"),
+        State("client-id", "data")
+    )
+    @metrics.instrument_callback("assign_client_id")
+    def assign_client_id(pathname, client_id):
+        # kept for the life of the tab, so reloading the page finds its replay
+        return client_id or uuid.uuid4().hex
+
+    @app.callback(
+        Output("live-interval", "disabled"),
+        [Input("live-switch", "value"),
+        Input("game-dropdown", "value")],
+        State("client-id", "data")
+    )
+    @metrics.instrument_callback("toggle_live")
+    def toggle_live(live_value, game_season, client_id):
+        with live_lock:
+            drop_stale_sessions(time.monotonic())
+            current = live_sessions.get(client_id)
+            if live_value and game_season and client_id and current is not None and current[0] == game_season:
+                return False
+            # replaces the replay of the previously selected game
+            live_sessions.pop(client_id, None)
+            live_polled.pop(client_id, None)
+        if not live_value or not game_season or not client_id:
+            return True
+
+        # reading the plays and loading the models does not hold up other tabs
+        game, season = [int(x) for x in game_season.split('.')]
+        try:
+            session = start_live_session(game, season)
+        except FileNotFoundError:
+            # the reduced play-by-play is only written by the data pipeline
+            return True
 
-        fig = gutils.graph_probabilities_plotly(
-            time_elapsed,
-            probabilities,
-            scores,
-            home_name_color,
-            away_name_color,
-        )
-        fig.update_layout(height=800)
+        with live_lock:
+            live_sessions[client_id] = (game_season, session, threading.Lock())
+            live_polled[client_id] = time.monotonic()
+        return False
 
-        return fig
+    @app.callback(
+        [Output("probability-graph", "figure", allow_duplicate=True),
+        Output("live-interval", "disabled", allow_duplicate=True)],
+        Input("live-interval", "n_intervals"),
+        State("home-dropdown", "value"),
+        State("away-dropdown", "value"),
+        State("game-dropdown", "value"),
+        State("client-id", "data"),
+        prevent_initial_call=True
+    )
+    @metrics.instrument_callback("update_live_figure")
+    def update_live_figure(n_intervals, home, away, game_season, client_id):
+        with live_lock:
+            now = time.monotonic()
+            drop_stale_sessions(now)
+            game_session, session, session_lock = live_sessions.get(client_id, (None, None, None))
+            if session is None or game_session != game_season:
+                # without sticky sessions, another worker started this tab's replay
+                return no_update, True
+            live_polled[client_id] = now
+
+        # polls of one tab take turns on its session, other tabs run their models alongside
+        with session_lock:
+            # only the plays since the last poll reach the models
+            with metrics.stage("update_live_figure", "model_inference"):
+                new = session.update()
+            curve = session.game.curve()
+
+        if session.finished:
+            with live_lock:
+                # unless the tab has already moved on to another replay
+                if live_sessions.get(client_id, (None, None, None))[1] is session:
+                    live_sessions.pop(client_id)
+                    live_polled.pop(client_id, None)
+
+        if not new and n_intervals > 1:
+            return no_update, session.finished
+
+        with metrics.stage("update_live_figure", "figure_build"):
+            fig = gutils.graph_probabilities_plotly(*curve, *team_colors(home, away))
+            fig.update_layout(height=800)
+        return fig, session.finished
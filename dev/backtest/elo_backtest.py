@@ -1,11 +1,34 @@
-import pandas as pd
-from dev.analysis.main import NHL_METER
-from elosports.elo import Elo
+from pathlib import Path
+
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from dev.backtest.main import NHL_METER
+from dev.data import elo
+
+data_path = Path(__file__).resolve().parent / '..' / '..' / 'data'
 
-df = pd.read_parquet('../data/game_elo.parquet')
+df = pd.read_parquet(data_path / 'game_elo.parquet')
 df["Home_Won"] = df["Home_Score"] > df["Away_Score"]
-df["Win_Prob"] = Elo.expectResult(Elo, df["Home_Starting_Elo"], df["Away_Starting_Elo"])
+df["Win_Prob"] = elo.expected_result(df["Home_Starting_Elo"], df["Away_Starting_Elo"])
+
+# score every K-factor and season regression in one pass, with the home ice advantage used by the ratings
+k, regression = elo.config_grid([5, 10, 15, 20, 25, 30, 40], [0, 1/4., 1/3., 1/2., 2/3.])
+away_elo, home_elo = elo.elo_sweep(df, k, regression)
+probability = elo.expected_result(home_elo + 100, away_elo)
+home_won = df["Home_Won"].to_numpy()[:, np.newaxis]
+
+eps = 1e-15
+clipped = np.clip(probability, eps, 1 - eps)
+configs = pd.DataFrame({
+    "K": k,
+    "Regression": regression,
+    "Brier": np.mean((probability - home_won) ** 2, axis=0),
+    "Log Loss": -np.mean(home_won * np.log(clipped) + (1 - home_won) * np.log(1 - clipped), axis=0),
+    "Accuracy": np.mean((probability > 0.5) == home_won, axis=0)
+}).sort_values("Log Loss")
+print(configs.to_string(index=False, float_format="{:.4f}".format))
 
 
 m = NHL_METER()
@@ -31,4 +54,4 @@ ax.scatter(x, y, color='red')
 ax.vlines(x, y, dy, color='black')
 plt.title("Binned Elo Win Probability Residuals")
 
-plt.show()
\ No newline at end of file
+plt.show()
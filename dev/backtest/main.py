@@ -1,6 +1,125 @@
 import pandas as pd
 import numpy as np
-import math
+
+# clip probabilities so that a confident miss has a large but finite log loss
+eps = 1e-15
+
+def calibration_bin(probability: np.ndarray, bins: int) -> np.ndarray:
+    """Index of each probability's equal width bin, with a probability of 1 in the last bin."""
+    return np.clip((np.asarray(probability, dtype=float) * bins).astype(int), 0, bins - 1)
+
+def time_bucket(time_elapsed: np.ndarray, bucket_seconds: int = 600) -> np.ndarray:
+    """Index of each time's part of regulation, with the end of regulation in the last part and every overtime after it."""
+    time_elapsed = np.asarray(time_elapsed, dtype=float)
+    overtime = 3600 // bucket_seconds
+    return np.where(time_elapsed > 3600, overtime, np.minimum(time_elapsed // bucket_seconds, overtime - 1)).astype(int)
+
+def ranked_probability(probability: np.ndarray, home_won: np.ndarray) -> float:
+    # half the squared error of the one cumulative category for a win or loss
+    return float(np.mean((probability - home_won) ** 2) / 2)
+
+class Backtest:
+    """Running sums for calibration and scoring rules, updated one chunk of predictions at a time.
+    Memory depends only on the number of seasons, time buckets, and bins, not on the predictions seen.
+
+    Args:
+        bins (int, optional): Equal width calibration bins. Defaults to 10.
+        bucket_seconds (int, optional): Length of each part of regulation in the breakdown by game time. Defaults to 600.
+    """
+    stats = ["count", "probability", "home_won", "squared_error", "log_loss", "correct"]
+
+    def __init__(self, bins: int = 10, bucket_seconds: int = 600):
+        self.bins = bins
+        self.bucket_seconds = bucket_seconds
+        self.buckets = 3600 // bucket_seconds + 1
+        # season: sums of each stat by time bucket and calibration bin
+        self.sums = {}
+
+    def update(self, probability: np.ndarray, home_won: np.ndarray, time_elapsed: np.ndarray, season: np.ndarray):
+        """Add a chunk of predictions.
+
+        Args:
+            probability (np.ndarray): home win probability
+            home_won (np.ndarray): 1 if the home team won the game, else 0
+            time_elapsed (np.ndarray): seconds since the start of the game
+            season (np.ndarray): NHL season
+        """
+        probability = np.asarray(probability, dtype=float)
+        home_won = np.asarray(home_won, dtype=float)
+        season = np.asarray(season)
+
+        clipped = np.clip(probability, eps, 1 - eps)
+        weights = [
+            None,
+            probability,
+            home_won,
+            (probability - home_won) ** 2,
+            -(home_won * np.log(clipped) + (1 - home_won) * np.log(1 - clipped)),
+            (probability > 0.5) == home_won
+        ]
+        cell = time_bucket(time_elapsed, self.bucket_seconds) * self.bins + calibration_bin(probability, self.bins)
+        cells = self.buckets * self.bins
+
+        seasons, codes = np.unique(season, return_inverse=True)
+        # one bincount per stat over (season, cell), instead of a filtered frame for each group
+        flat = codes * cells + cell
+        sums = np.stack([np.bincount(flat, weights, minlength=len(seasons) * cells) for weights in weights], axis=-1)
+        sums = sums.reshape(len(seasons), self.buckets, self.bins, len(self.stats))
+
+        for i, s in enumerate(seasons.tolist()):
+            self.sums[s] = self.sums.get(s, 0) + sums[i]
+
+    def totals(self, by: str | None = None) -> pd.DataFrame:
+        """Sums of each stat, by `season`, `time`, `bin`, or over everything."""
+        seasons = sorted(self.sums)
+        sums = np.stack([self.sums[s] for s in seasons]) if seasons else np.zeros((0, self.buckets, self.bins, len(self.stats)))
+
+        match by:
+            case None:
+                return pd.DataFrame([sums.sum(axis=(0, 1, 2))], columns=self.stats)
+            case "season":
+                return pd.DataFrame(sums.sum(axis=(1, 2)), columns=self.stats, index=pd.Index(seasons, name="season"))
+            case "time":
+                starts = np.arange(self.buckets - 1) * self.bucket_seconds // 60
+                names = [f"{start}-{start + self.bucket_seconds // 60}" for start in starts] + ["OT"]
+                return pd.DataFrame(sums.sum(axis=(0, 2)), columns=self.stats, index=pd.Index(names, name="time"))
+            case "bin":
+                return pd.DataFrame(sums.sum(axis=(0, 1)), columns=self.stats, index=pd.RangeIndex(self.bins, name="bin"))
+            case _:
+                raise ValueError(f"Cannot group by {by}, expected season, time, bin, or None")
+
+    def summary(self, by: str | None = None) -> pd.DataFrame:
+        """Brier score, log loss, ranked probability score, and accuracy.
+
+        Args:
+            by (str | None, optional): `season`, `time`, or None for every prediction. Defaults to None.
+
+        Returns:
+            pd.DataFrame: Predictions and each score, one row per group
+        """
+        totals = self.totals(by)
+        count = totals["count"].replace(0, np.nan)
+        brier = totals["squared_error"] / count
+
+        return pd.DataFrame({
+            "count": totals["count"].astype(int),
+            "brier": brier,
+            "log_loss": totals["log_loss"] / count,
+            "rps": brier / 2,
+            "accuracy": totals["correct"] / count
+        })
+
+    def calibration(self) -> pd.DataFrame:
+        """Mean predicted probability and the fraction of home wins in each bin, NaN for empty bins."""
+        totals = self.totals("bin")
+        count = totals["count"].replace(0, np.nan)
+
+        return pd.DataFrame({
+            "estimated": (np.arange(self.bins) + 0.5) / self.bins,
+            "predicted": totals["probability"] / count,
+            "actual": totals["home_won"] / count,
+            "count": totals["count"].astype(int)
+        })
 
 class NHL_METER:
     def __init__(self):
@@ -11,60 +130,51 @@ class NHL_METER:
 
     def get_pbp(self, game_id, season):
         return self.pbp[(self.pbp['Game_Id'] == game_id) & (self.pbp['Season'] == season)]
-    
+
     def add_won_column(self, games, pbp):
         pbp_w = pd.merge(pbp, games[["Season", "Game_Id", "Away_Score", "Home_Score"]], how='left', on=['Game_Id', 'Season'], suffixes = ["", "_Final"])
         pbp_w["Home_Won"] = pbp_w["Away_Score_Final"] < pbp_w["Home_Score_Final"]
         pbp_w.drop(columns=["Away_Score_Final", "Home_Score_Final"], inplace=True)
         return pbp_w
-    
+
     # create some random winprob for testing yknow
     def random_winprob(self, pbp):
         pbp["Win_Prob"] = np.random.rand(pbp.shape[0])
         return pbp
-    
+
     def bin_winprob(self, pbp, binCount=10):
-        bins = np.linspace(0, 1, binCount)
-        digitized = np.digitize(pbp["Win_Prob"], bins)
+        # home wins and plays in each equal width bin
+        digitized = calibration_bin(pbp["Win_Prob"].to_numpy(), binCount)
         pbp["bin"] = digitized
-        binned = []
-        for x in range(binCount):
-            binned.append(pbp[pbp["bin"] == x])
-        return binned
-    
+        wins = np.bincount(digitized, pbp["Home_Won"].to_numpy(dtype=float), minlength=binCount)
+        counts = np.bincount(digitized, minlength=binCount)
+        return wins, counts
+
     # returns [(actual, predicted)]
     # pass in result from bin_winprob
     def analyze_accuracy(self, binned, nans=False):
-        trueWin = []
-        for i, df in enumerate(binned):
-            winProp = df["Home_Won"].mean()
-            if (math.isnan(winProp) and not nans):
-                winProp = 0.0
-            est = (i + .5) / len(binned)
-            #print(f"Estimated: {est}, Actual: {winProp}")
-            trueWin.append((est, winProp))
-        return trueWin
-    
+        wins, counts = binned
+        with np.errstate(invalid="ignore", divide="ignore"):
+            winProp = wins / counts
+        if not nans:
+            winProp = np.nan_to_num(winProp)
+        est = (np.arange(len(counts)) + .5) / len(counts)
+        return list(zip(est.tolist(), winProp.tolist()))
+
     def accBins(self, data, bc=10):
         return self.analyze_accuracy(self.bin_winprob(data, bc), nans=True)
-    
+
     def least_squares(self, analyzed):
-        return sum([(x[0]-x[1])**2 for x in analyzed])
+        predicted, actual = np.array(analyzed).T
+        return np.sum((predicted - actual) ** 2)
 
     def log_loss(self, analyzed):
-        total = 0
-        for predicted, actual  in analyzed:
-            total += (actual * math.log(predicted) + (1 - actual) * math.log(1 - predicted))
-        res = -1 / len(analyzed)
-        return res * total
-    
+        predicted, actual = np.array(analyzed).T
+        return -np.mean(actual * np.log(predicted) + (1 - actual) * np.log(1 - predicted))
+
     def ranked_probability(self, data):
-        all_rps = []
-        for i, row in data.iterrows():
-            rps = 1/2 * (row["Win_Prob"] - row["Home_Won"])**2
-            all_rps.append(rps)
-        return sum(all_rps) / len(data)
-    
+        return ranked_probability(data["Win_Prob"].to_numpy(dtype=float), data["Home_Won"].to_numpy(dtype=float))
+
     def backtest(self, plays, loss_func):
         binned_plays = self.bin_winprob(plays, binCount=100)
         analyzed = self.analyze_accuracy(binned_plays)
@@ -1,32 +1,123 @@
-import pandas as pd
-from dev.analysis.main import NHL_METER
-from elosports.elo import Elo
+# Scores the win probability models on every time slice and overtime play, one season and chunk of games at a time
+# run from the project root: python -m dev.backtest.model_backtest --seasons 2007 2023 --backend numpy
+import argparse
+import json
+from pathlib import Path
+from typing import Iterator
+
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from dev import meter
+from dev.backtest.main import Backtest
+from dev.data import schema
+from dev.index import GameIndex
+
+def read_season(data_path: Path, season: int) -> tuple[GameIndex, GameIndex]:
+    """Only one season's time slices and overtime plays, read with parquet filters."""
+    filters = [("season", "==", season)]
+    slices = schema.compact(pd.read_parquet(data_path / "time_slices.parquet", filters=filters), "time_slices")
+    ot_pbp = schema.concat([
+        pd.read_parquet(data_path / "regular_ot_pbp.parquet", filters=filters),
+        pd.read_parquet(data_path / "playoff_ot_pbp.parquet", filters=filters)
+    ], "regular_ot_pbp")
+    return GameIndex(slices), GameIndex(ot_pbp)
+
+def predict_chunks(games: pd.DataFrame, slices: pd.DataFrame | GameIndex, ot_pbp: pd.DataFrame | GameIndex,
+                   model_regulation, model_overtime, one_hot_columns: list[str], chunk_size: int = 500) -> Iterator[pd.DataFrame]:
+    """Predict every data point of each game's win probability curve, `chunk_size` games per model pass.
+
+    Args:
+        games (pd.DataFrame): NHL game metadata
+        slices (pd.DataFrame | GameIndex): regulation time slice data
+        ot_pbp (pd.DataFrame | GameIndex): overtime play-by-play data
+        model_regulation (Model): keras Model for regulation
+        model_overtime (Model): keras Model for overtime
+        one_hot_columns (list[str]): one-hot encoding columns from training
+        chunk_size (int, optional): Games predicted per batch. Defaults to 500.
+
+    Yields:
+        pd.DataFrame: Season, time elapsed, probability, and whether the home team won, one row per data point
+    """
+    games_index = GameIndex(games, "Game_Id", "Season")
+    pairs = list(zip(games["Game_Id"].tolist(), games["Season"].tolist()))
+    home_won = (games["Home_Score"] > games["Away_Score"]).to_numpy()
+
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        curves = meter.predict_games(chunk, games_index, slices, ot_pbp, model_regulation, model_overtime, one_hot_columns)
+        lengths = [len(probabilities) for _, probabilities, _ in curves]
+
+        yield pd.DataFrame({
+            "season": np.repeat([season for _, season in chunk], lengths),
+            "time_elapsed": np.concatenate([time_elapsed for time_elapsed, _, _ in curves]),
+            "probability": np.concatenate([probabilities for _, probabilities, _ in curves]),
+            "home_won": np.repeat(home_won[start:start + chunk_size], lengths)
+        })
+
+def run(games: pd.DataFrame, seasons: list[int], data_path: Path, model_regulation, model_overtime, one_hot_columns: list[str],
+        chunk_size: int = 500, bins: int = 10, bucket_seconds: int = 600) -> Backtest:
+    """Backtest the models on each season, holding at most one season's data and one chunk's predictions at a time.
+
+    Args:
+        games (pd.DataFrame): NHL game metadata
+        seasons (list[int]): NHL seasons to score
+        data_path (Path): data folder with the time slices and overtime play-by-play
+        model_regulation (Model): keras Model for regulation
+        model_overtime (Model): keras Model for overtime
+        one_hot_columns (list[str]): one-hot encoding columns from training
+        chunk_size (int, optional): Games predicted per batch. Defaults to 500.
+        bins (int, optional): Equal width calibration bins. Defaults to 10.
+        bucket_seconds (int, optional): Length of each part of regulation in the breakdown by game time. Defaults to 600.
+
+    Returns:
+        Backtest: Calibration and scores over every prediction
+    """
+    from tqdm import tqdm
+
+    backtest = Backtest(bins, bucket_seconds)
+    for season in tqdm(seasons):
+        slices, ot_pbp = read_season(data_path, season)
+        season_games = games[games["Season"] == season]
+
+        for chunk in predict_chunks(season_games, slices, ot_pbp, model_regulation, model_overtime, one_hot_columns, chunk_size):
+            backtest.update(chunk["probability"], chunk["home_won"], chunk["time_elapsed"], chunk["season"])
 
-df = pd.read_parquet('../data/analyze.parquet')
+    return backtest
 
+if __name__ == "__main__":
+    from dev.inference import load_model
 
-m = NHL_METER()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seasons", type=int, nargs=2, default=[2007, 2023], help="first and last season, inclusive")
+    parser.add_argument("--chunk-size", type=int, default=500, help="games predicted per batch")
+    parser.add_argument("--bins", type=int, default=10)
+    parser.add_argument("--backend", choices=["keras", "numpy"], default=None)
+    parser.add_argument("--data-path", type=Path, default=Path("data"))
+    args = parser.parse_args()
 
-print(f"Sum of Least Squares: {m.backtest(df, m.least_squares):.4f}", )
-print(f"Cross Entropy: {m.backtest(df, m.log_loss):.4f}")
-print(f"Ranked Probability Score: {m.ranked_probability(df):.4f}")
+    games = pd.read_parquet(args.data_path / "games.parquet")
+    with open("dev/models/one_hot_columns.json", 'r') as f:
+        one_hot_columns = json.load(f)
 
+    backtest = run(
+        games, list(range(args.seasons[0], args.seasons[1] + 1)), args.data_path,
+        load_model("dev/models/meter_lstm16d2.keras", args.backend), load_model("dev/models/meter_ot_lstm16d1.keras", args.backend),
+        one_hot_columns, args.chunk_size, args.bins
+    )
 
+    for by in [None, "season", "time"]:
+        print(backtest.summary(by).to_string(float_format="{:.4f}".format), end="\n\n")
 
-xy = [list(z) for z in m.accBins(df, 10)]
-dy = [x - y for x, y in xy]
-x, y = zip(*xy)
-x = list(x)
-y = list(y)
-dy = [y + dy for y, dy in zip(y, dy)]
+    calibration = backtest.calibration()
+    print(calibration.to_string(index=False, float_format="{:.4f}".format))
 
-plt.figure
-fig, ax = plt.subplots()
-ax.set_aspect('equal', adjustable='box')
-ax.plot(y, y, color='black')
-ax.scatter(x, y, color='red')
-ax.vlines(x, y, dy, color='black')
-plt.title("Binned Elo Win Probability Residuals")
+    fig, ax = plt.subplots()
+    ax.set_aspect('equal', adjustable='box')
+    ax.plot([0, 1], [0, 1], color='black')
+    ax.scatter(calibration["predicted"], calibration["actual"], color='red')
+    ax.vlines(calibration["predicted"], calibration["predicted"], calibration["actual"], color='black')
+    plt.title("Binned Model Win Probability Residuals")
 
-plt.show()
\ No newline at end of file
+    plt.show()
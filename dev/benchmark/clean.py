@@ -0,0 +1,35 @@
+# Times the player ID repair against the original per-player loop
+# run from the project root: python -m dev.benchmark.clean --games 50
+import argparse
+import time
+
+import pandas as pd
+
+from dev.benchmark import reference
+from dev.data import clean
+from tests.synthetic import make_raw_season
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--season", type=int, default=2021)
+    args = parser.parse_args()
+
+    games = pd.read_parquet("data/game_elo.parquet")
+    pbp, shifts = make_raw_season(games[games["Season"] == args.season].head(args.games), seed=args.season)
+    print(f"{len(pbp)} plays, {len(shifts)} shifts")
+
+    start = time.perf_counter()
+    expected = reference.fix_missing_ids(pbp.copy(), shifts)
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result, unresolved = clean.fix_missing_ids(pbp.copy(), shifts)
+    join_time = time.perf_counter() - start
+
+    # the reference only repairs p3 of the event players
+    pd.testing.assert_frame_equal(result.drop(columns=["p1_ID", "p2_ID"]), expected.drop(columns=["p1_ID", "p2_ID"]))
+
+    print(f"fix_missing_ids reference: {reference_time:.3f}s")
+    print(f"fix_missing_ids join:      {join_time:.3f}s ({reference_time / join_time:.1f}x)")
+    print(f"unresolved (game, player) pairs: {sum(unresolved.values())}")
@@ -0,0 +1,31 @@
+# Times the Elo engine against the original loop, and a sweep of K-factor and season regression configurations
+# run from the project root: python -m dev.benchmark.elo
+import time
+
+import numpy as np
+import pandas as pd
+
+from dev.benchmark import reference
+from dev.data import elo
+
+if __name__ == "__main__":
+    games = pd.read_parquet("data/games.parquet")
+    print(f"{len(games)} games")
+
+    start = time.perf_counter()
+    expected = reference.add_and_run_elo_by_season(games)
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = elo.add_and_run_elo_by_season(games)
+    array_time = time.perf_counter() - start
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+    k, regression = elo.config_grid(np.arange(5, 45, 5), [0, 1/4., 1/3., 1/2., 2/3.])
+    start = time.perf_counter()
+    elo.elo_sweep(games, k, regression)
+    sweep_time = time.perf_counter() - start
+
+    print(f"add_and_run_elo_by_season reference: {reference_time:.3f}s")
+    print(f"add_and_run_elo_by_season arrays:    {array_time:.3f}s ({reference_time / array_time:.1f}x)")
+    print(f"elo_sweep of {len(k)} configurations:  {sweep_time:.3f}s")
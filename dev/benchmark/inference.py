@@ -0,0 +1,74 @@
+# Compares startup, latency, and memory of the keras and numpy prediction backends
+# run from the project root: python -m dev.benchmark.inference
+# each backend runs in its own process so imports and peak memory are measured separately
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"  # silence TensorFlow warnings
+
+import numpy as np
+
+model_paths = {
+    "regulation": "dev/models/meter_lstm16d2.keras",
+    "overtime": "dev/models/meter_ot_lstm16d1.keras"
+}
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kilobytes on Linux
+
+def measure(backend: str, repeats: int = 50) -> dict:
+    """Time imports, model loading, and single-game and batched predictions for one backend."""
+    start = time.perf_counter()
+    from dev.inference import load_model
+    models = {name: load_model(path, backend) for name, path in model_paths.items()}
+    results = {"backend": backend, "load_s": time.perf_counter() - start}
+
+    rng = np.random.default_rng(0)
+    inputs = {
+        # one game of 121 time slices with 12 features, and 20 overtime windows
+        "regulation": rng.random((121, 12), dtype=np.float32),
+        "overtime": rng.random((20, 3, 42), dtype=np.float32)
+    }
+
+    for name, model in models.items():
+        model.predict(inputs[name], verbose=0)  # warm up
+
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.predict(inputs[name], verbose=0)
+            latencies.append(time.perf_counter() - start)
+        results[f"{name}_game_ms"] = float(np.median(latencies) * 1000)
+
+        batch = np.repeat(inputs[name], 100, axis=0)
+        start = time.perf_counter()
+        model.predict(batch, batch_size=4096, verbose=0)
+        results[f"{name}_rows_per_s"] = len(batch) / (time.perf_counter() - start)
+
+    results["max_rss_mb"] = max_rss_mb()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["keras", "numpy"], help="measure one backend in this process")
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(measure(args.backend)))
+        sys.exit()
+
+    rows = []
+    for backend in ["keras", "numpy"]:
+        output = subprocess.run([sys.executable, "-m", "dev.benchmark.inference", "--backend", backend],
+                                capture_output=True, text=True, check=True).stdout
+        rows.append(json.loads(output.strip().splitlines()[-1]))
+
+    keys = [key for key in rows[0] if key != "backend"]
+    print(f"{'':24}" + "".join(f"{row['backend']:>14}" for row in rows))
+    for key in keys:
+        print(f"{key:24}" + "".join(f"{row[key]:>14.2f}" for row in rows))
@@ -0,0 +1,260 @@
+# Replays many historical games at once as timed event streams, measuring the latency of each live win probability update
+# run from the project root: python -m dev.benchmark.live_load --games 1 8 32 --speed 10 0 --target live callback
+# a speed of 0 replays as fast as possible, each game runs in its own thread until its plays or --duration run out
+import argparse
+import json
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dev import live, meter
+from dev.data import slice_and_reduce
+from dev.index import GameIndex
+
+def load(count: int, seed: int = 0, data_path: Path = Path("data")) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Sample games with starting Elo and their plays, generated plays if pbp_reduced.parquet is missing.
+
+    Args:
+        count (int): number of games, about a fifth of them with overtime
+        seed (int, optional): random seed for the sample. Defaults to 0.
+        data_path (Path, optional): data folder. Defaults to Path("data").
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: NHL game metadata with Elo and play-by-play data
+    """
+    games = pd.read_parquet(data_path / "game_elo.parquet")
+    overtime = games["Period"] > 3
+    sample = pd.concat([
+        games[overtime].sample(count // 5, random_state=seed),
+        games[~overtime].sample(count - count // 5, random_state=seed)
+    ]).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+    if (data_path / "pbp_reduced.parquet").exists():
+        pbp = pd.read_parquet(data_path / "pbp_reduced.parquet", filters=[("Game_Id", "in", sample["Game_Id"].unique().tolist())])
+        pbp = pbp.merge(sample[["Game_Id", "Season"]], on=["Game_Id", "Season"])
+        return sample, pbp
+
+    from tests.synthetic import make_pbp
+    print("pbp_reduced.parquet not found, using generated plays")
+    return sample, make_pbp(sample, seed)
+
+class LiveTarget:
+    """Incremental updates through `dev/live.py`, one play at a time."""
+
+    def __init__(self, game_data: pd.Series, models: dict):
+        self.feed = live.QueueFeed()
+        self.session = live.LiveSession(live.LiveGame(
+            game_data["Home_Team"], game_data["Away_Team"], game_data["Away_Starting_Elo"], game_data["Home_Starting_Elo"],
+            game_data["Playoff"], models["regulation"], models["overtime"], models["one_hot_columns"]
+        ), self.feed)
+
+    def push(self, play: dict) -> bool:
+        self.feed.put(play)
+        return bool(self.session.update())
+
+    def close(self):
+        self.feed.close()
+
+class CallbackTarget(LiveTarget):
+    """The dashboard's live callback, building a figure for each new update."""
+
+    def __init__(self, game_data: pd.Series, models: dict, callback, key: str):
+        super().__init__(game_data, models)
+        from callbacks import live_lock, live_polled, live_sessions
+
+        self.callback = callback
+        # each game is its own browser tab, with the key as its client id
+        self.key = key
+        self.home, self.away = game_data["Home_Team"], game_data["Away_Team"]
+        self.game_season = f"{game_data['Game_Id']}.{game_data['Season']}"
+        self.calls = 0
+        with live_lock:
+            live_sessions[key] = (self.game_season, self.session, threading.Lock())
+            live_polled[key] = time.monotonic()
+
+    def push(self, play: dict) -> bool:
+        from dash import no_update
+
+        self.feed.put(play)
+        self.calls += 1
+        figure, _ = self.callback(self.calls, self.home, self.away, self.game_season, self.key)
+        return figure is not no_update
+
+    def close(self):
+        from callbacks import live_lock, live_polled, live_sessions
+
+        self.feed.close()
+        with live_lock:
+            live_sessions.pop(self.key, None)
+            live_polled.pop(self.key, None)
+
+class MeterTarget:
+    """The historical predictors in `dev/meter.py`, predicting the whole game so far whenever a new point is reached."""
+
+    def __init__(self, game_data: pd.Series, models: dict, slices: pd.DataFrame, ot_pbp: pd.DataFrame):
+        self.game, self.season = game_data["Game_Id"], game_data["Season"]
+        self.models = models
+        self.slices = slices
+        self.ot_pbp = ot_pbp
+        self.slice_elapsed = (3600 - slices["time_remaining"].to_numpy(dtype=float) * 3600).round()
+        self.ot_elapsed = 3600 + ot_pbp["seconds_elapsed"].to_numpy()
+        self.points = 0
+
+    def push(self, play: dict) -> bool:
+        elapsed = play["Seconds_Elapsed"] + (play["Period"] - 1) * 1200
+        # regulation slices close on the play at their cutoff, playoff overtime continues past the fourth period
+        slices = int(np.searchsorted(self.slice_elapsed, elapsed, side="right"))
+        overtime = int(np.searchsorted(self.ot_elapsed, elapsed, side="right")) if elapsed > 3600 else 0
+        if slices + overtime <= self.points:
+            return False
+
+        self.points = slices + overtime
+        meter.predict_regulation(self.game, self.season, self.slices.iloc[:slices], self.models["regulation"])
+        if overtime:
+            meter.predict_overtime(self.game, self.season, self.ot_pbp.iloc[:overtime], self.models["overtime"], self.models["one_hot_columns"])
+        return True
+
+    def close(self):
+        pass
+
+def replay_game(target, plays: pd.DataFrame, speed: float | None, start: float, deadline: float) -> list[tuple[float, float]]:
+    """Push one game's plays to a target as the scaled game clock reaches them.
+
+    Args:
+        target (LiveTarget | CallbackTarget | MeterTarget): predictor receiving the plays
+        plays (pd.DataFrame): one game's play-by-play, in order
+        speed (float | None): game seconds per second, None to push each play as soon as the last is done
+        start (float): shared start of every game's clock, from time.perf_counter
+        deadline (float): stop pushing plays after this time
+
+    Returns:
+        list[tuple[float, float]]: Seconds after `start` each update's play was due, and its end-to-end latency
+    """
+    release = live.ReplayFeed(plays, speed).release
+    latencies = []
+
+    for play, elapsed in zip(plays.to_dict("records"), release):
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+
+        due = now if speed is None else start + elapsed / speed
+        if due > now:
+            time.sleep(due - now)
+
+        if target.push(play):
+            # time since the play was due, including waiting behind other games
+            latencies.append((due - start, time.perf_counter() - due))
+
+    target.close()
+    return latencies
+
+def run(target: str, count: int, speed: float | None, duration: float, models: dict, seed: int = 0) -> dict:
+    """Replay `count` games at once against one target.
+
+    Args:
+        target (str): `live`, `callback`, or `meter`
+        count (int): concurrent games
+        speed (float | None): game seconds per second, None as fast as possible
+        duration (float): seconds to replay for
+        models (dict): regulation and overtime models, and one-hot columns
+        seed (int, optional): random seed for the sample of games. Defaults to 0.
+
+    Returns:
+        dict: Plays pushed, updates per second, and latency percentiles in milliseconds
+    """
+    sample, pbp = load(count, seed)
+    plays = GameIndex(pbp, "Game_Id", "Season")
+
+    if target == "meter":
+        # time slices and overtime plays from the same plays as the replay
+        slices = GameIndex(slice_and_reduce.slice_regulation(sample, pbp))
+        ot_pbp = GameIndex(pd.concat(slice_and_reduce.reduce_all(sample, pbp)[1:], ignore_index=True))
+    if target == "callback":
+        from dash import Dash
+
+        from callbacks import register_callbacks
+        app = Dash(__name__)
+        register_callbacks(app)
+        key = next(output for output in app.callback_map if "probability-graph.figure@" in output)
+        callback = app.callback_map[key]["callback"].__wrapped__
+
+    targets = []
+    for i, game_data in sample.iterrows():
+        match target:
+            case "live":
+                targets.append(LiveTarget(game_data, models))
+            case "callback":
+                targets.append(CallbackTarget(game_data, models, callback, f"load.{i}"))
+            case "meter":
+                game, season = game_data["Game_Id"], game_data["Season"]
+                targets.append(MeterTarget(game_data, models, slices.get(game, season), ot_pbp.get(game, season)))
+
+    results = [None] * count
+    errors = [None] * count
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def replay(i: int, game_data: pd.Series):
+        try:
+            results[i] = replay_game(targets[i], plays.get(game_data["Game_Id"], game_data["Season"]), speed, start, deadline)
+        except Exception as e:
+            # raised again once every thread is done, rather than lost with the thread
+            errors[i] = e
+
+    threads = [threading.Thread(target=replay, args=(i, game_data)) for i, game_data in sample.iterrows()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    for error in errors:
+        if error is not None:
+            raise error
+
+    latencies = np.array([latency for result in results for _, latency in result]) * 1000
+    summary = {"target": target, "games": count, "speed": speed or 0, "seconds": elapsed, "updates": len(latencies),
+               "updates_per_s": len(latencies) / elapsed}
+    for percentile in [50, 95, 99]:
+        summary[f"p{percentile}_ms"] = float(np.percentile(latencies, percentile)) if len(latencies) else float("nan")
+    summary["max_ms"] = float(latencies.max()) if len(latencies) else float("nan")
+
+    return summary
+
+if __name__ == "__main__":
+    from dev.inference import load_model
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, nargs="+", default=[1, 8, 32], help="concurrent games in each run")
+    parser.add_argument("--speed", type=float, nargs="+", default=[10, 0], help="game seconds per second, 0 as fast as possible")
+    parser.add_argument("--target", choices=["live", "callback", "meter"], nargs="+", default=["live"])
+    parser.add_argument("--duration", type=float, default=30, help="seconds to replay in each run")
+    parser.add_argument("--backend", choices=["keras", "numpy"], default=None)
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    with open("dev/models/one_hot_columns.json", 'r') as f:
+        one_hot_columns = json.load(f)
+    models = {
+        "regulation": load_model("dev/models/meter_lstm16d2.keras", args.backend),
+        "overtime": load_model("dev/models/meter_ot_lstm16d1.keras", args.backend),
+        "one_hot_columns": one_hot_columns
+    }
+
+    results = []
+    print(f"{'target':<9}{'games':>6}{'speed':>7}{'updates/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for target in args.target:
+        for speed in args.speed:
+            for count in args.games:
+                result = run(target, count, speed or None, args.duration, models)
+                results.append(result)
+                print(f"{target:<9}{count:>6}{speed:>7g}{result['updates_per_s']:>11.1f}"
+                      f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}{result['max_ms']:>9.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
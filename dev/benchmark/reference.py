@@ -0,0 +1,339 @@
+# Original loop-based implementations, kept unchanged as references for equivalence tests and benchmarks
+import copy
+import re
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple
+
+import numpy as np
+from numpy import nan
+import pandas as pd
+from elosports.elo import Elo
+from tqdm import tqdm
+
+from dev import meter
+from dev.data import tidy
+
+
+def convert_strength_to_int(strength: str) -> int:
+    players = strength.split('x')
+    # home - away
+    return int(players[0]) - int(players[1])
+
+
+def sliding_window_game_pbp(pbp: pd.DataFrame, window_size: int) -> tuple[np.ndarray, np.ndarray]:
+    """Reference for `meter.sliding_window_game_pbp`."""
+    grouped = pbp.groupby(["season", "game"])  # unnecessary for individual games but don't want to cross over
+    windows = []
+    targets = []
+
+    for group_name, group in grouped:
+        temp_window = []
+        target = group["winner"].iloc[0]  # same for all in group
+
+        for row in group.drop("winner", axis=1).itertuples(index=False):
+            feature_values = list(row)[2:]  # skip season and game columns
+            temp_window.append(feature_values)
+
+            if len(temp_window) == window_size:
+                windows.append(temp_window.copy())
+                targets.append(target)
+                temp_window.pop(0)
+
+    return np.array(windows), np.array(targets)
+
+def overtime_windows(selected_game: pd.DataFrame, one_hot_columns: list[str], window_size: int = 3) -> np.ndarray:
+    """Pad, one-hot encode, and window one game's overtime play-by-play for the overtime model.
+
+    Args:
+        selected_game (pd.DataFrame): overtime play-by-play data for a single game
+        one_hot_columns (list[str]): one-hot encoding columns from training
+        window_size (int, optional): Size of the sliding window. Defaults to 3.
+
+    Returns:
+        np.ndarray: Play-by-play windows
+    """
+    X = selected_game.drop(["seconds_elapsed"], axis=1)
+    # overtime finished in 2 plays? (minimum FAC, then GOAL)
+    while len(X) < window_size:
+        # copy game, season, and Elo columns
+        # generate remaining blank row and prepend
+        blank_row = X.iloc[:, :4].copy()
+        for col in X.columns[4:]:
+            # missing values of the same type, so categorical columns stay categorical
+            blank_row[col] = pd.Series(None, index=X.index, dtype=X[col].dtype)
+
+        X = pd.concat([blank_row, X], ignore_index=True)
+
+    # one-hot encode play-by-play and match columns to training data
+    X_encoded = pd.get_dummies(X, columns=["event", "team", "event_zone", "home_zone", "strength"])
+    X_encoded = X_encoded.reindex(columns=one_hot_columns, fill_value=False)
+
+    # the vectorized windowing it was written with, which keeps the Elo columns' type
+    windows, targets = meter.sliding_window_game_pbp(X_encoded, window_size)
+
+    return windows
+
+def slice_regulation(games: pd.DataFrame, pbp: pd.DataFrame, slice_length: int = 30) -> pd.DataFrame:
+    """Reference for `slice_and_reduce.slice_regulation`."""
+    slices = []
+
+    for game in tqdm(games.itertuples(index=False), total=len(games)):
+        cur_cutoff = slice_length
+
+        game_totals = {
+            "game": game.Game_Id,
+            "season": game.Season,
+            "time_remaining": 1,  # three periods of 20 minutes, in seconds, divided by 3600
+            "away_elo": game.Away_Starting_Elo,
+            "home_elo": game.Home_Starting_Elo,
+            "away_score": 0,
+            "home_score": 0,
+            "away_pim": 0,
+            "home_pim": 0,
+            "away_hits": 0,
+            "home_hits": 0,
+            "away_shots": 0,
+            "home_shots": 0,
+            "strength": 0,
+            "winner": "home" if game.Home_Score > game.Away_Score else "away"
+        }
+
+        slices.append(copy.deepcopy(game_totals))  # initial based purely on Elo
+
+        reduced = pbp[(pbp["Game_Id"] == game.Game_Id) & (pbp["Date"] == game.Date)]
+        for play in reduced.itertuples(index=False):
+            elapsed = play.Seconds_Elapsed + ((play.Period - 1) * 1200)
+            if elapsed > 3600:
+                # ignore overtime, will use different model and concatenate
+                break
+
+            if elapsed >= cur_cutoff:
+                # convert to normalized time remaining
+                game_totals["time_remaining"] = (3600 - cur_cutoff) / 3600
+                slices.append(copy.deepcopy(game_totals))
+                cur_cutoff += slice_length
+
+            game_totals["strength"] = convert_strength_to_int(play.Strength)  # always update strength
+
+            if play.Ev_Team == game.Home_Team:
+                team = "home"
+            elif play.Ev_Team == game.Away_Team:
+                team = "away"
+            else:
+                # timing event like PSTR or GEND, or STOP for rink repair, etc
+                continue
+
+            match play.Event:
+                case "SHOT":
+                    game_totals[f"{team}_shots"] += 1
+                case "HIT":
+                    game_totals[f"{team}_hits"] += 1
+                case "PENL":
+                    try:
+                        text = play.Type.split("(")[1]  # some penalty descriptions have player number
+                        if "maj" in text:
+                            game_totals[f"{team}_pim"] += 5
+                        else:
+                            mins = re.search(r'\d+', text)
+                            game_totals[f"{team}_pim"] += int(mins.group())
+                    except (IndexError, AttributeError):
+                        pass  # some penalties are missing descriptions
+                case "GOAL":
+                    game_totals[f"{team}_score"] += 1
+
+    return pd.DataFrame(slices)
+
+def reduce_plays(game: NamedTuple, pbp: pd.DataFrame, time_key: str, time_function: Callable[[int, int], int]) -> list[dict]:
+    """Reference for `slice_and_reduce.reduce_plays`."""
+    valid_events = ["FAC", "BLOCK", "SHOT", "GOAL", "MISS", "HIT", "GIVE", "TAKE"]
+
+    events = []
+    for play in pbp.itertuples(index=False):
+        # first event will always be a faceoff
+        if play.Event in valid_events:
+            event = {
+                "game": game.Game_Id,
+                "season": game.Season,
+                "away_elo": game.Away_Starting_Elo,
+                "home_elo": game.Home_Starting_Elo,
+                time_key: time_function(play.Period, play.Seconds_Elapsed),
+                "event": play.Event,
+                "team": "home" if play.Ev_Team == play.Home_Team else "away",
+                "event_zone": play.Ev_Zone,
+                "home_zone": play.Home_Zone,
+                "strength": play.Strength,
+                "winner": "home" if game.Home_Score > game.Away_Score else "away"
+            }
+
+            events.append(event)
+
+    return events
+
+def reduce_regulation(games: pd.DataFrame, pbp: pd.DataFrame) -> pd.DataFrame:
+    """Reference for `slice_and_reduce.reduce_regulation`."""
+    events = []
+    for game in tqdm(games.itertuples(index=False), total=len(games)):
+        mask = ((pbp["Game_Id"] == game.Game_Id)
+                & (pbp["Season"] == game.Season)
+                & (pbp["Period"] < 4))
+        reduced = pbp[mask]
+
+        time_remaining = lambda x, y: 3600 - y + ((x - 1) * 1200)
+        events.extend(reduce_plays(game, reduced, "time_remaining", time_remaining))
+
+    return pd.DataFrame(events)
+
+def reduce_regular_overtime(games: pd.DataFrame, pbp: pd.DataFrame) -> pd.DataFrame:
+    """Reference for `slice_and_reduce.reduce_regular_overtime`."""
+    events = []
+    for game in tqdm(games.itertuples(index=False), total=len(games)):
+        mask = ((pbp["Game_Id"] == game.Game_Id)
+                & (pbp["Season"] == game.Season)
+                & (pbp["Period"] == 4))  # ignore shootout
+        reduced = pbp[mask]
+
+        seconds_elapsed = lambda x, y: y
+        events.extend(reduce_plays(game, reduced, "seconds_elapsed", seconds_elapsed))
+
+    return pd.DataFrame(events)
+
+def reduce_playoff_overtime(games: pd.DataFrame, pbp: pd.DataFrame) -> pd.DataFrame:
+    """Reference for `slice_and_reduce.reduce_playoff_overtime`."""
+    events = []
+    for game in tqdm(games.itertuples(index=False), total=len(games)):
+        mask = ((pbp["Game_Id"] == game.Game_Id)
+                & (pbp["Season"] == game.Season)
+                & (pbp["Period"] >= 4))
+        reduced = pbp[mask]
+
+        seconds_elapsed =  lambda x, y: ((x - 4) * 1200) + y
+        events.extend(reduce_plays(game, reduced, "seconds_elapsed", seconds_elapsed))
+
+    return pd.DataFrame(events)
+
+def add_and_run_elo_by_season(games: pd.DataFrame) -> pd.DataFrame:
+    """Reference for `elo.add_and_run_elo_by_season`."""
+    df = games.copy()
+    
+    # add Elo columns and initialize all to zero
+    df["Away_Starting_Elo"] = 0.0
+    df["Home_Starting_Elo"] = 0.0
+    df["Away_Ending_Elo"] = 0.0
+    df["Home_Ending_Elo"] = 0.0
+
+    # create league
+    league = Elo(k = 20)
+    for t in df['Home_Team'].unique():
+        league.addPlayer(t)
+
+    season = df["Season"].min()  # likely 2007
+    for row in df.itertuples(index=True):
+        # see https://github.com/ddm7018/Elo/blob/master/tutorial/elo_simulations.py
+        if row.Season > season:
+            for key in league.ratingDict.keys():
+                # year that Thrashers moved to Winnipeg, copy Elo
+                if key == 'WPG' and season == 2011:
+                    league.ratingDict['WPG'] = league.ratingDict['ATL']
+                league.ratingDict[key] = league.ratingDict[key] - ((league.ratingDict[key] - 1500) * (1/3.))
+            season += 1
+
+        df.loc[row.Index, 'Away_Starting_Elo'] = league.ratingDict[row.Away_Team]
+        df.loc[row.Index, 'Home_Starting_Elo'] = league.ratingDict[row.Home_Team]
+
+        if row.Away_Score > row.Home_Score:
+            league.gameOver(row.Away_Team, row.Home_Team, False)
+        else:
+            league.gameOver(row.Home_Team, row.Away_Team, True)
+
+        df.loc[row.Index, 'Away_Ending_Elo'] = league.ratingDict[row.Away_Team]
+        df.loc[row.Index, 'Home_Ending_Elo'] = league.ratingDict[row.Home_Team]
+
+    return df
+
+def add_season_column(pbp: pd.DataFrame, season: int = 2007):
+    """Reference for `tidy.add_season_column`."""
+    season_list = []
+    # same cutoff as when counting up from 2007, moving 365 days per season
+    comparison_date = datetime.strptime('2008-08-31', '%Y-%m-%d') + timedelta(days=365 * (season - 2007))
+    for row in pbp.itertuples(index=False):
+        if row.Date > comparison_date:
+            season += 1
+            comparison_date += timedelta(days=365)
+
+        season_list.append(season)
+    pbp['Season'] = season_list
+
+def extract_games(pbp: pd.DataFrame) -> pd.DataFrame:
+    """Reference for `tidy.extract_games`."""
+    reduced = pbp[['Game_Id', 'Season', 'Date', 'Home_Team', 'Home_Coach', 'Away_Team', 'Away_Coach', 'Period', 'Home_Score', 'Away_Score']]
+
+    # extract the last rows of each group and determine playoffs boolean
+    # previously used GEND event but this is missing from some games, like 20003.2007
+    games = []
+    for name, game in reduced.groupby(['Season', 'Game_Id']):
+        last_play = game.iloc[-1].copy()
+        last_play['Playoff'] = last_play.Date >= tidy.playoff_dates[last_play.Season]
+        games.append(last_play)
+
+    return pd.DataFrame(games)
+
+def extract_players(pbp: pd.DataFrame) -> pd.DataFrame:
+    """Reference for `tidy.extract_players`."""
+    players = [[f"homePlayer{pNum}", f"homePlayer{pNum}_id"] for pNum in range(1, 6)]
+    players += [[f"awayPlayer{pNum}", f"awayPlayer{pNum}_id"] for pNum in range(1, 6)]
+    players += [[f"p{pNum}_name", f"p{pNum}_ID"] for pNum in range(1, 4)]
+    players += [['Home_Goalie', 'Home_Goalie_Id'], ['Away_Goalie', 'Away_Goalie_Id']]
+
+    playerframe = pd.DataFrame()
+    for pair in tqdm(players):
+        playerframe = pd.concat([pbp[pair].rename(columns={pair[0]: 'player', pair[1]: 'playerId'}).drop_duplicates(), playerframe])
+    playerframe.drop_duplicates(inplace=True)
+
+    return playerframe
+
+def fix_player_id(pbp: pd.DataFrame, shifts: pd.DataFrame, game_id: str, player_name: str, name_col: str, id_col: str) -> pd.DataFrame:
+    """Reference for `clean.fix_player_id`."""
+    id_almost = shifts.loc[(shifts['Game_Id'] == game_id) & (shifts['Player'] == player_name)]  # rows matching given game with player name
+    try:
+        id = id_almost['Player_Id'].iloc[0]  # player has only one id, just grab first instance
+    except IndexError:
+        id = nan  # still missing
+
+    pbp.loc[(pbp['Game_Id'] == game_id) & (pbp[name_col] == player_name), id_col] = id  # replace all matching player null id with id from shift df
+    return pbp
+
+def fix_missing_ids(pbp: pd.DataFrame, shifts: pd.DataFrame) -> pd.DataFrame:
+    """Reference for `clean.fix_missing_ids`, which only repairs p3 of the event players."""
+    # build list of player column labels to fix IDs for all players on ice
+    s = ['homePlayer', 'awayPlayer']
+    players = [f'{team}{ct}' for team in s for ct in range(1,7)]
+
+    for p in players:
+        id_col = p + '_id'
+        rows = pbp.loc[(pbp[id_col].isnull()) & (pbp[p].notnull())]  # players with name but null id
+
+        for row in rows.itertuples(index=False):
+            pbp = fix_player_id(pbp, shifts, row.Game_Id, getattr(row, p), p, id_col)
+
+    # fix IDs for players involved in event
+    for p in ['p1', 'p2', 'p3']:
+        id_col = p + '_ID'
+        name_col = p + '_name'
+        rows = pbp.loc[pbp[id_col].isnull() & pbp[name_col].notnull()]
+
+    for row in rows.itertuples(index=False):  # Use index=True to access the row index if needed
+        if (name := getattr(row, p + '_name')) == 'Team':  # Exclude team penalties
+            continue
+
+        pbp = fix_player_id(pbp, shifts, row.Game_Id, name, name_col, id_col)
+
+    return pbp
+
+
+def ranked_probability(data: pd.DataFrame) -> float:
+    """Reference for `NHL_METER.ranked_probability` in dev/backtest/main.py."""
+    all_rps = []
+    for i, row in data.iterrows():
+        rps = 1/2 * (row["Win_Prob"] - row["Home_Won"])**2
+        all_rps.append(rps)
+    return sum(all_rps) / len(data)
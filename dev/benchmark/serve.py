@@ -0,0 +1,137 @@
+# Measures graph request throughput and latency of a running server, the Dash development server or gunicorn
+# run from the project root: python -m dev.benchmark.serve --server gunicorn --workers 4
+# each server starts in its own process group, the figure cache is off so every request predicts and draws a game
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+def commands(port: int, workers: int) -> dict[str, list[str]]:
+    return {
+        "dev": [sys.executable, "app.py"],
+        "gunicorn": [sys.executable, "-m", "gunicorn", "app:server", "--bind", f"127.0.0.1:{port}", "--workers", str(workers)]
+    }
+
+def wait_ready(url: str, timeout: float = 300) -> float:
+    """Poll /readyz until the server has loaded its data and models, returning the seconds waited."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(f"{url}/readyz", timeout=5) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} was not ready after {timeout} seconds")
+
+def payload(home: str, away: str, game_season: str) -> bytes:
+    """Body of the request a browser sends to update the graph after choosing a game."""
+    return json.dumps({
+        "output": "probability-graph.figure",
+        "outputs": {"id": "probability-graph", "property": "figure"},
+        "inputs": [
+            {"id": "home-dropdown", "property": "value", "value": home},
+            {"id": "away-dropdown", "property": "value", "value": away},
+            {"id": "game-dropdown", "property": "value", "value": game_season}
+        ],
+        "changedPropIds": ["game-dropdown.value"],
+        "state": []
+    }).encode()
+
+def load(url: str, bodies: list[bytes], clients: int, duration: float) -> tuple[list[float], int]:
+    """Send graph requests from `clients` threads for `duration` seconds, returning each successful request's latency and the failures."""
+    latencies = [[] for _ in range(clients)]
+    errors = [[] for _ in range(clients)]
+    stop = time.perf_counter() + duration
+
+    def client(i: int):
+        n = i
+        while time.perf_counter() < stop:
+            request = urllib.request.Request(f"{url}/_dash-update-component", data=bodies[n % len(bodies)],
+                                             headers={"Content-Type": "application/json"})
+            n += clients
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    response.read()
+            except (urllib.error.URLError, ConnectionError) as e:
+                errors[i].append(e)
+                continue
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    errors = [error for client_errors in errors for error in client_errors]
+    if errors:
+        print(f"{len(errors)} failed requests, first: {errors[0]}", file=sys.stderr)
+    return [latency for client_latencies in latencies for latency in client_latencies], len(errors)
+
+def run(server: str, workers: int, clients: int, duration: float, games: int, port: int, backend: str | None) -> dict:
+    env = dict(os.environ, PORT=str(port), NHL_METER_FIGURE_CACHE_MB="0", NHL_METER_WORKERS=str(workers))
+    if backend:
+        env["NHL_METER_BACKEND"] = backend
+
+    # the same games for every server, spread over every season, between teams that have colors to draw
+    from dev.graphing.gutils import teams
+
+    codes = [team["team_code"] for team in teams]
+    games_frame = pd.read_parquet("data/games.parquet")
+    games_frame = games_frame[games_frame["Home_Team"].isin(codes) & games_frame["Away_Team"].isin(codes)]
+    sample = games_frame.sample(min(games, len(games_frame)), random_state=0)
+    bodies = [payload(g["Home_Team"], g["Away_Team"], f'{g["Game_Id"]}.{g["Season"]}') for _, g in sample.iterrows()]
+
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(commands(port, workers)[server], env=env, start_new_session=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready_s = wait_ready(url)
+        # first request in each worker, like the Keras graph build, is not part of steady state
+        load(url, bodies, clients, 2)
+        latencies, errors = load(url, bodies, clients, duration)
+        latencies = np.array(latencies)
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000 if len(latencies) else (np.nan,) * 3
+    return {
+        "server": server,
+        "workers": workers if server == "gunicorn" else 1,
+        "ready_s": ready_s,
+        "requests_per_s": len(latencies) / duration,
+        "errors": errors,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--server", choices=["dev", "gunicorn", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="gunicorn worker processes")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of requests")
+    parser.add_argument("--games", type=int, default=200, help="distinct games requested")
+    parser.add_argument("--port", type=int, default=8051)
+    parser.add_argument("--backend", choices=["keras", "numpy"], default=None)
+    args = parser.parse_args()
+
+    servers = ["dev", "gunicorn"] if args.server == "both" else [args.server]
+    results = pd.DataFrame([
+        run(server, args.workers, args.clients, args.duration, args.games, args.port, args.backend) for server in servers
+    ])
+    print(results.to_string(index=False, float_format="{:.1f}".format))
@@ -0,0 +1,60 @@
+# Times the slicing and reducing stages against the original loops on a few seasons and checks both give the same output
+# run from the project root: python -m dev.benchmark.slice_and_reduce --seasons 2021 2022
+import argparse
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from dev.benchmark import reference
+from dev.data import slice_and_reduce
+
+def load(seasons: list[int], data_path: Path = Path("data")) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Games with Elo and play-by-play for the given seasons, generated plays if pbp_reduced.parquet is missing."""
+    games = pd.read_parquet(data_path / "game_elo.parquet")
+    games = games[games["Season"].isin(seasons)].reset_index(drop=True)
+
+    if (data_path / "pbp_reduced.parquet").exists():
+        pbp = pd.read_parquet(data_path / "pbp_reduced.parquet", filters=[("Season", "in", seasons)])
+    else:
+        from tests.synthetic import make_pbp
+        print("pbp_reduced.parquet not found, using generated plays")
+        pbp = make_pbp(games)
+
+    return games, pbp
+
+def timed(function, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seasons", type=int, nargs="+", default=[2021, 2022])
+    args = parser.parse_args()
+
+    games, pbp = load(args.seasons)
+    print(f"{len(games)} games, {len(pbp)} plays")
+
+    reference_time, expected = timed(reference.slice_regulation, games, pbp)
+    vectorized_time, slices = timed(slice_and_reduce.slice_regulation, games, pbp)
+    pd.testing.assert_frame_equal(slices, expected)
+
+    print(f"slice_regulation reference:  {reference_time:.3f}s")
+    print(f"slice_regulation vectorized: {vectorized_time:.3f}s ({reference_time / vectorized_time:.1f}x)")
+
+    overtime = games["Period"] >= 4
+    split = [games[~overtime], games[overtime & ~games["Playoff"]], games[overtime & games["Playoff"]]]
+    reference_reduce = lambda: (
+        reference.reduce_regulation(split[0], pbp),
+        reference.reduce_regular_overtime(split[1], pbp),
+        reference.reduce_playoff_overtime(split[2], pbp)
+    )
+
+    reference_time, expected = timed(reference_reduce)
+    vectorized_time, reduced = timed(slice_and_reduce.reduce_all, games, pbp)
+    for frame, expected_frame in zip(reduced, expected):
+        pd.testing.assert_frame_equal(frame, expected_frame)
+
+    print(f"reduce reference:  {reference_time:.3f}s")
+    print(f"reduce_all:        {vectorized_time:.3f}s ({reference_time / vectorized_time:.1f}x)")
@@ -0,0 +1,49 @@
+# Times the sliding window preprocessing on the full overtime training set from lstm_ot.ipynb
+# run from the project root: python -m dev.benchmark.sliding_window
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dev import meter
+from dev.benchmark import reference
+
+window_size = 3
+
+def load_training_pbp(data_path: Path = Path("data")) -> pd.DataFrame:
+    """Regulation and overtime play-by-play, one-hot encoded the same as lstm_ot.ipynb."""
+    frames = [
+        pd.read_parquet(data_path / "regular_ot_pbp.parquet"),
+        pd.read_parquet(data_path / "playoff_ot_pbp.parquet")
+    ]
+    if (data_path / "regulation_pbp.parquet").exists():
+        regulation = pd.read_parquet(data_path / "regulation_pbp.parquet")
+        frames.insert(0, regulation.rename(columns={"time_remaining": "seconds_elapsed"}))
+    else:
+        print("regulation_pbp.parquet not found, using overtime play-by-play only")
+
+    df = pd.concat(frames, ignore_index=True)
+    df.drop("seconds_elapsed", axis=1, inplace=True)
+
+    df = meter.plays_preceding_goals(df, window_size, convert_winner=True)
+    return pd.get_dummies(df, columns=["event", "team", "event_zone", "home_zone", "strength"])
+
+def timed(function, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+if __name__ == "__main__":
+    one_hot = load_training_pbp()
+    print(f"{len(one_hot)} plays")
+
+    reference_time, (reference_windows, reference_targets) = timed(reference.sliding_window_game_pbp, one_hot, window_size)
+    vectorized_time, (windows, targets) = timed(meter.sliding_window_game_pbp, one_hot, window_size)
+
+    assert np.array_equal(windows, reference_windows) and windows.dtype == reference_windows.dtype
+    assert np.array_equal(targets, reference_targets)
+
+    print(f"{len(windows)} windows of shape {windows.shape[1:]}")
+    print(f"reference:  {reference_time:.3f}s")
+    print(f"vectorized: {vectorized_time:.3f}s ({reference_time / vectorized_time:.1f}x)")
@@ -0,0 +1,51 @@
+# Measures app cold start: time until the layout can be served, and until data and models are warm
+# run from the project root: python -m dev.benchmark.startup
+# each measurement runs in a fresh process so nothing is already imported or cached
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+def measure() -> dict:
+    start = time.perf_counter()
+    import app  # noqa: F401, renders the layout and registers callbacks
+    results = {"import_app_s": time.perf_counter() - start}
+
+    import registry
+
+    # wait for the background warm started by app.py
+    for thread in threading.enumerate():
+        if thread.name == "registry-warm":
+            thread.join()
+    results["warm_s"] = time.perf_counter() - start
+
+    # reload each artifact on its own, libraries like TensorFlow are already imported by now
+    for loader in registry.loaders:
+        loader.cache_clear()
+        loader_start = time.perf_counter()
+        loader()
+        results[f"{loader.__name__}_s"] = time.perf_counter() - loader_start
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["keras", "numpy"], default=None)
+    parser.add_argument("--child", action="store_true", help="measure in this process")
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure()))
+        sys.exit()
+
+    env = dict(os.environ)
+    if args.backend:
+        env["NHL_METER_BACKEND"] = args.backend
+
+    output = subprocess.run([sys.executable, "-m", "dev.benchmark.startup", "--child"],
+                            capture_output=True, text=True, check=True, env=env).stdout
+    for key, value in json.loads(output.strip().splitlines()[-1]).items():
+        print(f"{key:24}{value:>10.3f}")
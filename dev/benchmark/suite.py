@@ -0,0 +1,234 @@
+# Times prediction, the dashboard callbacks, and each data pipeline stage on fixed inputs, saving the results as JSON
+# run from the project root: python -m dev.benchmark.suite run --output before.json
+# then compare two runs, exiting with an error if any benchmark is slower by more than the threshold:
+# python -m dev.benchmark.suite compare before.json after.json --threshold 0.1
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+# same games as tests/test_callbacks.py, one ending in regulation and one in overtime
+regulation_game = ("BOS", "PHI", 30227, 2009)
+overtime_game = ("CAR", "FLA", 30311, 2022)
+
+def measure(function: Callable, repeats: int, setup: Callable | None = None) -> dict:
+    """Median and fastest of `repeats` calls after one warm up call.
+
+    Args:
+        function (Callable): benchmark, called without arguments
+        repeats (int): timed calls
+        setup (Callable | None, optional): called before each call, outside the timing. Defaults to None.
+
+    Returns:
+        dict: Median and minimum seconds, and the number of repeats
+    """
+    times = []
+    for i in range(repeats + 1):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        if i > 0:
+            times.append(time.perf_counter() - start)
+
+    return {"median_s": float(np.median(times)), "min_s": float(np.min(times)), "repeats": repeats}
+
+def prediction_benchmarks() -> dict[str, tuple[Callable, Callable | None]]:
+    import registry
+    from dev import meter
+    from dev.graphing import gutils
+
+    slices, ot_pbp = registry.slices(), registry.ot_pbp()
+    model_regulation, model_overtime, one_hot_columns = registry.model_regulation(), registry.model_overtime(), registry.one_hot_columns()
+    home, away, game, season = overtime_game
+    curve = meter.predict_game(game, season, registry.games_index(), slices, ot_pbp, model_regulation, model_overtime, one_hot_columns)
+
+    return {
+        "meter.predict_regulation": (lambda: meter.predict_regulation(*regulation_game[2:], slices, model_regulation), None),
+        "meter.predict_overtime": (lambda: meter.predict_overtime(game, season, ot_pbp, model_overtime, one_hot_columns), None),
+        "meter.overtime_windows": (lambda: meter.overtime_windows(ot_pbp.get(game, season), one_hot_columns), None),
+        "gutils.graph_probabilities_plotly": (
+            lambda: gutils.graph_probabilities_plotly(*curve, gutils.team_name_color(home), gutils.team_name_color(away, 1)), None
+        )
+    }
+
+def callback_benchmarks() -> dict[str, tuple[Callable, Callable | None]]:
+    from dash import Dash
+
+    import registry
+    from callbacks import register_callbacks
+
+    app = Dash(__name__)
+    register_callbacks(app)
+    update_figure = app.callback_map["probability-graph.figure"]["callback"].__wrapped__
+    update_game_dropdown = app.callback_map["game-dropdown.options"]["callback"].__wrapped__
+
+    def game_season(game: tuple) -> str:
+        return f"{game[2]}.{game[3]}"
+
+    benchmarks = {"update_game_dropdown": (lambda: update_game_dropdown(*regulation_game[:2]), None)}
+    for name, game in [("regulation", regulation_game), ("overtime", overtime_game)]:
+        # a fresh figure cache before each call, so the figure is built every time
+        benchmarks[f"update_figure.{name}"] = (lambda game=game: update_figure(*game[:2], game_season(game)),
+                                               registry.figure_cache_store.cache_clear)
+        benchmarks[f"update_figure.{name}.cached"] = (lambda game=game: update_figure(*game[:2], game_season(game)), None)
+
+    return benchmarks
+
+def pipeline_benchmarks() -> dict[str, tuple[Callable, Callable | None]]:
+    from dev.data import clean, elo, slice_and_reduce, tidy
+    from tests.synthetic import make_raw_season
+
+    # generated plays for a fixed set of games, the same on every machine
+    games = pd.read_parquet("data/game_elo.parquet")
+    sample = pd.concat([
+        games[games["Season"] == 2012].head(60),
+        games[(games["Season"] == 2012) & games["Playoff"] & (games["Period"] > 3)].head(10)
+    ])
+    pbp, shifts = make_raw_season(sample, seed=0)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cleaned = clean.clean_season(pbp.copy(), shifts.copy(), fix_ids=True)[0]
+    tidied, tidy_games, _ = tidy.tidy_pbp(cleaned)
+    rated = elo.add_and_run_elo_by_season(tidy_games)
+    all_games = pd.read_parquet("data/games.parquet")
+
+    def clean_season():
+        # without printing the unresolved player IDs every call
+        with contextlib.redirect_stdout(io.StringIO()):
+            clean.clean_season(pbp.copy(), shifts.copy(), fix_ids=True)
+
+    return {
+        "clean.clean_season": (clean_season, None),
+        "tidy.tidy_pbp": (lambda: tidy.tidy_pbp(cleaned), None),
+        "elo.add_and_run_elo_by_season": (lambda: elo.add_and_run_elo_by_season(all_games), None),
+        "slice_and_reduce.slice_regulation": (lambda: slice_and_reduce.slice_regulation(rated, tidied), None),
+        "slice_and_reduce.reduce_all": (lambda: slice_and_reduce.reduce_all(rated, tidied), None)
+    }
+
+groups = {"prediction": prediction_benchmarks, "callbacks": callback_benchmarks, "pipeline": pipeline_benchmarks}
+
+# names of each group's benchmarks, so a filter only loads the data and models of the groups it selects
+group_names = {
+    "prediction": ["meter.predict_regulation", "meter.predict_overtime", "meter.overtime_windows", "gutils.graph_probabilities_plotly"],
+    "callbacks": ["update_game_dropdown"] + [f"update_figure.{name}{cached}" for name in ["regulation", "overtime"] for cached in ["", ".cached"]],
+    "pipeline": ["clean.clean_season", "tidy.tidy_pbp", "elo.add_and_run_elo_by_season", "slice_and_reduce.slice_regulation",
+                 "slice_and_reduce.reduce_all"]
+}
+
+def select(pattern: str | None = None) -> dict[str, list[str]]:
+    """Names of the benchmarks matching a regular expression in each group, leaving out groups without any."""
+    selected = {group: [name for name in names if pattern is None or re.search(pattern, name)] for group, names in group_names.items()}
+    return {group: names for group, names in selected.items() if names}
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "backend": os.environ.get("NHL_METER_BACKEND", "keras"),
+        "curve_store": Path("data/curves").exists()
+    }
+
+def run_suite(repeats: int = 10, pattern: str | None = None) -> dict:
+    """Run every benchmark, or those with names matching a regular expression.
+
+    Args:
+        repeats (int, optional): Timed calls of each benchmark. Defaults to 10.
+        pattern (str | None, optional): Regular expression selecting benchmarks by name. Defaults to None, all of them.
+
+    Returns:
+        dict: Environment and the timings of each benchmark
+    """
+    results = {}
+    for group, names in select(pattern).items():
+        benchmarks = groups[group]()
+        for name in names:
+            function, setup = benchmarks[name]
+            results[name] = measure(function, repeats, setup) | {"group": group}
+            print(f"{name:<40} {results[name]['median_s'] * 1000:10.2f} ms")
+
+    return {"environment": environment(), "results": results}
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> list[dict]:
+    """Ratio of the current to the baseline median for each benchmark in both runs.
+
+    Args:
+        baseline (dict): results from `run_suite`
+        current (dict): results from `run_suite`
+        threshold (float, optional): Fraction slower than the baseline counted as a regression. Defaults to 0.1.
+
+    Returns:
+        list[dict]: Name, both medians, ratio, and whether it regressed for each benchmark
+    """
+    rows = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+
+        before, after = baseline["results"][name]["median_s"], result["median_s"]
+        ratio = after / before if before > 0 else float("inf")
+        rows.append({"name": name, "baseline_s": before, "current_s": after, "ratio": ratio, "regression": ratio > 1 + threshold})
+
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks and save the results")
+    run_parser.add_argument("--output", type=Path, default=None, help="defaults to dev/benchmark/results/<commit>.json")
+    run_parser.add_argument("--repeats", type=int, default=10)
+    run_parser.add_argument("--filter", default=None, help="regular expression selecting benchmarks by name")
+
+    compare_parser = subparsers.add_parser("compare", help="compare two saved runs")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="fraction slower counted as a regression")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        # the disk tier would serve figures built by earlier runs
+        os.environ.pop("NHL_METER_FIGURE_CACHE_DIR", None)
+        suite = run_suite(args.repeats, args.filter)
+
+        output = args.output or Path("dev/benchmark/results") / f"{suite['environment']['commit'] or 'results'}.json"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(suite, f, indent=2)
+        print(f"Saved {output}")
+    else:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        with open(args.current, "r") as f:
+            current = json.load(f)
+
+        rows = compare(baseline, current, args.threshold)
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['name']:<40} {row['baseline_s'] * 1000:10.2f} ms {row['current_s'] * 1000:10.2f} ms {row['ratio']:6.2f}x {flag}")
+
+        regressions = [row["name"] for row in rows if row["regression"]]
+        if regressions:
+            print(f"{len(regressions)} benchmarks slower than the baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
@@ -0,0 +1,60 @@
+# Times the tidy stage against the original loops and reports peak memory of each
+# run from the project root: python -m dev.benchmark.tidy --seasons 2021 2022
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from dev.benchmark import reference
+from dev.data import clean, tidy
+
+def load(seasons: list[int], data_path: Path = Path("data")) -> pd.DataFrame:
+    """Cleaned play-by-play for the given seasons, generated plays if pbp_combined.parquet is missing."""
+    if (data_path / "pbp_combined.parquet").exists():
+        pbp = pd.read_parquet(data_path / "pbp_combined.parquet")
+        return pbp[pd.to_datetime(pbp["Date"]).dt.year.isin(seasons + [max(seasons) + 1])].reset_index(drop=True)
+
+    from tests.synthetic import make_raw_season
+    print("pbp_combined.parquet not found, using generated plays")
+    games = pd.read_parquet(data_path / "game_elo.parquet")
+    frames = [clean.clean_season(*make_raw_season(games[games["Season"] == season], seed=season), fix_ids=False)[0] for season in seasons]
+    return pd.concat(frames, ignore_index=True)
+
+def reference_tidy(df: pd.DataFrame, season: int) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    pbp = df.copy()
+    pbp['Date'] = pd.to_datetime(pbp['Date'])
+    pbp['Game_Id'] = pbp['Game_Id'].astype('int64')
+
+    reference.add_season_column(pbp, season)
+    games = reference.extract_games(pbp)
+    playerframe = reference.extract_players(pbp)
+    tidy.reduce_pbp(pbp)
+
+    return (pbp, games, playerframe)
+
+def measure(function, *args) -> tuple[float, float, object]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1e6, result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seasons", type=int, nargs="+", default=[2021, 2022])
+    args = parser.parse_args()
+
+    pbp = load(args.seasons)
+    print(f"{len(pbp)} plays")
+
+    reference_time, reference_peak, expected = measure(reference_tidy, pbp, min(args.seasons))
+    vectorized_time, vectorized_peak, result = measure(tidy.tidy_pbp, pbp, min(args.seasons))
+    for frame, expected_frame in zip(result, expected):
+        pd.testing.assert_frame_equal(frame, expected_frame)
+
+    print(f"tidy_pbp reference:  {reference_time:.3f}s, {reference_peak:.0f} MB peak")
+    print(f"tidy_pbp vectorized: {vectorized_time:.3f}s ({reference_time / vectorized_time:.1f}x), {vectorized_peak:.0f} MB peak")
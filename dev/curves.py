@@ -0,0 +1,153 @@
+# Precomputes win probability curves for historical games so the dashboard can skip the models
+# run from the project root to build the store for the current models: python -m dev.curves
+import hashlib
+import json
+import os
+from pathlib import Path
+
+os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"  # silence TensorFlow warnings
+
+import numpy as np
+import pandas as pd
+
+from dev import meter
+from dev.data import schema
+from dev.index import GameIndex
+
+model_paths = [
+    "dev/models/meter_lstm16d2.keras",
+    "dev/models/meter_ot_lstm16d1.keras",
+    "dev/models/one_hot_columns.json"
+]
+# pipeline outputs the curves are predicted from
+data_paths = ["data/games.parquet", "data/time_slices.parquet", "data/regular_ot_pbp.parquet", "data/playoff_ot_pbp.parquet"]
+
+def model_version(paths: list[str] = model_paths) -> str:
+    """Hash model files so that stored curves are invalidated when the models change.
+
+    Args:
+        paths (list[str], optional): Model and encoding files. Defaults to the shipped models.
+
+    Returns:
+        str: First 12 hex digits of the SHA-256 over all files
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()[:12]
+
+def version(paths: list[str] = model_paths, data: list[str] = data_paths) -> str:
+    """Hash of the model files and the size and modification time of each data file, so stored curves are
+    invalidated when the models change or the data pipeline rewrites its outputs.
+
+    Args:
+        paths (list[str], optional): Files hashed by content. Defaults to the shipped models.
+        data (list[str], optional): Files fingerprinted by size and modification time. Defaults to `data_paths`.
+
+    Returns:
+        str: First 12 hex digits of the SHA-256 over all files
+    """
+    digest = hashlib.sha256(model_version(paths).encode())
+    for path in data:
+        # reading every data file would slow down each server start
+        stat = Path(path).stat() if Path(path).exists() else None
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode() if stat else f"{path}:missing".encode())
+
+    return digest.hexdigest()[:12]
+
+def curve_path(version: str, data_path: Path = Path("data")) -> Path:
+    return data_path / "curves" / f"curves_{version}.parquet"
+
+def build_curves(games: pd.DataFrame, slices: pd.DataFrame | GameIndex, ot_pbp: pd.DataFrame | GameIndex,
+                 model_regulation, model_overtime, one_hot_columns: list[str], chunk_size: int = 2000) -> pd.DataFrame:
+    """Predict win probability curves for every game.
+
+    Args:
+        games (pd.DataFrame): NHL game metadata
+        slices (pd.DataFrame | GameIndex): regulation time slice data
+        ot_pbp (pd.DataFrame | GameIndex): overtime play-by-play data
+        model_regulation (Model): keras Model for regulation
+        model_overtime (Model): keras Model for overtime
+        one_hot_columns (list[str]): one-hot encoding columns from training
+        chunk_size (int, optional): Games predicted per batch. Defaults to 2000.
+
+    Returns:
+        pd.DataFrame: One row per data point, sorted by season and game
+    """
+    from tqdm import tqdm
+
+    games_index = GameIndex(games, "Game_Id", "Season")
+    if not isinstance(slices, GameIndex):
+        slices = GameIndex(slices)
+    if not isinstance(ot_pbp, GameIndex):
+        ot_pbp = GameIndex(ot_pbp)
+
+    pairs = list(zip(games["Game_Id"].tolist(), games["Season"].tolist()))
+
+    curves = []
+    for start in tqdm(range(0, len(pairs), chunk_size)):
+        chunk = pairs[start:start + chunk_size]
+        predictions = meter.predict_games(chunk, games_index, slices, ot_pbp, model_regulation, model_overtime, one_hot_columns)
+
+        for (game, season), (time_elapsed, probabilities, scores) in zip(chunk, predictions):
+            curves.append(pd.DataFrame({
+                "season": season,
+                "game": game,
+                "time_elapsed": time_elapsed,
+                "probability": probabilities,
+                "home_score": scores[0],
+                "away_score": scores[1]
+            }))
+
+    curves = pd.concat(curves, ignore_index=True)
+    return curves.sort_values(["season", "game"], kind="stable", ignore_index=True)
+
+def load_curves(path: Path) -> GameIndex | None:
+    """Read and index a curve store, or None if it has not been built for this model version."""
+    if not Path(path).exists():
+        return None
+
+    return GameIndex(pd.read_parquet(path))
+
+def lookup_curve(curves: GameIndex | None, game: int, season: int) -> tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray]] | None:
+    """Find a precomputed curve in the same format as `meter.predict_game`.
+
+    Args:
+        curves (GameIndex | None): curve store from `load_curves`
+        game (int): NHL Game ID
+        season (int): NHL season
+
+    Returns:
+        tuple | None: Time series, win probability, and scores, or None on a miss
+    """
+    if curves is None:
+        return None
+
+    selected_game = curves.get(game, season)
+    if selected_game.empty:
+        return None
+
+    scores = (selected_game["home_score"].values, selected_game["away_score"].values)
+    return (selected_game["time_elapsed"].values, selected_game["probability"].values, scores)
+
+if __name__ == "__main__":
+    from dev.inference import load_model
+
+    games = pd.read_parquet("data/games.parquet")
+    slices = GameIndex(schema.compact(pd.read_parquet("data/time_slices.parquet"), "time_slices"))
+    ot_pbp = GameIndex(schema.concat([
+        pd.read_parquet("data/regular_ot_pbp.parquet"),
+        pd.read_parquet("data/playoff_ot_pbp.parquet")
+    ], "regular_ot_pbp"))
+    one_hot_columns = json.load(open("dev/models/one_hot_columns.json", 'r'))
+    model_regulation = load_model(model_paths[0])
+    model_overtime = load_model(model_paths[1])
+
+    curves = build_curves(games, slices, ot_pbp, model_regulation, model_overtime, one_hot_columns)
+
+    path = curve_path(version())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    curves.to_parquet(path, index=False)
+    print(f"Wrote {len(curves)} data points for {len(games)} games to {path}")
@@ -1,51 +1,86 @@
 # for the current ML-focused state of this project, fixing IDs is not necessary as the model ignores individual players
-# my implementation is also extremely slow, which is why I had to throw 12 cores at it
+# missing IDs are filled with a join against the shifts, cheap enough to run in raw_to_reduced.py
 
 from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import pandas as pd
-from numpy import nan
 from tqdm import tqdm
 
 
-def fix_player_id(pbp: pd.DataFrame, shifts: pd.DataFrame, game_id: str, player_name: str, name_col: str, id_col: str) -> pd.DataFrame:
-    id_almost = shifts.loc[(shifts['Game_Id'] == game_id) & (shifts['Player'] == player_name)]  # rows matching given game with player name
-    try:
-        id = id_almost['Player_Id'].iloc[0]  # player has only one id, just grab first instance
-    except IndexError:
-        id = nan  # still missing
+def player_id_map(shifts: pd.DataFrame) -> pd.Series:
+    """Player ID for each (Game_Id, Player) in the shifts, the first instance if a name has more than one.
 
-    pbp.loc[(pbp['Game_Id'] == game_id) & (pbp[name_col] == player_name), id_col] = id  # replace all matching player null id with id from shift df
-    return pbp
+    Args:
+        shifts (pd.DataFrame): NHL shift data
+
+    Returns:
+        pd.Series: Player IDs indexed by game ID as a string and player name
+    """
+    pairs = shifts.dropna(subset=['Player']).drop_duplicates(['Game_Id', 'Player'])
+    return pd.Series(
+        pd.to_numeric(pairs['Player_Id'], errors='coerce').to_numpy(),
+        index=pd.MultiIndex.from_arrays([pairs['Game_Id'].astype(str), pairs['Player']])
+    )
+
+def fix_player_ids(pbp: pd.DataFrame, ids: pd.Series, name_col: str, id_col: str, skip: tuple[str, ...] = ()) -> int:
+    """Modifies pbp DataFrame in-place, filling one ID column from the shift IDs of players with a name but no ID.
+    Every play with the same game and name takes the shift ID, missing if the shifts don't have the player.
+
+    Args:
+        pbp (pd.DataFrame): NHL play-by-play data
+        ids (pd.Series): mapping from `player_id_map`
+        name_col (str): player name column
+        id_col (str): player ID column
+        skip (tuple[str, ...], optional): names that are not players. Defaults to ().
+
+    Returns:
+        int: Number of (game, player) pairs still missing an ID
+    """
+    keys = pd.MultiIndex.from_arrays([pbp['Game_Id'].astype(str), pbp[name_col]])
+    missing = pbp[id_col].isnull().to_numpy() & pbp[name_col].notnull().to_numpy() & ~pbp[name_col].isin(skip).to_numpy()
+    if not missing.any():
+        return 0
+
+    pairs = keys[missing].unique()
+    rows = keys.isin(pairs)
+    pbp.loc[rows, id_col] = ids.reindex(keys[rows]).to_numpy()
+
+    return int((~pairs.isin(ids.index)).sum())
+
+def fix_missing_ids(pbp: pd.DataFrame, shifts: pd.DataFrame) -> tuple[pd.DataFrame, dict[str, int]]:
+    """Fill missing on-ice and event player IDs from the shifts.
+
+    Args:
+        pbp (pd.DataFrame): NHL play-by-play data
+        shifts (pd.DataFrame): NHL shift data
+
+    Returns:
+        tuple[pd.DataFrame, dict[str, int]]: Play-by-play data, and (game, player) pairs still missing an ID for each column
+    """
+    ids = player_id_map(shifts)
+    unresolved = {}
 
-def fix_missing_ids(pbp: pd.DataFrame, shifts: pd.DataFrame) -> pd.DataFrame:
     # build list of player column labels to fix IDs for all players on ice
     s = ['homePlayer', 'awayPlayer']
     players = [f'{team}{ct}' for team in s for ct in range(1,7)]
 
     for p in players:
-        id_col = p + '_id'
-        rows = pbp.loc[(pbp[id_col].isnull()) & (pbp[p].notnull())]  # players with name but null id
-
-        for row in rows.itertuples(index=False):
-            pbp = fix_player_id(pbp, shifts, row.Game_Id, getattr(row, p), p, id_col)
+        unresolved[p + '_id'] = fix_player_ids(pbp, ids, p, p + '_id')
 
-    # fix IDs for players involved in event
+    # fix IDs for players involved in event, excluding team penalties
     for p in ['p1', 'p2', 'p3']:
-        id_col = p + '_ID'
-        name_col = p + '_name'
-        rows = pbp.loc[pbp[id_col].isnull() & pbp[name_col].notnull()]
-
-    for row in rows.itertuples(index=False):  # Use index=True to access the row index if needed
-        if (name := getattr(row, p + '_name')) == 'Team':  # Exclude team penalties
-            continue
-
-        pbp = fix_player_id(pbp, shifts, row.Game_Id, name, name_col, id_col)
+        unresolved[p + '_ID'] = fix_player_ids(pbp, ids, p + '_name', p + '_ID', skip=("Team",))
 
-    return pbp
+    return pbp, unresolved
 
 def clean_season(pbp_df: pd.DataFrame, shift_df: pd.DataFrame, fix_ids: bool = True) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # must fix IDs while the missing ones are still null
+    if fix_ids:
+        pbp_df, unresolved = fix_missing_ids(pbp_df, shift_df)
+        if sum(unresolved.values()):
+            print(f"{sum(unresolved.values())} player IDs not found in shifts: {unresolved}")
+
     # convert 'Period' column to string and ID columns to int
     pbp_df['Period'] = pbp_df['Period'].astype(int)
     shift_df['Period'] = shift_df['Period'].astype(int)
@@ -53,9 +88,6 @@ def clean_season(pbp_df: pd.DataFrame, shift_df: pd.DataFrame, fix_ids: bool = T
         if col.endswith('_id') or col.endswith('_ID'):
             pbp_df[col] = pbp_df[col].fillna(0).astype(int)
 
-    if fix_ids:
-        pbp_df = fix_missing_ids(pbp_df, shift_df)
-
     return pbp_df, shift_df
 
 if __name__ == '__main__':
@@ -68,7 +100,7 @@ if __name__ == '__main__':
     pbp_files = [f for f in Path(pbp_path).iterdir() if f.suffix == '.parquet' and 'game' in f.name]
     shift_files = [f for f in Path(pbp_path).iterdir() if f.suffix == '.parquet' and 'shift' in f.name]
 
-    # fix_ids True, will be slow
+    # fix_ids True
     with ProcessPoolExecutor(max_workers=12) as executor:
         futures = executor.map(clean_season, pbp_files, shift_files)
         results = list(tqdm(futures, total=len(pbp_files)))
@@ -1,52 +1,167 @@
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from elosports.elo import Elo
 
+elo_columns = ["Away_Starting_Elo", "Home_Starting_Elo", "Away_Ending_Elo", "Home_Ending_Elo"]
 
-def add_and_run_elo_by_season(games: pd.DataFrame) -> pd.DataFrame:
-    df = games.copy()
-    
-    # add Elo columns and initialize all to zero
-    df["Away_Starting_Elo"] = 0.0
-    df["Home_Starting_Elo"] = 0.0
-    df["Away_Ending_Elo"] = 0.0
-    df["Home_Ending_Elo"] = 0.0
-
-    # create league
-    league = Elo(k = 20)
-    for t in df['Home_Team'].unique():
-        league.addPlayer(t)
-
-    season = df["Season"].min()  # likely 2007
-    for row in df.itertuples(index=True):
-        # see https://github.com/ddm7018/Elo/blob/master/tutorial/elo_simulations.py
-        if row.Season > season:
-            for key in league.ratingDict.keys():
-                # year that Thrashers moved to Winnipeg, copy Elo
-                if key == 'WPG' and season == 2011:
-                    league.ratingDict['WPG'] = league.ratingDict['ATL']
-                league.ratingDict[key] = league.ratingDict[key] - ((league.ratingDict[key] - 1500) * (1/3.))
+# year that Thrashers moved to Winnipeg, copy Elo
+relocations = {2011: ("ATL", "WPG")}
+
+def expected_result(p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
+    """Probability that p1 beats p2, same as `elosports.elo.Elo.expectResult`."""
+    exp = (p2 - p1) / 400.0
+    # float_power matches Python's `**` exactly, the SIMD `np.power` can differ in the last bit
+    return 1 / (np.float_power(10.0, exp) + 1)
+
+def config_grid(k: list[float], regression: list[float]) -> tuple[np.ndarray, np.ndarray]:
+    """Every combination of K-factor and season regression, as two arrays of configurations."""
+    k, regression = np.meshgrid(np.asarray(k, dtype=np.float64), np.asarray(regression, dtype=np.float64), indexing="ij")
+    return k.ravel(), regression.ravel()
+
+def encode_teams(games: pd.DataFrame, teams: list[str] | None = None) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """Integer codes for each game's teams.
+
+    Args:
+        games (pd.DataFrame): NHL game metadata
+        teams (list[str] | None, optional): Teams that already have codes, in order. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, list[str]]: Home and away team codes, and the team for each code,
+            new teams added in order of their first home game and then their first away game
+    """
+    teams = list(dict.fromkeys(list(teams or []) + list(games["Home_Team"].unique()) + list(games["Away_Team"].unique())))
+    codes = pd.Index(teams)
+    return codes.get_indexer(games["Home_Team"]), codes.get_indexer(games["Away_Team"]), teams
+
+def relocation_codes(teams: list[str]) -> dict[int, tuple[int, int]]:
+    return {season: (teams.index(source), teams.index(target))
+            for season, (source, target) in relocations.items() if source in teams and target in teams}
+
+def run_ratings(home: np.ndarray, away: np.ndarray, home_won: np.ndarray, seasons: np.ndarray, ratings: np.ndarray, season: int,
+                k: np.ndarray, regression: np.ndarray, relocated: dict[int, tuple[int, int]] | None = None,
+                homefield: float = 100) -> tuple[np.ndarray, dict[int, tuple[int, np.ndarray]]]:
+    """Elo for integer coded teams, with a column of ratings for each (K, regression) configuration.
+    Games are played in order, regressing every rating toward 1500 when the season changes.
+
+    Args:
+        home (np.ndarray): home team code of each game
+        away (np.ndarray): away team code of each game
+        home_won (np.ndarray): whether the home team won each game
+        seasons (np.ndarray): season of each game
+        ratings (np.ndarray): ratings with shape (teams, configs) after the last game of `season`, updated in place
+        season (int): season of `ratings`
+        k (np.ndarray): K-factor of each configuration
+        regression (np.ndarray): fraction of the distance to 1500 removed at each new season, for each configuration
+        relocated (dict[int, tuple[int, int]] | None, optional): team codes whose ratings are copied at the end of a season,
+            like a relocated franchise. Defaults to None.
+        homefield (float, optional): rating added to the home team. Defaults to 100.
+
+    Returns:
+        tuple[np.ndarray, dict[int, tuple[int, np.ndarray]]]: Ratings with shape (games, 4, configs), ordered like `elo_columns`,
+            and the last game and ratings at the end of each season
+    """
+    relocated = relocated or {}
+    history = np.empty((len(home), 4, ratings.shape[1]))
+    season_ends = {}
+
+    for i in range(len(home)):
+        if seasons[i] > season:
+            if i > 0:
+                season_ends[int(season)] = (i - 1, ratings.copy())
+            # same order as regressing each team in turn, the copy happens when the new team is reached
+            ratings -= (ratings - 1500) * regression
+            if season in relocated:
+                source, target = relocated[season]
+                ratings[target] = ratings[source] - ((ratings[source] - 1500) * regression) if source < target else ratings[source]
             season += 1
 
-        df.loc[row.Index, 'Away_Starting_Elo'] = league.ratingDict[row.Away_Team]
-        df.loc[row.Index, 'Home_Starting_Elo'] = league.ratingDict[row.Home_Team]
+        h, a = home[i], away[i]
+        history[i, 0] = ratings[a]
+        history[i, 1] = ratings[h]
 
-        if row.Away_Score > row.Home_Score:
-            league.gameOver(row.Away_Team, row.Home_Team, False)
+        if home_won[i]:
+            result = expected_result(ratings[h] + homefield, ratings[a])
+            ratings[h] = ratings[h] + k * (1 - result)
+            ratings[a] = ratings[a] + k * (0 - (1 - result))
         else:
-            league.gameOver(row.Home_Team, row.Away_Team, True)
+            result = expected_result(ratings[a], ratings[h] + homefield)
+            ratings[a] = ratings[a] + k * (1 - result)
+            ratings[h] = ratings[h] + k * (0 - (1 - result))
+
+        history[i, 2] = ratings[a]
+        history[i, 3] = ratings[h]
+
+    if len(home):
+        season_ends[int(season)] = (len(home) - 1, ratings.copy())
+
+    return history, season_ends
 
-        df.loc[row.Index, 'Away_Ending_Elo'] = league.ratingDict[row.Away_Team]
-        df.loc[row.Index, 'Home_Ending_Elo'] = league.ratingDict[row.Home_Team]
+def elo_sweep(games: pd.DataFrame, k: np.ndarray, regression: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Pregame ratings for many (K, regression) configurations in one pass over the games.
 
-    return df
+    Args:
+        games (pd.DataFrame): NHL game metadata, in order
+        k (np.ndarray): K-factor of each configuration
+        regression (np.ndarray): season regression of each configuration
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Away and home starting Elo with shape (games, configs)
+    """
+    k = np.asarray(k, dtype=np.float64)
+    regression = np.asarray(regression, dtype=np.float64)
+    home, away, teams = encode_teams(games)
+
+    ratings = np.full((len(teams), len(k)), 1500.0)
+    history, _ = run_ratings(home, away, (games["Away_Score"] <= games["Home_Score"]).to_numpy(), games["Season"].to_numpy(),
+                             ratings, games["Season"].min(), k, regression, relocation_codes(teams))
+
+    return history[:, 0], history[:, 1]
+
+def run_elo(games: pd.DataFrame, ratings: dict[str, float] | None = None, season: int | None = None,
+            k: float = 20, regression: float = 1/3.) -> tuple[pd.DataFrame, dict[int, dict]]:
+    """Add starting and ending Elo to each game, optionally resuming from a checkpoint of a previous run.
+
+    Args:
+        games (pd.DataFrame): NHL game metadata, in order
+        ratings (dict[str, float] | None, optional): Team ratings after the last game of `season`. Defaults to None, starting all teams at 1500.
+        season (int | None, optional): Season of the checkpoint, before regressing toward the mean for the next season.
+            Defaults to the first season in games.
+        k (float, optional): K-factor. Defaults to 20.
+        regression (float, optional): Fraction of the distance to 1500 removed at each new season. Defaults to 1/3.
+
+    Returns:
+        tuple[pd.DataFrame, dict[int, dict]]: Games with Elo, and a checkpoint of the ratings and last game after each season
+    """
+    df = games.copy()
+    ratings = ratings or {}
+    home, away, teams = encode_teams(df, list(ratings))
+    table = np.array([[ratings.get(team, 1500)] for team in teams], dtype=np.float64).reshape(len(teams), 1)
+
+    season = df["Season"].min() if season is None else season  # likely 2007
+    # away team wins, otherwise the home team
+    history, season_ends = run_ratings(home, away, (df["Away_Score"] <= df["Home_Score"]).to_numpy(), df["Season"].to_numpy(),
+                                       table, season, np.array([k], dtype=np.float64), np.array([regression]), relocation_codes(teams))
+
+    for i, column in enumerate(elo_columns):
+        df[column] = history[:, i, 0]
+
+    game_ids = df["Game_Id"].to_numpy()
+    checkpoints = {
+        season: {"game": int(game_ids[i]), "ratings": {team: float(rating) for team, rating in zip(teams, end[:, 0])}}
+        for season, (i, end) in season_ends.items()
+    }
+
+    return df, checkpoints
+
+def add_and_run_elo_by_season(games: pd.DataFrame) -> pd.DataFrame:
+    return run_elo(games)[0]
 
 if __name__ == "__main__":
     # data folder path
     current_file_path = Path(__file__).resolve()
     data_path = current_file_path.parent / '..' / '..' / 'data'
     games = pd.read_parquet(data_path / 'games.parquet')
-    
+
     df = add_and_run_elo_by_season(games)
     df.to_parquet(data_path / 'game_elo.parquet', index=False)
@@ -0,0 +1,18 @@
+# Small JSON state files shared by the data pipeline and the scraper, like manifests and scrape progress
+import json
+import os
+from pathlib import Path
+
+def load_json(path: Path, default: dict) -> dict:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+def save_json(value: dict, path: Path):
+    # write then rename so an interrupted run leaves the previous version
+    temp = path.with_suffix(".tmp")
+    with open(temp, "w") as f:
+        json.dump(value, f)
+    os.replace(temp, path)
@@ -0,0 +1,343 @@
+# Runs the raw_to_reduced stages one season file per process, with Elo as the only sequential step
+# each run only processes games that are new or changed since the last, tracked in data/partitions/manifest.json
+# run from the project root: python -m dev.data.pipeline --workers 8
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from dev.data import clean, elo, schema, slice_and_reduce, tidy
+from dev.data.json_files import load_json, save_json
+
+reduced_names = ["regulation_pbp", "regular_ot_pbp", "playoff_ot_pbp"]
+elo_columns = ["Away_Starting_Elo", "Home_Starting_Elo"]
+
+def season_files(pbp_path: Path) -> dict[int, tuple[Path, Path]]:
+    """Pair each season's play-by-play and shift files by the year in their names, like `game_2007.parquet` and `shift_2007.parquet`.
+
+    Args:
+        pbp_path (Path): folder of scraped season files
+
+    Returns:
+        dict[int, tuple[Path, Path]]: Play-by-play and shift file for each season, in order
+    """
+    files = {"game": {}, "shift": {}}
+    for f in Path(pbp_path).iterdir():
+        match = re.search(r"(game|shift)_(\d{4})", f.name)
+        if f.suffix == ".parquet" and match:
+            files[match.group(1)][int(match.group(2))] = f
+
+    return {year: (files["game"][year], files["shift"][year]) for year in sorted(files["game"]) if year in files["shift"]}
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def game_hashes(pbp: pd.DataFrame, shifts: pd.DataFrame) -> dict[str, str]:
+    """Fingerprint of each game's play-by-play and shift rows, to find the games that changed within a season file.
+
+    Args:
+        pbp (pd.DataFrame): scraped play-by-play data
+        shifts (pd.DataFrame): scraped shift data
+
+    Returns:
+        dict[str, str]: Hash for each game ID
+    """
+    digests = {}
+    for frame in [pbp, shifts]:
+        rows = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+        for game, positions in frame.groupby(frame["Game_Id"].astype(str)).indices.items():
+            digests.setdefault(game, hashlib.sha256()).update(rows[positions].tobytes())
+
+    return {game: digest.hexdigest() for game, digest in digests.items()}
+
+def partition_path(data_path: Path, name: str, year: int) -> Path:
+    return data_path / "partitions" / name / str(year)
+
+def write_partition(frame: pd.DataFrame, data_path: Path, name: str, year: int, run: int, append: bool = True):
+    """Write a stage's output for a season file as a new part, or replace all of its parts.
+
+    Args:
+        frame (pd.DataFrame): stage output
+        data_path (Path): data folder
+        name (str): stage output name
+        year (int): season file
+        run (int): pipeline run, rerunning after an interruption overwrites the same part
+        append (bool, optional): Keep the parts from previous runs. Defaults to True.
+    """
+    path = partition_path(data_path, name, year)
+    if not append and path.exists():
+        shutil.rmtree(path)
+    path.mkdir(parents=True, exist_ok=True)
+    schema.compact(frame, name).to_parquet(path / f"{run:05d}.parquet", index=False)
+
+def read_partition(data_path: Path, name: str, year: int, run: int | None = None) -> pd.DataFrame:
+    """All parts of a stage's output for a season file in the order written, or only the part from one run."""
+    path = partition_path(data_path, name, year)
+    parts = [path / f"{run:05d}.parquet"] if run is not None else sorted(path.glob("*.parquet"))
+    return schema.concat([pd.read_parquet(part) for part in parts], name)
+
+def tidy_season(year: int, pbp_file: Path, shift_file: Path, data_path: Path, run: int, known: dict[str, str]) -> tuple[dict, dict]:
+    """Clean and tidy the new games in one season file, appending them to its partitions.
+    If any game was changed or removed, the whole file is tidied again instead.
+
+    Args:
+        year (int): season file
+        pbp_file (Path): scraped play-by-play file
+        shift_file (Path): scraped shift file
+        data_path (Path): data folder
+        run (int): pipeline run
+        known (dict[str, str]): game hashes from the last run
+
+    Returns:
+        tuple[dict, dict]: Game hashes, the (season, game) keys tidied, and whether the file was rebuilt,
+            with seconds spent in each stage
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    pbp = pd.read_parquet(pbp_file)
+    shifts = pd.read_parquet(shift_file)
+    hashes = game_hashes(pbp, shifts)
+
+    rebuild = any(hashes.get(game) != value for game, value in known.items())
+    if not rebuild:
+        new = set(hashes) - set(known)
+        if not new:
+            return {"hashes": hashes, "games": [], "rebuild": False}, timings
+        pbp = pbp[pbp["Game_Id"].astype(str).isin(new)].reset_index(drop=True)
+        shifts = shifts[shifts["Game_Id"].astype(str).isin(new)].reset_index(drop=True)
+
+    pbp, _ = clean.clean_season(pbp, shifts, fix_ids=True)
+    timings["clean"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pbp, games, players = tidy.tidy_pbp(pbp, season=year)
+    write_partition(pbp, data_path, "pbp_reduced", year, run, append=not rebuild)
+    write_partition(games, data_path, "games", year, run, append=not rebuild)
+    write_partition(players, data_path, "players", year, run, append=not rebuild)
+    timings["tidy"] = time.perf_counter() - start
+
+    keys = list(zip(games["Season"].tolist(), games["Game_Id"].tolist()))
+    return {"hashes": hashes, "games": keys, "rebuild": rebuild}, timings
+
+def update_elo(games: pd.DataFrame, affected: set, previous: pd.DataFrame | None, checkpoints: dict[int, dict]) -> tuple[pd.DataFrame, dict[int, dict], set]:
+    """Elo for every game, only replaying the games after the latest checkpoint preceding the first affected game.
+
+    Args:
+        games (pd.DataFrame): NHL game metadata, in order
+        affected (set): (season, game) keys of new or changed games
+        previous (pd.DataFrame | None): games with Elo from the last run
+        checkpoints (dict[int, dict]): ratings after the last game of each season from the last run
+
+    Returns:
+        tuple[pd.DataFrame, dict[int, dict], set]: Games with Elo, updated checkpoints, and keys of games whose Elo is new or changed
+    """
+    keys = list(zip(games["Season"].tolist(), games["Game_Id"].tolist()))
+    first = next((i for i, key in enumerate(keys) if key in affected), len(keys))
+
+    resume = None
+    if previous is not None:
+        position = {key: i for i, key in enumerate(keys[:first])}
+        previous_keys = list(zip(previous["Season"].tolist(), previous["Game_Id"].tolist()))
+        valid = [(position[(season, c["game"])], season) for season, c in checkpoints.items() if (season, c["game"]) in position]
+        # games up to the checkpoint must be exactly those rated last run
+        resume = max([(i, season) for i, season in valid if previous_keys[:i + 1] == keys[:i + 1]], default=None)
+
+    if resume is None:
+        result, checkpoints = elo.run_elo(games)
+        replayed = result
+    else:
+        i, season = resume
+        replayed, replayed_checkpoints = elo.run_elo(games.iloc[i + 1:], checkpoints[season]["ratings"], season)
+        result = pd.concat([previous.iloc[:i + 1], replayed], ignore_index=True)
+        checkpoints = {s: c for s, c in checkpoints.items() if s < season} | replayed_checkpoints
+
+    refreshed = set(zip(replayed["Season"].tolist(), replayed["Game_Id"].tolist()))
+    if previous is not None:
+        same = replayed.merge(previous[["Season", "Game_Id"] + elo_columns], on=["Season", "Game_Id"] + elo_columns)
+        refreshed -= set(zip(same["Season"].tolist(), same["Game_Id"].tolist()))
+
+    return result.reset_index(drop=True), checkpoints, refreshed
+
+def slice_and_reduce_season(year: int, games: pd.DataFrame, data_path: Path, run: int, append: bool) -> dict:
+    """Slice and reduce one season file's play-by-play with its games' Elo, writing each output partition.
+
+    Args:
+        year (int): season file
+        games (pd.DataFrame): games with Elo to process from the season file, and the last file each was found in
+        data_path (Path): data folder
+        run (int): pipeline run
+        append (bool): only process the play-by-play tidied this run and append the outputs
+
+    Returns:
+        dict: Seconds spent in each stage
+    """
+    timings = {}
+    pbp = read_partition(data_path, "pbp_reduced", year, run if append else None)
+
+    # the combined games table only has the last file's copy of a game split across files, and slicing matches its date
+    sliced = games["Last_File"] == year
+    games = games.drop(columns="Last_File")
+
+    start = time.perf_counter()
+    write_partition(slice_and_reduce.slice_regulation(games[sliced], pbp), data_path, "time_slices", year, run, append)
+    timings["slice"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name, events in zip(reduced_names, slice_and_reduce.reduce_all(games, pbp)):
+        write_partition(events, data_path, name, year, run, append)
+    timings["reduce"] = time.perf_counter() - start
+
+    return timings
+
+def combine_partitions(data_path: Path, name: str, years: list[int], sort: bool = True) -> pd.DataFrame:
+    """Concatenate a stage's season partitions in the same order as the serial pipeline.
+
+    Args:
+        data_path (Path): data folder
+        name (str): stage output name
+        years (list[int]): seasons in order
+        sort (bool, optional): Order by season and game, since a season file can hold games from the next season
+            (the 2020 bubble playoffs) and new games are appended. Defaults to True.
+
+    Returns:
+        pd.DataFrame: Combined stage output
+    """
+    frame = schema.concat([read_partition(data_path, name, year) for year in years], name)
+    if sort:
+        frame = frame.sort_values(["season", "game"], kind="stable", ignore_index=True)
+    return frame
+
+def run_pipeline(data_path: Path, workers: int | None = None, full: bool = False) -> dict[str, float]:
+    """Clean, tidy, Elo, slice, and reduce the new or changed games in the scraped season files,
+    writing the same files as `raw_to_reduced.py` along with per-season partitions under `data/partitions`.
+
+    Elo resumes from the ratings checkpointed after the last game rated, unless an earlier game changed.
+
+    Args:
+        data_path (Path): data folder containing the scraped `pbp` folder
+        workers (int | None, optional): Worker processes, defaults to the number of CPUs.
+        full (bool, optional): Discard the partitions and process every game again. Defaults to False.
+
+    Returns:
+        dict[str, float]: Wall time of each stage and summed worker time of the parallel stages, in seconds
+    """
+    partitions = data_path / "partitions"
+    if full and partitions.exists():
+        shutil.rmtree(partitions)
+    partitions.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_json(partitions / "manifest.json", {"run": 0, "files": {}})
+    checkpoints = {int(season): c for season, c in load_json(partitions / "elo_checkpoints.json", {}).items()}
+    run = manifest["run"] + 1
+
+    files = season_files(data_path / "pbp")
+    years = list(files)
+    fingerprints = {year: {"game": file_hash(game_file), "shift": file_hash(shift_file)} for year, (game_file, shift_file) in files.items()}
+    changed = [year for year in years
+               if {key: manifest["files"].get(str(year), {}).get(key) for key in ["game", "shift"]} != fingerprints[year]]
+    timings = {}
+
+    def record(stage: str, start: float, worker_timings: list[dict]):
+        timings[f"{stage} wall"] = time.perf_counter() - start
+        for worker in worker_timings:
+            for key, seconds in worker.items():
+                timings[key] = timings.get(key, 0.0) + seconds
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        print(f"Cleaning and tidying {len(changed)} of {len(years)} season files...")
+        start = time.perf_counter()
+        results = list(executor.map(tidy_season, changed, [files[year][0] for year in changed], [files[year][1] for year in changed],
+                                    [data_path] * len(changed), [run] * len(changed),
+                                    [manifest["files"].get(str(year), {}).get("games", {}) for year in changed]))
+        record("clean and tidy", start, [result[1] for result in results])
+
+        results = {year: result[0] for year, result in zip(changed, results)}
+        for year, result in results.items():
+            manifest["files"][str(year)] = fingerprints[year] | {"games": result["hashes"]}
+        affected = {tuple(key) for result in results.values() for key in result["games"]}
+        rebuilt = {year for year, result in results.items() if result["rebuild"]}
+
+        if not affected and not rebuilt:
+            print("No new or changed games")
+            manifest["run"] = run
+            save_json(manifest, partitions / "manifest.json")
+            return timings
+
+        print(f"Generating Elo for {len(affected)} new or changed games...")
+        start = time.perf_counter()
+        season_games = {year: read_partition(data_path, "games", year) for year in years}
+        # a game split across files is kept from the last file, like grouping the combined play-by-play
+        games = pd.concat(season_games.values(), ignore_index=True)
+        games = games.drop_duplicates(["Season", "Game_Id"], keep="last").sort_values(["Season", "Game_Id"], kind="stable", ignore_index=True)
+        games.to_parquet(data_path / "games.parquet", index=False)
+
+        players = pd.concat([read_partition(data_path, "players", year) for year in years], ignore_index=True).drop_duplicates()
+        players.to_parquet(data_path / "players.parquet", index=False)
+
+        # only trust the last Elo table if it was written along with the checkpoints
+        previous = pd.read_parquet(data_path / "game_elo.parquet") if checkpoints else None
+        games, checkpoints, refreshed = update_elo(games, affected, previous, checkpoints)
+        games.to_parquet(data_path / "game_elo.parquet", index=False)
+        timings["elo wall"] = time.perf_counter() - start
+
+        print(f"Slicing and reducing play-by-play for {len(refreshed)} games...")
+        start = time.perf_counter()
+        last_file = pd.concat([frame[["Season", "Game_Id"]].assign(Last_File=year) for year, frame in season_games.items()])
+        last_file = last_file.drop_duplicates(["Season", "Game_Id"], keep="last")
+
+        shards = {}
+        for year, frame in season_games.items():
+            keys = list(zip(frame["Season"].tolist(), frame["Game_Id"].tolist()))
+            new = set(results[year]["games"]) if year in results else set()
+            if not set(keys) & (refreshed | new):
+                continue
+
+            # append only when none of the file's earlier games changed
+            append = year not in rebuilt and not set(keys) & refreshed - new
+            shard = frame[["Season", "Game_Id"]]
+            if append:
+                shard = shard[[key in new for key in keys]]
+            shards[year] = (shard.merge(games, on=["Season", "Game_Id"]).merge(last_file, on=["Season", "Game_Id"]), append)
+
+        worker_timings = executor.map(slice_and_reduce_season, list(shards), [shard for shard, _ in shards.values()],
+                                      [data_path] * len(shards), [run] * len(shards), [append for _, append in shards.values()])
+        record("slice and reduce", start, list(worker_timings))
+
+    print("Combining partitions...")
+    start = time.perf_counter()
+    combine_partitions(data_path, "pbp_reduced", years, sort=False).to_parquet(data_path / "pbp_reduced.parquet", index=False)
+    combine_partitions(data_path, "time_slices", years).to_parquet(data_path / "time_slices.parquet")
+    for name in reduced_names:
+        combine_partitions(data_path, name, years).to_parquet(data_path / f"{name}.parquet")
+    timings["combine wall"] = time.perf_counter() - start
+
+    # checkpoints first, a run interrupted before the manifest is saved is repeated
+    save_json({str(season): c for season, c in checkpoints.items()}, partitions / "elo_checkpoints.json")
+    manifest["run"] = run
+    save_json(manifest, partitions / "manifest.json")
+
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--data-path", type=Path, default=Path(__file__).resolve().parent / '..' / '..' / 'data')
+    parser.add_argument("--full", action="store_true", help="discard the partitions and process every game again")
+    args = parser.parse_args()
+
+    timings = run_pipeline(args.data_path, args.workers, args.full)
+
+    width = max([len(stage) for stage in timings], default=0)
+    for stage, seconds in timings.items():
+        print(f"{stage:<{width}}  {seconds:8.2f}s")
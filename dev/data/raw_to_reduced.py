@@ -5,6 +5,7 @@ from pathlib import Path
 import clean
 import elo
 import pandas as pd
+import schema
 import slice_and_reduce
 import tidy
 
@@ -23,7 +24,7 @@ for pbp, shift in zip(pbp_files, shift_files):
     pbp_df, shift_df = clean.clean_season(
         pd.read_parquet(pbp),
         pd.read_parquet(shift),
-        fix_ids=False
+        fix_ids=True
     )
 
     pbp_list.append(pbp_df)
@@ -49,17 +50,10 @@ games.to_parquet(data_path / 'game_elo.parquet', index=False)
 # slice and reduce
 print("Generating regulation game state slices...")
 slices = slice_and_reduce.slice_regulation(games, pbp)
-slices.to_parquet(data_path / "time_slices.parquet")
+schema.compact(slices, "time_slices").to_parquet(data_path / "time_slices.parquet")
 
 print("Reducing play-by-play for overtime training...")
-regulation = games[games["Period"] < 4]
-events = slice_and_reduce.reduce_regulation(regulation, pbp)
-events.to_parquet(data_path / "regulation_pbp.parquet")
-
-regular_ot = games[(games["Period"] >= 4) & (games["Playoff"] == False)]
-events = slice_and_reduce.reduce_regular_overtime(regular_ot, pbp)
-events.to_parquet(data_path / "regular_ot_pbp.parquet")
-
-playoff_ot = games[(games["Period"] >= 4) & (games["Playoff"] == True)]
-events = slice_and_reduce.reduce_playoff_overtime(playoff_ot, pbp)
-events.to_parquet(data_path / "playoff_ot_pbp.parquet")
+regulation, regular_ot, playoff_ot = slice_and_reduce.reduce_all(games, pbp)
+schema.compact(regulation, "regulation_pbp").to_parquet(data_path / "regulation_pbp.parquet")
+schema.compact(regular_ot, "regular_ot_pbp").to_parquet(data_path / "regular_ot_pbp.parquet")
+schema.compact(playoff_ot, "playoff_ot_pbp").to_parquet(data_path / "playoff_ot_pbp.parquet")
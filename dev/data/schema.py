@@ -0,0 +1,120 @@
+# Compact column types for the time slices and reduced play-by-play, set when the files are written and again when they are read
+# every server worker holds these frames, so float32 and small integers instead of 64-bit columns and categoricals instead of strings
+# report the memory saved from the project root: python -m dev.data.schema
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+# Elo and times only need float32, which is also what the models compute in
+# scores and strength fit in int8, penalty minutes, hits, and shots in int16 even for the longest games
+time_slices = {
+    "game": "int32",
+    "season": "int16",
+    "time_remaining": "float32",
+    "away_elo": "float32",
+    "home_elo": "float32",
+    "away_score": "int8",
+    "home_score": "int8",
+    "away_pim": "int16",
+    "home_pim": "int16",
+    "away_hits": "int16",
+    "home_hits": "int16",
+    "away_shots": "int16",
+    "home_shots": "int16",
+    "strength": "int8",
+    "winner": "category"
+}
+
+reduced_pbp = {
+    "game": "int32",
+    "season": "int16",
+    "away_elo": "float32",
+    "home_elo": "float32",
+    "time_remaining": "float32",
+    "seconds_elapsed": "float32",
+    "event": "category",
+    "team": "category",
+    "event_zone": "category",
+    "home_zone": "category",
+    "strength": "category",
+    "winner": "category"
+}
+
+schemas = {
+    "time_slices": time_slices,
+    "regulation_pbp": reduced_pbp,
+    "regular_ot_pbp": reduced_pbp,
+    "playoff_ot_pbp": reduced_pbp
+}
+
+def apply(frame: pd.DataFrame, schema: dict[str, str]) -> pd.DataFrame:
+    """Cast the columns of a frame that are in a schema, leaving any others unchanged.
+
+    Args:
+        frame (pd.DataFrame): time slices or reduced play-by-play
+        schema (dict[str, str]): dtype of each column, like `time_slices`
+
+    Returns:
+        pd.DataFrame: Frame with compact columns
+    """
+    return frame.astype({column: dtype for column, dtype in schema.items() if column in frame.columns})
+
+def compact(frame: pd.DataFrame, name: str) -> pd.DataFrame:
+    """Apply the schema of a data file by name, like `time_slices`, returning other frames unchanged."""
+    return apply(frame, schemas.get(name, {}))
+
+def concat(frames: list[pd.DataFrame], name: str) -> pd.DataFrame:
+    """Concatenate parts of a data file, whose categoricals can have different categories, and apply its schema."""
+    frames = [frame.astype({column: object for column, dtype in frame.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)})
+              for frame in frames]
+    return compact(pd.concat(frames, ignore_index=True), name)
+
+def memory_usage(frame: pd.DataFrame) -> int:
+    """Bytes held by a frame, including the strings in object columns."""
+    return int(frame.memory_usage(deep=True).sum())
+
+def default_types(frame: pd.DataFrame) -> pd.DataFrame:
+    """Frame with the types pandas uses unless told otherwise, 64-bit numbers and strings as objects."""
+    types = {}
+    for column, dtype in frame.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            types[column] = object
+        elif dtype.kind == "f":
+            types[column] = "float64"
+        elif dtype.kind in "iu":
+            types[column] = "int64"
+
+    return frame.astype(types)
+
+def memory_report(data_path: Path = Path("data")) -> pd.DataFrame:
+    """Memory of each file's frame as read with default types and with its schema.
+
+    Args:
+        data_path (Path, optional): data folder. Defaults to Path("data").
+
+    Returns:
+        pd.DataFrame: Rows and megabytes before and after for each file found
+    """
+    rows = []
+    for name, schema in schemas.items():
+        path = data_path / f"{name}.parquet"
+        if not path.exists():
+            continue
+
+        # the file may have been written with either types
+        frame = default_types(pd.read_parquet(path))
+        before = memory_usage(frame)
+        after = memory_usage(apply(frame, schema))
+        rows.append({"file": name, "rows": len(frame), "before_mb": before / 1e6, "after_mb": after / 1e6, "ratio": before / after})
+
+    return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", type=Path, default=Path("data"))
+    args = parser.parse_args()
+
+    report = memory_report(args.data_path)
+    print(report.to_string(index=False, float_format="{:.1f}".format))
+    print(f"total: {report['before_mb'].sum():.1f} MB -> {report['after_mb'].sum():.1f} MB per worker")
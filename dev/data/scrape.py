@@ -1,24 +1,290 @@
+# Scrapes each game with a pool of threads under one rate limit, saving every game to data/scrape as soon as it arrives
+# an interrupted run resumes from data/scrape/<season>/progress.json, only fetching the games not yet saved
+# run from the project root: python -m dev.data.scrape --seasons 2007 2023 --workers 4 --rate 1
+import argparse
+import io
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from typing import Protocol
 
-import hockey_scraper
 import pandas as pd
 
-current_file_path = Path(__file__).resolve()
-data_path = current_file_path.parent / '..' / '..' / 'data'
+from dev.data.json_files import load_json, save_json
 
-for y in range(2007,2024):
-    try:
-        scraped = hockey_scraper.scrape_seasons([y], True, data_format='pandas')
-        # scraped = hockey_scraper.scrape_date_range('2017-12-08', '2017-12-08', True, data_format='pandas')  # includes four players with missing IDs for testing
 
-        shifts = scraped['shifts']
-        pbp = scraped['pbp']
+class Fetcher(Protocol):
+    def schedule(self, season: int) -> list[dict]:
+        """Game ID and date of each completed game in a season."""
 
-        shifts['Period'] = pd.to_numeric(shifts['Period'], errors='coerce')
-        pbp['Period'] = pd.to_numeric(pbp['Period'], errors='coerce')
+    def game(self, game: dict) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
+        """Play-by-play and shifts for one game from `schedule`, None if the game could not be scraped."""
 
-        shifts.to_parquet(data_path / f'shift_{y}.parquet')
-        pbp.to_parquet(data_path / f'game_{y}.parquet')
+class HockeyScraperFetcher:
+    """Scrapes from the NHL API with hockey_scraper, one game per call."""
 
-    except TimeoutError:
-        continue
+    def __init__(self):
+        # only needed when scraping the NHL API, not when replaying recorded games
+        from hockey_scraper.nhl import json_schedule, scrape_functions
+        from hockey_scraper.utils import shared
+
+        self.json_schedule = json_schedule
+        self.scrape_functions = scrape_functions
+        self.shared = shared
+
+    def schedule(self, season: int) -> list[dict]:
+        # same bounds as hockey_scraper.scrape_seasons
+        from_date = self.shared.season_start_bound(season)
+        to_date = self.shared.season_end_bound(str(season + 1)).strftime("%Y-%m-%d")
+        return [{"game_id": int(game["game_id"]), "date": game["date"]} for game in self.json_schedule.scrape_schedule(from_date, to_date)]
+
+    def game(self, game: dict) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
+        # same per-game steps as hockey_scraper.scrape_games, without looking up the date again
+        return self.scrape_functions.scrape_list_of_games([game], True)
+
+class ReplayFetcher:
+    """Fetches games recorded by `RecordingFetcher` from a server like `serve`, as a local stand-in for the NHL API."""
+
+    def __init__(self, url: str, timeout: float = 30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def get(self, path: str) -> bytes:
+        with urllib.request.urlopen(f"{self.url}/{path}", timeout=self.timeout) as response:
+            return response.read()
+
+    def schedule(self, season: int) -> list[dict]:
+        return json.loads(self.get(f"schedule/{season}.json"))
+
+    def game(self, game: dict) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
+        return tuple(pd.read_parquet(io.BytesIO(self.get(f"games/{game['game_id']}/{name}.parquet"))) for name in ["pbp", "shifts"])
+
+class RecordingFetcher:
+    """Saves each response from another fetcher in the layout served by `serve`."""
+
+    def __init__(self, fetcher: Fetcher, path: Path):
+        self.fetcher = fetcher
+        self.path = Path(path)
+
+    def schedule(self, season: int) -> list[dict]:
+        games = self.fetcher.schedule(season)
+        (self.path / "schedule").mkdir(parents=True, exist_ok=True)
+        save_json(games, self.path / "schedule" / f"{season}.json")
+        return games
+
+    def game(self, game: dict) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
+        pbp, shifts = self.fetcher.game(game)
+        if pbp is not None and shifts is not None:
+            path = self.path / "games" / str(game["game_id"])
+            path.mkdir(parents=True, exist_ok=True)
+            pbp.to_parquet(path / "pbp.parquet")
+            shifts.to_parquet(path / "shifts.parquet")
+        return pbp, shifts
+
+def serve(path: Path, port: int = 0) -> ThreadingHTTPServer:
+    """Serve recorded games over HTTP from a background thread, call `shutdown` on the result to stop.
+
+    Args:
+        path (Path): recordings from `RecordingFetcher`
+        port (int, optional): Port to listen on. Defaults to 0, any free port.
+
+    Returns:
+        ThreadingHTTPServer: Running server, listening on `server_address`
+    """
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("localhost", port), partial(QuietHandler, directory=str(path)))
+    threading.Thread(target=server.serve_forever, name="scrape-replay", daemon=True).start()
+    return server
+
+class TokenBucket:
+    """Rate limit shared by threads, allowing bursts of up to `capacity` calls and `rate` calls per second after."""
+
+    def __init__(self, rate: float, capacity: float = 1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, waiting until one is available."""
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # reserve the token now, so waiting callers are served in order
+            self.tokens -= 1
+            wait = -self.tokens / self.rate
+
+        if wait > 0:
+            self.sleep(wait)
+
+def season_path(data_path: Path, season: int) -> Path:
+    return data_path / "scrape" / str(season)
+
+def fetch_game(fetcher: Fetcher, game: dict, bucket: TokenBucket, path: Path, retries: int, backoff: float):
+    """Fetch one game and write its play-by-play and shift partitions, retrying with exponential backoff.
+
+    Args:
+        fetcher (Fetcher): source of the game
+        game (dict): game ID and date from the schedule
+        bucket (TokenBucket): rate limit shared by every worker
+        path (Path): season scrape folder
+        retries (int): attempts after the first
+        backoff (float): seconds to wait before the first retry, doubling for each after
+    """
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        try:
+            pbp, shifts = fetcher.game(game)
+            if pbp is None or shifts is None:
+                raise ValueError("no play-by-play or shifts")
+            break
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+    for frame in [pbp, shifts]:
+        frame["Period"] = pd.to_numeric(frame["Period"], errors="coerce")
+
+    for name, frame in [("pbp", pbp), ("shifts", shifts)]:
+        (path / name).mkdir(parents=True, exist_ok=True)
+        frame.to_parquet(path / name / f"{game['game_id']}.parquet")
+
+def scrape_season(fetcher: Fetcher, season: int, data_path: Path, executor: ThreadPoolExecutor, bucket: TokenBucket,
+                  retries: int = 3, backoff: float = 5) -> dict:
+    """Fetch every game in a season not already saved, recording each game in the season's progress as it finishes.
+
+    Args:
+        fetcher (Fetcher): source of the schedule and games
+        season (int): first year of the season
+        data_path (Path): data folder
+        executor (ThreadPoolExecutor): workers fetching the games
+        bucket (TokenBucket): rate limit shared by every worker, including the schedule request
+        retries (int, optional): Attempts after the first for each game. Defaults to 3.
+        backoff (float, optional): Seconds before the first retry, doubling for each after. Defaults to 5.
+
+    Returns:
+        dict: Progress with the season's schedule, the games saved, and the error for each game that failed
+    """
+    path = season_path(data_path, season)
+    path.mkdir(parents=True, exist_ok=True)
+    progress = load_json(path / "progress.json", {"schedule": None, "done": [], "failed": {}})
+
+    if progress["schedule"] is None:
+        bucket.acquire()
+        progress["schedule"] = fetcher.schedule(season)
+        save_json(progress, path / "progress.json")
+
+    done = set(progress["done"])
+    pending = [game for game in progress["schedule"] if game["game_id"] not in done]
+    futures = {executor.submit(fetch_game, fetcher, game, bucket, path, retries, backoff): game for game in pending}
+
+    for future in as_completed(futures):
+        game_id = str(futures[future]["game_id"])
+        try:
+            future.result()
+            progress["done"].append(int(game_id))
+            progress["failed"].pop(game_id, None)
+        except Exception as e:
+            progress["failed"][game_id] = f"{type(e).__name__}: {e}"
+        # only this thread writes the progress, after the game's partitions are complete
+        save_json(progress, path / "progress.json")
+
+    return progress
+
+def combine_season(data_path: Path, season: int) -> tuple[pd.DataFrame, pd.DataFrame] | None:
+    """Concatenate a season's saved games in schedule order and write the season files read by `raw_to_reduced.py` and the pipeline.
+
+    Args:
+        data_path (Path): data folder
+        season (int): first year of the season
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame] | None: Play-by-play and shift data, None if no games were saved
+    """
+    path = season_path(data_path, season)
+    progress = load_json(path / "progress.json", {"schedule": None, "done": [], "failed": {}})
+    done = set(progress["done"])
+    games = [game["game_id"] for game in progress["schedule"] or [] if game["game_id"] in done]
+    if not games:
+        return None
+
+    pbp, shifts = (pd.concat([pd.read_parquet(path / name / f"{game}.parquet") for game in games], ignore_index=True)
+                   for name in ["pbp", "shifts"])
+
+    (data_path / "pbp").mkdir(parents=True, exist_ok=True)
+    pbp.to_parquet(data_path / "pbp" / f"game_{season}.parquet")
+    shifts.to_parquet(data_path / "pbp" / f"shift_{season}.parquet")
+
+    return pbp, shifts
+
+def scrape(fetcher: Fetcher, seasons: list[int], data_path: Path, workers: int = 4, rate: float = 1, burst: float = 1,
+           retries: int = 3, backoff: float = 5) -> dict[int, dict]:
+    """Scrape each season's games concurrently and write its season files, resuming from the progress of earlier runs.
+    Games that still fail after retrying are left out of the season files and fetched again by the next run.
+
+    Args:
+        fetcher (Fetcher): source of the schedules and games
+        seasons (list[int]): first year of each season
+        data_path (Path): data folder
+        workers (int, optional): Games fetched at once. Defaults to 4.
+        rate (float, optional): Games started per second across all workers,
+            hockey_scraper makes a few requests for each game. Defaults to 1.
+        burst (float, optional): Games that can start at once after waiting. Defaults to 1.
+        retries (int, optional): Attempts after the first for each game. Defaults to 3.
+        backoff (float, optional): Seconds before the first retry, doubling for each after. Defaults to 5.
+
+    Returns:
+        dict[int, dict]: Progress of each season
+    """
+    bucket = TokenBucket(rate, burst)
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for season in seasons:
+            progress = scrape_season(fetcher, season, data_path, executor, bucket, retries, backoff)
+            combine_season(data_path, season)
+            results[season] = progress
+            print(f"{season}: {len(progress['done'])} of {len(progress['schedule'])} games, {len(progress['failed'])} failed")
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seasons", type=int, nargs=2, default=[2007, 2023], help="first and last season, inclusive")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=1, help="games started per second")
+    parser.add_argument("--burst", type=float, default=1, help="games that can start at once after waiting")
+    parser.add_argument("--data-path", type=Path, default=Path(__file__).resolve().parent / '..' / '..' / 'data')
+    parser.add_argument("--replay", help="URL of a server of recorded games to scrape instead of the NHL API")
+    parser.add_argument("--record", type=Path, help="save every response to this folder, for replaying later")
+    parser.add_argument("--serve", type=Path, help="serve recorded games from this folder instead of scraping")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    if args.serve:
+        server = serve(args.serve, args.port)
+        print(f"Serving {args.serve} at http://localhost:{server.server_address[1]}, stop with Ctrl+C")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        raise SystemExit
+
+    fetcher = ReplayFetcher(args.replay) if args.replay else HockeyScraperFetcher()
+    if args.record:
+        fetcher = RecordingFetcher(fetcher, args.record)
+
+    scrape(fetcher, list(range(args.seasons[0], args.seasons[1] + 1)), args.data_path, args.workers, args.rate, args.burst)
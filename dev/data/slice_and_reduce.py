@@ -1,10 +1,9 @@
-import copy
 import re
 from pathlib import Path
-from typing import Callable, NamedTuple
+from typing import Callable
 
+import numpy as np
 import pandas as pd
-from tqdm import tqdm
 
 
 def convert_strength_to_int(strength: str) -> int:
@@ -12,140 +11,250 @@ def convert_strength_to_int(strength: str) -> int:
     # home - away
     return int(players[0]) - int(players[1])
 
-def slice_regulation(games: pd.DataFrame, pbp: pd.DataFrame, slice_length: int = 30) -> pd.DataFrame:
-    slices = []
-
-    for game in tqdm(games.itertuples(index=False), total=len(games)):
+def penalty_minutes(description: str) -> int:
+    """Penalty minutes from a PENL description like `HOOKING(2 min)`, zero if missing."""
+    try:
+        text = description.split("(")[1]  # some penalty descriptions have player number
+        if "maj" in text:
+            return 5
+        else:
+            mins = re.search(r'\d+', text)
+            return int(mins.group())
+    except (IndexError, AttributeError):
+        return 0  # some penalties are missing descriptions
+
+def map_unique(values: pd.Series, function: Callable) -> np.ndarray:
+    """Apply function once per distinct value instead of once per row."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.array([function(value) for value in uniques], dtype=np.int64)[codes]
+
+def slice_cutoff_plays(elapsed: np.ndarray, starts: np.ndarray, counts: np.ndarray, slice_length: int) -> np.ndarray:
+    """Index of the play within its game that closes each time slice, one row per game and column per cutoff.
+
+    A slice is recorded at the first play at or after its cutoff, and at most one slice per play,
+    so after a long gap between plays the cutoffs fall behind the game clock.
+    Cutoffs that are never reached are at or past the game's play count.
+
+    Args:
+        elapsed (np.ndarray): seconds elapsed of each regulation play, sorted by game
+        starts (np.ndarray): first play of each game
+        counts (np.ndarray): number of regulation plays in each game
+        slice_length (int): length of time slices in seconds
+
+    Returns:
+        np.ndarray: Play indices with shape (games, cutoffs)
+    """
+    cutoffs = np.arange(1, 3600 // slice_length + 1) * slice_length
+    game_of_play = np.repeat(np.arange(len(starts)), counts)
+
+    # NaN never reaches a cutoff and cutoffs are positive, so both can be treated as zero
+    clipped = np.clip(np.nan_to_num(elapsed, nan=0.0), 0, 3600)
+    decreasing = np.zeros(len(starts), dtype=bool)
+    if len(clipped) > 1:
+        same_game = game_of_play[1:] == game_of_play[:-1]
+        np.logical_or.at(decreasing, game_of_play[1:][same_game & (clipped[1:] < clipped[:-1])], True)
+
+    # first play at or after each cutoff, searching every game at once with the game number as an offset
+    key = game_of_play * 4000.0 + clipped
+    first = np.searchsorted(key, (np.arange(len(starts)) * 4000.0)[:, np.newaxis] + cutoffs, side="left") - starts[:, np.newaxis]
+    first = np.minimum(first, counts[:, np.newaxis])
+
+    # plays[j] = max(plays[j - 1] + 1, first[j]), with cutoffs numbered from one
+    number = np.arange(1, len(cutoffs) + 1)
+    plays = number + np.maximum.accumulate(first - number, axis=1)
+
+    # games with out of order times follow the plays one at a time
+    for g in np.flatnonzero(decreasing):
         cur_cutoff = slice_length
-
-        game_totals = {
-            "game": game.Game_Id,
-            "season": game.Season,
-            "time_remaining": 1,  # three periods of 20 minutes, in seconds, divided by 3600
-            "away_elo": game.Away_Starting_Elo,
-            "home_elo": game.Home_Starting_Elo,
-            "away_score": 0,
-            "home_score": 0,
-            "away_pim": 0,
-            "home_pim": 0,
-            "away_hits": 0,
-            "home_hits": 0,
-            "away_shots": 0,
-            "home_shots": 0,
-            "strength": 0,
-            "winner": "home" if game.Home_Score > game.Away_Score else "away"
-        }
-
-        slices.append(copy.deepcopy(game_totals))  # initial based purely on Elo
-
-        reduced = pbp[(pbp["Game_Id"] == game.Game_Id) & (pbp["Date"] == game.Date)]
-        for play in reduced.itertuples(index=False):
-            elapsed = play.Seconds_Elapsed + ((play.Period - 1) * 1200)
-            if elapsed > 3600:
-                # ignore overtime, will use different model and concatenate
-                break
-
-            if elapsed >= cur_cutoff:
-                # convert to normalized time remaining
-                game_totals["time_remaining"] = (3600 - cur_cutoff) / 3600
-                slices.append(copy.deepcopy(game_totals))
+        closing = []
+        for i, play_elapsed in enumerate(elapsed[starts[g]:starts[g] + counts[g]]):
+            if play_elapsed >= cur_cutoff:
+                closing.append(i)
                 cur_cutoff += slice_length
+        plays[g] = counts[g]
+        plays[g, :len(closing)] = closing
 
-            game_totals["strength"] = convert_strength_to_int(play.Strength)  # always update strength
-
-            if play.Ev_Team == game.Home_Team:
-                team = "home"
-            elif play.Ev_Team == game.Away_Team:
-                team = "away"
-            else:
-                # timing event like PSTR or GEND, or STOP for rink repair, etc
-                continue
-
-            match play.Event:
-                case "SHOT":
-                    game_totals[f"{team}_shots"] += 1
-                case "HIT":
-                    game_totals[f"{team}_hits"] += 1
-                case "PENL":
-                    try:
-                        text = play.Type.split("(")[1]  # some penalty descriptions have player number
-                        if "maj" in text:
-                            game_totals[f"{team}_pim"] += 5
-                        else:
-                            mins = re.search(r'\d+', text)
-                            game_totals[f"{team}_pim"] += int(mins.group())
-                    except (IndexError, AttributeError):
-                        pass  # some penalties are missing descriptions
-                case "GOAL":
-                    game_totals[f"{team}_score"] += 1
+    return plays
+
+def slice_regulation(games: pd.DataFrame, pbp: pd.DataFrame, slice_length: int = 30) -> pd.DataFrame:
+    """Game state at the end of each time slice in regulation, starting from an initial slice based on Elo.
+
+    Args:
+        games (pd.DataFrame): NHL game metadata with starting Elo
+        pbp (pd.DataFrame): NHL play-by-play data
+        slice_length (int, optional): length of time slices in seconds. Defaults to 30.
+
+    Returns:
+        pd.DataFrame: Time slices for all games, in order of games
+    """
+    games = games.reset_index(drop=True)
+
+    # find each game's plays with one join, keeping the order of plays within each game
+    keys = games[["Game_Id", "Date", "Home_Team", "Away_Team"]].assign(game_number=np.arange(len(games)))
+    plays = pbp[["Game_Id", "Date", "Period", "Seconds_Elapsed", "Strength", "Ev_Team", "Event", "Type"]].reset_index(drop=True)
+    plays = plays.assign(play_number=np.arange(len(plays))).merge(keys, on=["Game_Id", "Date"], how="inner")
+    plays = plays.sort_values(["game_number", "play_number"], kind="stable", ignore_index=True)
+
+    # drop overtime, and everything after it like the regulation loop did
+    game_number = plays["game_number"].to_numpy()
+    elapsed = (plays["Seconds_Elapsed"] + (plays["Period"] - 1) * 1200).to_numpy(dtype=float)
+    overtime = elapsed > 3600
+    game_starts = np.searchsorted(game_number, np.arange(len(games)), side="left")
+    overtime_seen = np.cumsum(overtime)
+    overtime_before_game = np.concatenate(([0], overtime_seen))[game_starts][game_number]
+    plays = plays[overtime_seen == overtime_before_game].reset_index(drop=True)
+    elapsed = elapsed[overtime_seen == overtime_before_game]
+
+    game_number = plays["game_number"].to_numpy()
+    starts = np.searchsorted(game_number, np.arange(len(games)), side="left")
+    counts = np.bincount(game_number, minlength=len(games))
+
+    # counters after each play, with a leading zero so totals before play i are at index i
+    # timing events like PSTR or GEND, or STOP for rink repair, belong to neither team
+    home = (plays["Ev_Team"] == plays["Home_Team"]).to_numpy()
+    away = (plays["Ev_Team"] == plays["Away_Team"]).to_numpy() & ~home
+    event = plays["Event"].to_numpy()
+    penalties = np.zeros(len(plays), dtype=np.int64)
+    is_penalty = (event == "PENL") & (home | away)
+    penalties[is_penalty] = map_unique(plays.loc[is_penalty, "Type"], penalty_minutes)
+
+    counters = {}
+    for side, mask in [("away", away), ("home", home)]:
+        for column, values in [("score", event == "GOAL"), ("pim", penalties), ("hits", event == "HIT"), ("shots", event == "SHOT")]:
+            counters[f"{side}_{column}"] = np.concatenate(([0], np.cumsum(np.where(mask, values, 0))))
+
+    # strength is updated on every play, including timing events
+    strength = np.concatenate(([0], map_unique(plays["Strength"], convert_strength_to_int)))
+
+    # plays closing each slice, keeping the cutoffs reached in each game
+    closing = slice_cutoff_plays(elapsed, starts, counts, slice_length)
+    reached = closing < counts[:, np.newaxis]
+    slice_game, slice_number = np.nonzero(reached)
+    slice_play = starts[slice_game] + closing[reached]  # totals before the closing play
+
+    # initial slice per game followed by its cutoffs, in order of games
+    row_game = np.concatenate((np.arange(len(games)), slice_game))
+    order = np.argsort(row_game, kind="stable")
+    row_game = row_game[order]
+    before = np.concatenate((starts, slice_play))[order]
+    initial = np.concatenate((np.ones(len(games), dtype=bool), np.zeros(len(slice_game), dtype=bool)))[order]
+    time_remaining = np.concatenate((np.ones(len(games)), (3600 - (slice_number + 1) * slice_length) / 3600))[order]
+
+    slices = {
+        "game": games["Game_Id"].to_numpy()[row_game],
+        "season": games["Season"].to_numpy()[row_game],
+        "time_remaining": time_remaining,
+        "away_elo": games["Away_Starting_Elo"].to_numpy()[row_game],
+        "home_elo": games["Home_Starting_Elo"].to_numpy()[row_game],
+    }
+    for column in ["away_score", "home_score", "away_pim", "home_pim", "away_hits", "home_hits", "away_shots", "home_shots"]:
+        values = counters[column]
+        slices[column] = np.where(initial, 0, values[before] - values[starts[row_game]])
+    slices["strength"] = np.where(initial | (before == starts[row_game]), 0, strength[before])
+    winner = np.where(games["Home_Score"] > games["Away_Score"], "home", "away").astype(object)
+    slices["winner"] = winner[row_game]
 
     return pd.DataFrame(slices)
 
-def reduce_plays(game: NamedTuple, pbp: pd.DataFrame, time_key: str, time_function: Callable[[int, int], int]) -> list[dict]:
-    valid_events = ["FAC", "BLOCK", "SHOT", "GOAL", "MISS", "HIT", "GIVE", "TAKE"]
-
-    events = []
-    for play in pbp.itertuples(index=False):
-        # first event will always be a faceoff
-        if play.Event in valid_events:
-            event = {
-                "game": game.Game_Id,
-                "season": game.Season,
-                "away_elo": game.Away_Starting_Elo,
-                "home_elo": game.Home_Starting_Elo,
-                time_key: time_function(play.Period, play.Seconds_Elapsed),
-                "event": play.Event,
-                "team": "home" if play.Ev_Team == play.Home_Team else "away",
-                "event_zone": play.Ev_Zone,
-                "home_zone": play.Home_Zone,
-                "strength": play.Strength,
-                "winner": "home" if game.Home_Score > game.Away_Score else "away"
-            }
-
-            events.append(event)
-
-    return events
+valid_events = ["FAC", "BLOCK", "SHOT", "GOAL", "MISS", "HIT", "GIVE", "TAKE"]
+
+def join_plays(games: pd.DataFrame, pbp: pd.DataFrame) -> pd.DataFrame:
+    """Valid events joined with their game's metadata, in order of games and then plays.
+
+    Args:
+        games (pd.DataFrame): NHL game metadata with starting Elo
+        pbp (pd.DataFrame): NHL play-by-play data
+
+    Returns:
+        pd.DataFrame: Plays with game Elo, final score, last period (`Game_Period`) and playoff flag
+    """
+    keys = games[["Game_Id", "Season", "Away_Starting_Elo", "Home_Starting_Elo", "Home_Score", "Away_Score", "Period", "Playoff"]]
+    keys = keys.rename(columns={"Home_Score": "Final_Home_Score", "Away_Score": "Final_Away_Score", "Period": "Game_Period"})
+    keys = keys.assign(game_number=np.arange(len(keys)))
+
+    # first event will always be a faceoff
+    plays = pbp.loc[pbp["Event"].isin(valid_events),
+                    ["Game_Id", "Season", "Period", "Seconds_Elapsed", "Event", "Ev_Team", "Home_Team", "Ev_Zone", "Home_Zone", "Strength"]]
+    plays = plays.assign(play_number=np.arange(len(plays))).merge(keys, on=["Game_Id", "Season"], how="inner")
+
+    return plays.sort_values(["game_number", "play_number"], kind="stable", ignore_index=True)
+
+def reduce_plays(plays: pd.DataFrame, time_key: str, time_function: Callable[[pd.Series, pd.Series], pd.Series]) -> pd.DataFrame:
+    """Reduce joined plays to the overtime model's input columns.
+
+    Args:
+        plays (pd.DataFrame): plays from `join_plays`
+        time_key (str): name of the time column
+        time_function (Callable[[pd.Series, pd.Series], pd.Series]): time from period and seconds elapsed
+
+    Returns:
+        pd.DataFrame: Reduced play-by-play
+    """
+    return pd.DataFrame({
+        "game": plays["Game_Id"],
+        "season": plays["Season"],
+        "away_elo": plays["Away_Starting_Elo"],
+        "home_elo": plays["Home_Starting_Elo"],
+        time_key: time_function(plays["Period"], plays["Seconds_Elapsed"]),
+        "event": plays["Event"],
+        "team": np.where(plays["Ev_Team"] == plays["Home_Team"], "home", "away").astype(object),
+        "event_zone": plays["Ev_Zone"],
+        "home_zone": plays["Home_Zone"],
+        "strength": plays["Strength"],
+        "winner": np.where(plays["Final_Home_Score"] > plays["Final_Away_Score"], "home", "away").astype(object)
+    }).reset_index(drop=True)
+
+def time_remaining(period: pd.Series, seconds: pd.Series) -> pd.Series:
+    return 3600 - seconds + ((period - 1) * 1200)
+
+def seconds_elapsed(period: pd.Series, seconds: pd.Series) -> pd.Series:
+    return seconds
+
+def playoff_seconds_elapsed(period: pd.Series, seconds: pd.Series) -> pd.Series:
+    return ((period - 4) * 1200) + seconds
 
 def reduce_regulation(games: pd.DataFrame, pbp: pd.DataFrame) -> pd.DataFrame:
-    events = []
-    for game in tqdm(games.itertuples(index=False), total=len(games)):
-        mask = ((pbp["Game_Id"] == game.Game_Id)
-                & (pbp["Season"] == game.Season)
-                & (pbp["Period"] < 4))
-        reduced = pbp[mask]
-
-        time_remaining = lambda x, y: 3600 - y + ((x - 1) * 1200)
-        events.extend(reduce_plays(game, reduced, "time_remaining", time_remaining))
-
-    return pd.DataFrame(events)
+    plays = join_plays(games, pbp)
+    return reduce_plays(plays[plays["Period"] < 4], "time_remaining", time_remaining)
 
 def reduce_regular_overtime(games: pd.DataFrame, pbp: pd.DataFrame) -> pd.DataFrame:
-    events = []
-    for game in tqdm(games.itertuples(index=False), total=len(games)):
-        mask = ((pbp["Game_Id"] == game.Game_Id)
-                & (pbp["Season"] == game.Season)
-                & (pbp["Period"] == 4))  # ignore shootout
-        reduced = pbp[mask]
+    plays = join_plays(games, pbp)
+    return reduce_plays(plays[plays["Period"] == 4], "seconds_elapsed", seconds_elapsed)  # ignore shootout
 
-        seconds_elapsed = lambda x, y: y
-        events.extend(reduce_plays(game, reduced, "seconds_elapsed", seconds_elapsed))
+def reduce_playoff_overtime(games: pd.DataFrame, pbp: pd.DataFrame) -> pd.DataFrame:
+    plays = join_plays(games, pbp)
+    return reduce_plays(plays[plays["Period"] >= 4], "seconds_elapsed", playoff_seconds_elapsed)
 
-    return pd.DataFrame(events)
+def reduce_all(games: pd.DataFrame, pbp: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Reduce play-by-play for regulation games, regular season overtime and playoff overtime with one join.
 
-def reduce_playoff_overtime(games: pd.DataFrame, pbp: pd.DataFrame) -> pd.DataFrame:
-    events = []
-    for game in tqdm(games.itertuples(index=False), total=len(games)):
-        mask = ((pbp["Game_Id"] == game.Game_Id)
-                & (pbp["Season"] == game.Season)
-                & (pbp["Period"] >= 4))
-        reduced = pbp[mask]
+    Args:
+        games (pd.DataFrame): NHL game metadata with starting Elo
+        pbp (pd.DataFrame): NHL play-by-play data
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]: Regulation, regular season overtime and playoff overtime events
+    """
+    plays = join_plays(games, pbp)
+    overtime = plays["Game_Period"] >= 4
 
-        seconds_elapsed =  lambda x, y: ((x - 4) * 1200) + y
-        events.extend(reduce_plays(game, reduced, "seconds_elapsed", seconds_elapsed))
+    regulation = plays[~overtime & (plays["Period"] < 4)]
+    regular_ot = plays[overtime & (plays["Playoff"] == False) & (plays["Period"] == 4)]  # ignore shootout
+    playoff_ot = plays[overtime & (plays["Playoff"] == True) & (plays["Period"] >= 4)]
 
-    return pd.DataFrame(events)
+    return (
+        reduce_plays(regulation, "time_remaining", time_remaining),
+        reduce_plays(regular_ot, "seconds_elapsed", seconds_elapsed),
+        reduce_plays(playoff_ot, "seconds_elapsed", playoff_seconds_elapsed)
+    )
 
 if __name__ == "__main__":
+    try:
+        from dev.data import schema
+    except ModuleNotFoundError:
+        # run as a script from dev/data
+        import schema
+
     current_file_path = Path(__file__).resolve()
     data_path = current_file_path.parent / '..' / '..' / 'data'
 
@@ -153,16 +262,7 @@ if __name__ == "__main__":
     pbp = pd.read_parquet(data_path / "pbp_reduced.parquet")
 
     slices = slice_regulation(games, pbp)
-    slices.to_parquet(data_path / "time_slices.parquet")
-
-    regulation = games[games["Period"] < 4]
-    events = reduce_regulation(regulation, pbp)
-    events.to_parquet(data_path / "regulation_pbp.parquet")
-
-    regular_ot = games[(games["Period"] >= 4) & (games["Playoff"] == False)]
-    events = reduce_regular_overtime(regular_ot, pbp)
-    events.to_parquet(data_path / "regular_ot_pbp.parquet")
+    schema.compact(slices, "time_slices").to_parquet(data_path / "time_slices.parquet")
 
-    playoff_ot = games[(games["Period"] >= 4) & (games["Playoff"] == True)]
-    events = reduce_playoff_overtime(playoff_ot, pbp)
-    events.to_parquet(data_path / "playoff_ot_pbp.parquet")
+    for name, events in zip(["regulation_pbp", "regular_ot_pbp", "playoff_ot_pbp"], reduce_all(games, pbp)):
+        schema.compact(events, name).to_parquet(data_path / f"{name}.parquet")
@@ -3,8 +3,8 @@ import re
 from datetime import datetime, timedelta
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from tqdm import tqdm
 
 playoff_dates = {
     2007: "2008-04-09",
@@ -27,24 +27,40 @@ playoff_dates = {
 }
 playoff_dates = {key: datetime.strptime(value, "%Y-%m-%d") for key, value in playoff_dates.items()}
 
-def add_season_column(pbp: pd.DataFrame):
+def add_season_column(pbp: pd.DataFrame, season: int = 2007):
     """Modifies pbp DataFrame in-place to determine season for each game.
     Notated for starting year of season (e.g. `2007` for 2007-2008 season).
     Uses August 31 as cutoff date between seasons.
 
     Args:
         pbp (pd.DataFrame): NHL play-by-play data
+        season (int, optional): season of the first play, for tidying one season file at a time. Defaults to 2007.
     """
-    season_list = []
-    season = 2007
-    comparison_date = datetime.strptime('2008-08-31', '%Y-%m-%d')
-    for row in pbp.itertuples(index=False):
-        if row.Date > comparison_date:
-            season += 1
-            comparison_date += timedelta(days=365)
-
-        season_list.append(season)
-    pbp['Season'] = season_list
+    # same cutoff as when counting up from 2007, moving 365 days per season
+    first_cutoff = datetime.strptime('2008-08-31', '%Y-%m-%d') + timedelta(days=365 * (season - 2007))
+    dates = pbp['Date'].to_numpy(dtype='datetime64[ns]')
+    if len(dates) == 0:
+        pbp['Season'] = np.array([], dtype='int64')
+        return
+
+    # a row after the next cutoff starts a new season, and moves the cutoff forward one year
+    latest = np.maximum.accumulate(dates)
+    count = int((latest[-1] - np.datetime64(first_cutoff)) // np.timedelta64(365, 'D')) + 2
+    cutoffs = np.datetime64(first_cutoff, 'ns') + np.arange(max(count, 1)) * np.timedelta64(365, 'D')
+    crossed = np.searchsorted(cutoffs, latest, side='left')
+
+    if np.any(np.diff(crossed, prepend=0) > 1):
+        # a jump over more than one cutoff only moves one season per row, counted one row at a time
+        crossed = np.zeros(len(dates), dtype='int64')
+        cutoff = np.datetime64(first_cutoff, 'ns')
+        count = 0
+        for i, date in enumerate(dates):
+            if date > cutoff:
+                count += 1
+                cutoff += np.timedelta64(365, 'D')
+            crossed[i] = count
+
+    pbp['Season'] = season + crossed.astype('int64')
 
 def reduce_pbp(pbp: pd.DataFrame):
     """Reduce pbp DataFrame in-place dropping player names and fixing goalie IDs.
@@ -77,13 +93,12 @@ def extract_games(pbp: pd.DataFrame) -> pd.DataFrame:
 
     # extract the last rows of each group and determine playoffs boolean
     # previously used GEND event but this is missing from some games, like 20003.2007
-    games = []
-    for name, game in reduced.groupby(['Season', 'Game_Id']):
-        last_play = game.iloc[-1].copy()
-        last_play['Playoff'] = last_play.Date >= playoff_dates[last_play.Season]
-        games.append(last_play)
+    games = reduced.drop_duplicates(['Season', 'Game_Id'], keep='last').sort_values(['Season', 'Game_Id'], kind='stable')
+    missing = set(games['Season']) - set(playoff_dates)
+    if missing:
+        raise KeyError(f"No playoff start date for seasons {sorted(missing)}")
 
-    return pd.DataFrame(games)
+    return games.assign(Playoff=games['Date'] >= games['Season'].map(playoff_dates))
 
 def extract_players(pbp: pd.DataFrame) -> pd.DataFrame:
     """Mapping between NHL player names and IDs
@@ -96,21 +111,20 @@ def extract_players(pbp: pd.DataFrame) -> pd.DataFrame:
     players += [[f"p{pNum}_name", f"p{pNum}_ID"] for pNum in range(1, 4)]
     players += [['Home_Goalie', 'Home_Goalie_Id'], ['Away_Goalie', 'Away_Goalie_Id']]
 
-    playerframe = pd.DataFrame()
-    for pair in tqdm(players):
-        playerframe = pd.concat([pbp[pair].rename(columns={pair[0]: 'player', pair[1]: 'playerId'}).drop_duplicates(), playerframe])
+    # stack the unique pairs of each column, last pair first like the IDs were previously collected, then dedup once
+    playerframe = pd.concat([pbp[pair].drop_duplicates().set_axis(['player', 'playerId'], axis=1) for pair in reversed(players)])
     playerframe.drop_duplicates(inplace=True)
 
     return playerframe
 
-def tidy_pbp(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    pbp = df.copy()
+def tidy_pbp(df: pd.DataFrame, season: int = 2007) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    pbp = df.copy(deep=False)  # columns are replaced rather than modified, so the input is left unchanged
     
     # type conversions for convenience
     pbp['Date'] = pd.to_datetime(pbp['Date'])
     pbp['Game_Id'] = pbp['Game_Id'].astype('int64')
 
-    add_season_column(pbp)
+    add_season_column(pbp, season)
     
     # must extract games and players before reduction
     games = extract_games(pbp)
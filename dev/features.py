@@ -0,0 +1,148 @@
+# Exports model-ready features for every game to uncompressed .npy files that each server worker memory maps,
+# so every process shares one copy in the page cache and selecting a game is a slice of the mapped arrays
+# run from the project root after the data pipeline: python -m dev.features
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dev import curves, meter
+from dev.data import schema
+from dev.index import GameIndex
+from dev.live import regulation_features
+
+encoding_path = "dev/models/one_hot_columns.json"
+# pipeline outputs the features are exported from
+data_paths = ["data/time_slices.parquet", "data/regular_ot_pbp.parquet", "data/playoff_ot_pbp.parquet"]
+
+# columns of offsets.npy, one row per game in (season, game) order
+offset_columns = ["season", "game", "regulation_start", "regulation_stop", "plays_start", "plays_stop", "windows_start", "windows_stop"]
+
+def version(paths: list[str] = [encoding_path], data: list[str] = data_paths) -> str:
+    """Hash of the overtime encoding, the only model file the features depend on, and the size and modification time
+    of each data file, so the features are exported again after the data pipeline rewrites its outputs.
+
+    Args:
+        paths (list[str], optional): Files hashed by content. Defaults to the overtime encoding.
+        data (list[str], optional): Files fingerprinted by size and modification time. Defaults to `data_paths`.
+
+    Returns:
+        str: First 12 hex digits of the SHA-256 over all files
+    """
+    return curves.version(paths, data)
+
+def feature_path(version: str, data_path: Path = Path("data")) -> Path:
+    return data_path / "features" / version
+
+def export_features(slices: pd.DataFrame | GameIndex, ot_pbp: pd.DataFrame | GameIndex, one_hot_columns: list[str], path: Path) -> int:
+    """Write regulation features, overtime play times, and overtime windows for every game, with the row range of each game.
+
+    Args:
+        slices (pd.DataFrame | GameIndex): regulation time slice data
+        ot_pbp (pd.DataFrame | GameIndex): overtime play-by-play data
+        one_hot_columns (list[str]): one-hot encoding columns from training
+        path (Path): folder to write, replaced once every file is written
+
+    Returns:
+        int: Number of games
+    """
+    from tqdm import tqdm
+
+    if not isinstance(slices, GameIndex):
+        slices = GameIndex(slices)
+    if not isinstance(ot_pbp, GameIndex):
+        ot_pbp = GameIndex(ot_pbp)
+
+    keys = sorted(set(slices.offsets) | set(ot_pbp.offsets))
+    offsets = np.zeros((len(keys), len(offset_columns)), dtype=np.int64)
+    offsets[:, :2] = keys
+
+    # regulation rows are already contiguous in the same order
+    for i, key in enumerate(keys):
+        offsets[i, 2:4] = slices.offsets.get(key, (0, 0))
+        offsets[i, 4:6] = ot_pbp.offsets.get(key, (0, 0))
+    regulation = slices.frame[regulation_features].to_numpy(dtype=np.float32)
+    seconds = ot_pbp.frame["seconds_elapsed"].to_numpy(dtype=np.float32)
+
+    windows = []
+    position = 0
+    for i in tqdm([i for i, key in enumerate(keys) if key in ot_pbp.offsets]):
+        start, stop = offsets[i, 4:6]
+        windows.append(meter.overtime_windows(ot_pbp.frame.iloc[start:stop], one_hot_columns).astype(np.float32))
+        offsets[i, 6:8] = position, position + len(windows[-1])
+        position += len(windows[-1])
+    windows = np.concatenate(windows) if windows else np.empty((0, 3, len(one_hot_columns) - 3), dtype=np.float32)
+
+    # written next to the target and moved into place, so readers never see a partial store
+    temporary = path.with_name(path.name + ".tmp")
+    shutil.rmtree(temporary, ignore_errors=True)
+    temporary.mkdir(parents=True)
+    np.save(temporary / "regulation.npy", regulation)
+    np.save(temporary / "overtime_seconds.npy", seconds)
+    np.save(temporary / "overtime_windows.npy", windows)
+    np.save(temporary / "offsets.npy", offsets)
+    with open(temporary / "columns.json", 'w') as f:
+        json.dump(regulation_features, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    temporary.rename(path)
+    return len(keys)
+
+class FeatureStore:
+    """Memory-mapped features from `export_features`, where each game is a view of the mapped files without copying.
+
+    Args:
+        path (Path): folder written by `export_features`
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.regulation_features = np.load(self.path / "regulation.npy", mmap_mode="r")
+        self.overtime_seconds = np.load(self.path / "overtime_seconds.npy", mmap_mode="r")
+        self.overtime_windows = np.load(self.path / "overtime_windows.npy", mmap_mode="r")
+        with open(self.path / "columns.json", 'r') as f:
+            self.columns = json.load(f)
+
+        # the table is small, each process keeps its own lookup
+        offsets = np.load(self.path / "offsets.npy")
+        self.offsets = {(season, game): rows for season, game, *rows in offsets.tolist()}
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __contains__(self, key: tuple[int, int]) -> bool:
+        game, season = key
+        return (season, game) in self.offsets
+
+    def regulation(self, game: int, season: int) -> np.ndarray:
+        """Regulation model input for each time slice of a game, with columns in `columns`, empty if not found."""
+        start, stop = self.offsets.get((season, game), (0, 0, 0, 0, 0, 0))[:2]
+        return self.regulation_features[start:stop]
+
+    def overtime(self, game: int, season: int) -> tuple[np.ndarray, np.ndarray]:
+        """Seconds elapsed of each overtime play and the overtime model's windows for a game, empty if not found."""
+        _, _, plays_start, plays_stop, windows_start, windows_stop = self.offsets.get((season, game), (0, 0, 0, 0, 0, 0))
+        return self.overtime_seconds[plays_start:plays_stop], self.overtime_windows[windows_start:windows_stop]
+
+def load_features(path: Path) -> FeatureStore | None:
+    """Map a feature store, or None if it has not been exported for this encoding."""
+    if not (Path(path) / "offsets.npy").exists():
+        return None
+
+    return FeatureStore(path)
+
+if __name__ == "__main__":
+    slices = schema.compact(pd.read_parquet("data/time_slices.parquet"), "time_slices")
+    ot_pbp = schema.concat([
+        pd.read_parquet("data/regular_ot_pbp.parquet"),
+        pd.read_parquet("data/playoff_ot_pbp.parquet")
+    ], "regular_ot_pbp")
+    with open(encoding_path, 'r') as f:
+        one_hot_columns = json.load(f)
+
+    path = feature_path(version())
+    games = export_features(slices, ot_pbp, one_hot_columns, path)
+    size = sum(file.stat().st_size for file in path.iterdir())
+    print(f"Wrote features for {games} games to {path}, {size / 1e6:.1f} MB")
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+
+class GameIndex:
+    """Frame sorted once by season and game with the row range of each game,
+    so selecting a game is a dictionary lookup and a contiguous slice instead of a full-frame mask.
+
+    Args:
+        frame (pd.DataFrame): NHL data with one or more rows per game
+        game_col (str, optional): Game ID column. Defaults to "game".
+        season_col (str, optional): Season column. Defaults to "season".
+    """
+
+    def __init__(self, frame: pd.DataFrame, game_col: str = "game", season_col: str = "season"):
+        self.game_col = game_col
+        self.season_col = season_col
+
+        # stable sort keeps the original order of rows within each game
+        self.frame = frame.sort_values([season_col, game_col], kind="stable", ignore_index=True)
+
+        seasons = self.frame[season_col].to_numpy()
+        games = self.frame[game_col].to_numpy()
+        boundaries = np.flatnonzero((seasons[1:] != seasons[:-1]) | (games[1:] != games[:-1])) + 1
+        starts = np.concatenate(([0], boundaries)) if len(self.frame) else np.array([], dtype=int)
+        stops = np.concatenate((boundaries, [len(self.frame)])) if len(self.frame) else np.array([], dtype=int)
+
+        self.offsets = {
+            (season, game): (start, stop)
+            for season, game, start, stop in zip(seasons[starts].tolist(), games[starts].tolist(), starts.tolist(), stops.tolist())
+        }
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __contains__(self, key: tuple[int, int]) -> bool:
+        game, season = key
+        return (season, game) in self.offsets
+
+    def rows(self, game: int, season: int) -> tuple[int, int]:
+        """Row range of given game in `frame`, empty if not found.
+
+        Args:
+            game (int): NHL Game ID
+            season (int): NHL season
+
+        Returns:
+            tuple[int, int]: Start and stop rows
+        """
+        return self.offsets.get((season, game), (0, 0))
+
+    def get(self, game: int, season: int) -> pd.DataFrame:
+        """Rows for given game, empty if not found.
+
+        Args:
+            game (int): NHL Game ID
+            season (int): NHL season
+
+        Returns:
+            pd.DataFrame: Contiguous slice of `frame`
+        """
+        start, stop = self.rows(game, season)
+        return self.frame.iloc[start:stop]
+
+def select_game(data: pd.DataFrame | GameIndex, game: int, season: int, game_col: str = "game", season_col: str = "season") -> pd.DataFrame:
+    """Rows for given game from an indexed or plain frame.
+
+    Args:
+        data (pd.DataFrame | GameIndex): NHL data, a plain frame is masked
+        game (int): NHL Game ID
+        season (int): NHL season
+        game_col (str, optional): Game ID column of a plain frame. Defaults to "game".
+        season_col (str, optional): Season column of a plain frame. Defaults to "season".
+
+    Returns:
+        pd.DataFrame: Rows for given game
+    """
+    if isinstance(data, GameIndex):
+        return data.get(game, season)
+
+    return data[(data[game_col] == game) & (data[season_col] == season)]
+
+def select_games(data: pd.DataFrame | GameIndex, games: list[tuple[int, int]], game_col: str = "game", season_col: str = "season") -> tuple[pd.DataFrame, np.ndarray]:
+    """Rows for several games in the given order, with the number of rows for each game.
+
+    Args:
+        data (pd.DataFrame | GameIndex): NHL data, a plain frame is indexed first
+        games (list[tuple[int, int]]): NHL Game ID and season pairs
+        game_col (str, optional): Game ID column of a plain frame. Defaults to "game".
+        season_col (str, optional): Season column of a plain frame. Defaults to "season".
+
+    Returns:
+        tuple[pd.DataFrame, np.ndarray]: Rows for all games and row counts per game
+    """
+    if not isinstance(data, GameIndex):
+        data = GameIndex(data, game_col, season_col)
+
+    ranges = [data.rows(game, season) for game, season in games]
+    lengths = np.array([stop - start for start, stop in ranges], dtype=int)
+    rows = np.concatenate([np.arange(start, stop) for start, stop in ranges] + [np.array([], dtype=int)])
+
+    return data.frame.iloc[rows], lengths
@@ -0,0 +1,169 @@
+# Forward passes through the shipped .keras models using only NumPy, so serving does not need TensorFlow
+import io
+import json
+import os
+import re
+import zipfile
+
+import numpy as np
+
+activations = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "sigmoid": lambda x: 0.5 * (1 + np.tanh(0.5 * x)),  # same as 1 / (1 + exp(-x)) without overflow
+    "tanh": np.tanh
+}
+
+def layer_weight_names(layers: list[dict]) -> list[str]:
+    """Names that Keras uses for each layer's group in `model.weights.h5`,
+    the snake case class name numbered by occurrence (`dense`, `dense_1`, ...)."""
+    counts = {}
+    names = []
+    for layer in layers:
+        # same conversion as keras.src.utils.naming.to_snake_case
+        name = re.sub("(.)([A-Z][a-z]+)", r"\1_\2", layer["class_name"])
+        name = re.sub("([a-z])([A-Z])", r"\1_\2", name).lower()
+        count = counts.get(name, 0)
+        counts[name] = count + 1
+        names.append(name if count == 0 else f"{name}_{count}")
+
+    return names
+
+def load_keras_weights(path: str) -> list[dict]:
+    """Read layer configurations and weights from a `.keras` archive.
+
+    Args:
+        path (str): `.keras` model file
+
+    Raises:
+        ValueError: model is not a Sequential of supported layers
+
+    Returns:
+        list[dict]: Layer class name, config, and weights as float32 arrays, in order
+    """
+    import h5py
+
+    with zipfile.ZipFile(path) as archive:
+        config = json.loads(archive.read("config.json"))
+        weights_file = io.BytesIO(archive.read("model.weights.h5"))
+
+    if config["class_name"] != "Sequential":
+        raise ValueError(f"Unsupported model: {config['class_name']}")
+
+    layers = [layer for layer in config["config"]["layers"] if layer["class_name"] != "InputLayer"]
+
+    with h5py.File(weights_file, "r") as weights:
+        for layer, name in zip(layers, layer_weight_names(layers)):
+            group = weights["layers"][name]
+            if layer["class_name"] == "LSTM":
+                group = group["cell"]
+
+            variables = group["vars"]
+            layer["weights"] = [np.asarray(variables[str(i)], dtype=np.float32) for i in range(len(variables))]
+
+    return layers
+
+def lstm(x: np.ndarray, kernel: np.ndarray, recurrent_kernel: np.ndarray, bias: np.ndarray, config: dict) -> np.ndarray:
+    """Batched LSTM forward pass returning the last hidden state, gates ordered input, forget, cell, output like Keras.
+
+    Args:
+        x (np.ndarray): Inputs with shape (batch, timesteps, features)
+        kernel (np.ndarray): Input weights with shape (features, 4 * units)
+        recurrent_kernel (np.ndarray): Recurrent weights with shape (units, 4 * units)
+        bias (np.ndarray): Bias with shape (4 * units,)
+        config (dict): Keras LSTM layer config
+
+    Returns:
+        np.ndarray: Last hidden state with shape (batch, units)
+    """
+    if config.get("return_sequences") or config.get("go_backwards"):
+        raise ValueError("Only forward LSTM layers returning the last state are supported")
+
+    units = config["units"]
+    activation = activations[config["activation"]]
+    recurrent_activation = activations[config["recurrent_activation"]]
+
+    # input projection for every timestep at once
+    projected = x @ kernel + bias
+
+    h = np.zeros((x.shape[0], units), dtype=np.float32)
+    c = np.zeros((x.shape[0], units), dtype=np.float32)
+    for t in range(x.shape[1]):
+        z = projected[:, t] + h @ recurrent_kernel
+        i = recurrent_activation(z[:, :units])
+        f = recurrent_activation(z[:, units:2 * units])
+        c = f * c + i * activation(z[:, 2 * units:3 * units])
+        o = recurrent_activation(z[:, 3 * units:])
+        h = o * activation(c)
+
+    return h
+
+class NumpyModel:
+    """Inference-only stand-in for a Keras Sequential model with the same `predict` signature.
+
+    Args:
+        path (str): `.keras` model file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.layers = load_keras_weights(path)
+
+    def forward(self, x: np.ndarray) -> np.ndarray:
+        for layer in self.layers:
+            match layer["class_name"]:
+                case "LSTM":
+                    x = lstm(x, *layer["weights"], layer["config"])
+                case "Dense":
+                    kernel, bias = layer["weights"]
+                    x = activations[layer["config"]["activation"]](x @ kernel + bias)
+                case "Dropout":
+                    pass  # only active while training
+                case other:
+                    raise ValueError(f"Unsupported layer: {other}")
+
+        return x
+
+    def predict(self, x, batch_size: int = 4096, verbose: int = 0) -> np.ndarray:
+        """Predict in batches, accepting the same inputs as `keras.Model.predict`.
+
+        Args:
+            x (np.ndarray | pd.DataFrame): Model inputs, 2D inputs are treated as one feature per timestep like Keras
+            batch_size (int, optional): Rows per batch. Defaults to 4096.
+            verbose (int, optional): Ignored, for compatibility with Keras. Defaults to 0.
+
+        Returns:
+            np.ndarray: Predictions with shape (batch, outputs)
+        """
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[:, :, np.newaxis]
+
+        return np.concatenate([
+            self.forward(x[start:start + batch_size]) for start in range(0, len(x), batch_size)
+        ] + [np.empty((0, 1), dtype=np.float32)])
+
+def load_model(path: str, backend: str | None = None):
+    """Load a model for prediction with the selected backend.
+
+    Args:
+        path (str): `.keras` model file
+        backend (str | None, optional): `keras` or `numpy`. Defaults to the `NHL_METER_BACKEND`
+            environment variable, or `keras` if unset.
+
+    Raises:
+        ValueError: unknown backend
+
+    Returns:
+        Model | NumpyModel: Model with a Keras compatible `predict`
+    """
+    backend = backend or os.environ.get("NHL_METER_BACKEND", "keras")
+
+    match backend:
+        case "keras":
+            from keras.models import load_model as keras_load_model
+            return keras_load_model(path)
+        case "numpy":
+            return NumpyModel(path)
+        case _:
+            raise ValueError(f"Unknown backend: {backend}")
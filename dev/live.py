@@ -0,0 +1,255 @@
+# Win probability for a game in progress, updated one play at a time from a pluggable feed of play-by-play events
+# keeps the running totals of slice_and_reduce.slice_regulation and the overtime window of meter.predict_overtime,
+# so each play costs at most one single-row model call instead of predicting the whole game again
+# replay a finished game from the project root: python -m dev.live 30227 2009 --speed 60
+import argparse
+import time
+from collections import deque
+from typing import NamedTuple, Protocol
+
+import numpy as np
+import pandas as pd
+
+try:
+    from dev import meter
+    from dev.data.slice_and_reduce import convert_strength_to_int, penalty_minutes, valid_events
+except ModuleNotFoundError:
+    # imported from dev/ by the notebooks
+    import meter
+    from data.slice_and_reduce import convert_strength_to_int, penalty_minutes, valid_events
+
+# same order as the time slice columns given to the regulation model
+regulation_features = ["time_remaining", "away_elo", "home_elo", "away_score", "home_score", "away_pim", "home_pim",
+                       "away_hits", "home_hits", "away_shots", "home_shots", "strength"]
+
+class Update(NamedTuple):
+    time_elapsed: float
+    probability: float
+    home_score: int
+    away_score: int
+
+class Feed(Protocol):
+    finished: bool
+
+    def poll(self) -> list[dict]:
+        """Plays since the last call in the scraped play-by-play format, empty if there are none yet."""
+
+class LiveGame:
+    """Running state of one game, emitting a win probability for each time slice in regulation and each overtime play.
+
+    Args:
+        home_team (str): home team code
+        away_team (str): away team code
+        away_elo (float): away team Elo before the game
+        home_elo (float): home team Elo before the game
+        playoff (bool): playoff overtime continues until a goal, regular season overtime is one period before a shootout
+        model_regulation (Model): keras Model for regulation
+        model_overtime (Model): keras Model for overtime
+        one_hot_columns (list[str]): one-hot encoding columns from training
+        slice_length (int, optional): length of time slices in seconds. Defaults to 30.
+        window_size (int, optional): overtime plays per prediction. Defaults to 3.
+    """
+
+    def __init__(self, home_team: str, away_team: str, away_elo: float, home_elo: float, playoff: bool,
+                 model_regulation, model_overtime, one_hot_columns: list[str], slice_length: int = 30, window_size: int = 3):
+        self.home_team = home_team
+        self.away_team = away_team
+        self.playoff = playoff
+        self.model_regulation = model_regulation
+        self.model_overtime = model_overtime
+        self.slice_length = slice_length
+
+        self.totals = dict.fromkeys(regulation_features, 0)
+        self.totals.update(time_remaining=1, away_elo=away_elo, home_elo=home_elo)
+        self.cur_cutoff = slice_length
+        self.overtime = False
+
+        # same vocabulary as `meter.overtime_windows`
+        self.encoder = meter.overtime_encoder(tuple(one_hot_columns), window_size)
+        self.positions = {column: i for i, column in enumerate(self.encoder.features)}
+        self.blank = np.zeros(len(self.encoder.features))
+        self.blank[[self.positions["away_elo"], self.positions["home_elo"]]] = [away_elo, home_elo]
+        # windows of short overtimes are padded with blank plays at the start, like `meter.overtime_windows`
+        self.window = deque([self.blank] * window_size, maxlen=window_size)
+
+        self.updates = [self.predict_regulation(0)]  # initial based purely on Elo
+
+    def predict_regulation(self, time_elapsed: float) -> Update:
+        x = np.array([[self.totals[column] for column in regulation_features]], dtype=np.float64)
+        probability = float(self.model_regulation.predict(x, verbose=0)[0, 0])
+        return Update(time_elapsed, probability, self.totals["home_score"], self.totals["away_score"])
+
+    def encode_overtime(self, play: dict) -> np.ndarray:
+        """One overtime play as a row of model features, the same as one-hot encoding `overtime_windows` input."""
+        row = self.blank.copy()
+
+        values = {
+            "event": play["Event"],
+            "team": "home" if play["Ev_Team"] == self.home_team else "away",
+            "event_zone": play["Ev_Zone"],
+            "home_zone": play["Home_Zone"],
+            "strength": play["Strength"]
+        }
+        for category, value in values.items():
+            # missing values and values not seen in training have no column
+            position = self.encoder.vocabulary[category].get(str(value)) if not pd.isna(value) else None
+            if position is not None:
+                row[position] = 1
+
+        return row
+
+    def push(self, play: dict) -> list[Update]:
+        """Advance the game by one play.
+
+        Args:
+            play (dict): play-by-play event with Period, Seconds_Elapsed, Event, Ev_Team, Type, Strength, Ev_Zone, and Home_Zone
+
+        Returns:
+            list[Update]: New win probabilities, empty unless the play closes a time slice or is a valid overtime event
+        """
+        elapsed = play["Seconds_Elapsed"] + ((play["Period"] - 1) * 1200)
+        if elapsed > 3600:
+            # ignore the rest of regulation, like the regulation slices
+            self.overtime = True
+
+        team = "home" if play["Ev_Team"] == self.home_team else "away" if play["Ev_Team"] == self.away_team else None
+        new = []
+
+        if not self.overtime:
+            if elapsed >= self.cur_cutoff:
+                # convert to normalized time remaining
+                self.totals["time_remaining"] = (3600 - self.cur_cutoff) / 3600
+                new.append(self.predict_regulation(self.cur_cutoff))
+                self.cur_cutoff += self.slice_length
+
+            self.totals["strength"] = convert_strength_to_int(play["Strength"])  # always update strength
+
+        # overtime opens with a faceoff at exactly 3600 seconds, which also closes regulation slices above like the historical slices
+        if play["Period"] >= 4 and play["Event"] in valid_events and (self.playoff or play["Period"] == 4):  # ignore shootout
+            self.window.append(self.encode_overtime(play))
+            probability = float(self.model_overtime.predict(np.stack(self.window)[np.newaxis], verbose=0)[0, 0])
+            seconds = play["Seconds_Elapsed"] + (((play["Period"] - 4) * 1200) if self.playoff else 0)
+            new.append(Update(3600 + seconds, probability, self.totals["home_score"], self.totals["away_score"]))
+
+        # timing events like PSTR or GEND, or STOP for rink repair, belong to neither team
+        if team is not None:
+            match play["Event"]:
+                case "SHOT":
+                    self.totals[f"{team}_shots"] += 1
+                case "HIT":
+                    self.totals[f"{team}_hits"] += 1
+                case "PENL":
+                    self.totals[f"{team}_pim"] += penalty_minutes(play["Type"])
+                case "GOAL":
+                    self.totals[f"{team}_score"] += 1
+                    if play["Period"] >= 4 and new:
+                        # overtime ends on a goal, show the final score
+                        new[-1] = new[-1]._replace(home_score=self.totals["home_score"], away_score=self.totals["away_score"])
+
+        self.updates.extend(new)
+        return new
+
+    def curve(self) -> tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray]]:
+        """Time series, win probability, and scores for home and away teams so far, the same shape as `meter.predict_game`."""
+        time_elapsed, probabilities, home_scores, away_scores = (np.array(values) for values in zip(*self.updates))
+        return time_elapsed, probabilities, (home_scores, away_scores)
+
+class ReplayFeed:
+    """Plays of a finished game released as the game clock passes them, `speed` game seconds per second.
+
+    Args:
+        plays (pd.DataFrame): one game's play-by-play, in order
+        speed (float | None, optional): Game seconds per second. Defaults to None, releasing every play at once.
+        clock (Callable[[], float], optional): Seconds clock. Defaults to time.monotonic.
+    """
+
+    def __init__(self, plays: pd.DataFrame, speed: float | None = None, clock=time.monotonic):
+        self.plays = plays.to_dict("records")
+        # plays can be out of order or missing a time, each is released with the latest play before it
+        elapsed = (plays["Seconds_Elapsed"] + (plays["Period"] - 1) * 1200).to_numpy(dtype=float)
+        self.release = np.maximum.accumulate(np.nan_to_num(elapsed, nan=0.0)) if len(elapsed) else elapsed
+        self.speed = speed
+        self.clock = clock
+        self.start = clock()
+        self.position = 0
+
+    @classmethod
+    def from_parquet(cls, path: str, game: int, season: int, speed: float | None = None, clock=time.monotonic) -> "ReplayFeed":
+        # only read the one game from the reduced play-by-play
+        plays = pd.read_parquet(path, filters=[("Game_Id", "==", game), ("Season", "==", season)])
+        return cls(plays, speed, clock)
+
+    @property
+    def finished(self) -> bool:
+        return self.position >= len(self.plays)
+
+    def poll(self) -> list[dict]:
+        if self.speed is None:
+            stop = len(self.plays)
+        else:
+            game_clock = (self.clock() - self.start) * self.speed
+            stop = max(int(np.searchsorted(self.release, game_clock, side="right")), self.position)
+
+        plays = self.plays[self.position:stop]
+        self.position = stop
+        return plays
+
+class QueueFeed:
+    """Plays handed over by another thread, like a scraper polling the NHL API during a game."""
+
+    def __init__(self):
+        self.queue = deque()
+        self.finished = False
+
+    def put(self, play: dict):
+        self.queue.append(play)
+
+    def close(self):
+        self.finished = True
+
+    def poll(self) -> list[dict]:
+        # popleft is atomic, so plays put while polling are left for the next call
+        return [self.queue.popleft() for _ in range(len(self.queue))]
+
+class LiveSession:
+    """A live game following a feed."""
+
+    def __init__(self, game: LiveGame, feed: Feed):
+        self.game = game
+        self.feed = feed
+
+    @property
+    def finished(self) -> bool:
+        return self.feed.finished
+
+    def update(self) -> list[Update]:
+        """Push every new play from the feed, returning the new win probabilities."""
+        return [update for play in self.feed.poll() for update in self.game.push(play)]
+
+if __name__ == "__main__":
+    import json
+
+    from dev.inference import load_model
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("game", type=int)
+    parser.add_argument("season", type=int)
+    parser.add_argument("--speed", type=float, default=60, help="game seconds per second, 0 to replay instantly")
+    args = parser.parse_args()
+
+    game_data = pd.read_parquet("data/game_elo.parquet", filters=[("Game_Id", "==", args.game), ("Season", "==", args.season)]).iloc[0]
+    with open("dev/models/one_hot_columns.json", 'r') as f:
+        one_hot_columns = json.load(f)
+
+    live = LiveGame(
+        game_data["Home_Team"], game_data["Away_Team"], game_data["Away_Starting_Elo"], game_data["Home_Starting_Elo"], game_data["Playoff"],
+        load_model("dev/models/meter_lstm16d2.keras"), load_model("dev/models/meter_ot_lstm16d1.keras"), one_hot_columns
+    )
+    session = LiveSession(live, ReplayFeed.from_parquet("data/pbp_reduced.parquet", args.game, args.season, args.speed or None))
+
+    for update in live.updates:
+        print(update)
+    while not session.finished:
+        for update in session.update():
+            print(update)
+        time.sleep(0.5)
@@ -1,6 +1,16 @@
+import functools
+
 import pandas as pd
 import numpy as np
 
+try:
+    from dev import metrics
+    from dev.index import GameIndex, select_game, select_games
+except ModuleNotFoundError:
+    # imported from dev/ by the notebooks
+    import metrics
+    from index import GameIndex, select_game, select_games
+
 
 def plays_preceding_goals(pbp: pd.DataFrame, window_size: int, include_goal: bool = True, convert_winner: bool = False) -> pd.DataFrame:
     """
@@ -67,82 +77,421 @@ def sliding_window_game_pbp(pbp: pd.DataFrame, window_size: int) -> tuple[np.nda
     Returns:
         tuple[np.ndarray, np.ndarray]: Arrays of play-by-play windows and targets (winners), respectively.
     """
-    grouped = pbp.groupby(["season", "game"])  # unnecessary for individual games but don't want to cross over
-    windows = []
-    targets = []
+    # same order as grouping by season and game, stable sort keeps plays in order within each game
+    ordered = pbp.sort_values(["season", "game"], kind="stable")
+    features = ordered.drop("winner", axis=1).iloc[:, 2:]  # skip season and game columns
+
+    try:
+        dtype = np.result_type(*features.dtypes)
+    except TypeError:
+        dtype = np.dtype(object)  # extension dtypes like categoricals
+
+    if dtype == object:
+        # match the types numpy infers from mixed Python values
+        values = np.array(features.to_numpy().tolist())
+    else:
+        values = features.to_numpy(dtype=dtype)
 
-    for group_name, group in grouped:
-        temp_window = []
-        target = group["winner"].iloc[0]  # same for all in group
+    # number each game so windows crossing between games can be dropped
+    seasons = ordered["season"].to_numpy()
+    games = ordered["game"].to_numpy()
+    new_game = np.concatenate(([True], (seasons[1:] != seasons[:-1]) | (games[1:] != games[:-1])))
+    game_number = np.cumsum(new_game) - 1
 
-        for row in group.drop("winner", axis=1).itertuples(index=False):
-            feature_values = list(row)[2:]  # skip season and game columns
-            temp_window.append(feature_values)
+    count = len(ordered) - window_size + 1
+    if count < 1:
+        return np.array([]), np.array([])
 
-            if len(temp_window) == window_size:
-                windows.append(temp_window.copy())
-                targets.append(target)
-                temp_window.pop(0)
+    valid = game_number[:count] == game_number[window_size - 1:]
+    if not valid.any():
+        return np.array([]), np.array([])
 
-    return np.array(windows), np.array(targets)
+    # strided view of every window without copying, shape (windows, features, window_size)
+    views = np.lib.stride_tricks.sliding_window_view(values, window_size, axis=0)
+    windows = views.transpose(0, 2, 1)[valid]
 
-def predict_regulation(game: int, season: int, slices: pd.DataFrame, model) -> tuple[pd.Series, np.ndarray]:
+    # target is the first winner of each game
+    first_winners = ordered["winner"].to_numpy()[new_game]
+    targets = np.array(first_winners[game_number[:count][valid]].tolist())
+
+    return windows, targets
+
+def predict_regulation(game: int, season: int, slices: pd.DataFrame | GameIndex, model) -> tuple[pd.Series, np.ndarray]:
     """Predict regulation win probabilities for given NHL game.
 
     Args:
         game (int): NHL Game ID
         season (int): NHL season
-        ot_pbp (pd.DataFrame): regulation time slice data
+        slices (pd.DataFrame | GameIndex): regulation time slice data
         model (Model): keras Model
 
     Returns:
         tuple[pd.Series, np.ndarray]: Time series and win probability
     """
-    selected_game = slices[(slices["game"] == game) & (slices["season"] == season)]
+    with metrics.stage("predict_regulation", "index_lookup"):
+        selected_game = select_game(slices, game, season)
 
     X = selected_game.drop(columns=["winner", "game", "season"])
 
-    probabilities = model.predict(X, verbose=0)
+    with metrics.stage("predict_regulation", "model_inference"):
+        probabilities = model.predict(X, verbose=0)
 
-    # convert from normalized 1 to 0
-    time_elapsed = 3600 - (selected_game["time_remaining"] * 3600)
+    # convert from normalized 1 to 0, slices end on whole seconds that float32 only stores to within a few milliseconds
+    time_elapsed = (3600 - (selected_game["time_remaining"].astype(float) * 3600)).round()
 
     return (time_elapsed, probabilities.flatten())
 
-def predict_overtime(game: int, season: int, ot_pbp: pd.DataFrame, model, one_hot_columns: list[str]) -> tuple[pd.Series, np.ndarray]:
+def predict_overtime(game: int, season: int, ot_pbp: pd.DataFrame | GameIndex, model, one_hot_columns: list[str]) -> tuple[pd.Series, np.ndarray]:
     """Predict overtime win probabilities for given NHL game.
 
     Args:
         game (int): NHL Game ID
         season (int): NHL season
-        ot_pbp (pd.DataFrame): overtime play-by-play data
+        ot_pbp (pd.DataFrame | GameIndex): overtime play-by-play data
         model (Model): keras Model
         one_hot_columns (list[str]): one-hot encoding columns from training
 
     Returns:
         tuple[pd.Series, np.ndarray]: Time series and win probability
     """
-    window_size = 3
-    mask = (ot_pbp["game"] == game) & (ot_pbp["season"] == season)
-    selected_game = ot_pbp[mask]
+    with metrics.stage("predict_overtime", "index_lookup"):
+        selected_game = select_game(ot_pbp, game, season)
 
-    X = selected_game.drop(["seconds_elapsed"], axis=1)
-    # overtime finished in 2 plays? (minimum FAC, then GOAL)
-    while len(X) < window_size:
-        # copy game, season, and Elo columns
-        # generate remaining blank row and prepend
-        blank_row = X.iloc[:, :4].copy()
-        for col in X.columns[4:]:
-            blank_row[col] = None
+    with metrics.stage("predict_overtime", "encoding"):
+        windows = overtime_windows(selected_game, one_hot_columns)
 
-        X = pd.concat([blank_row, X], ignore_index=True)
+    with metrics.stage("predict_overtime", "model_inference"):
+        probabilities = model.predict(windows, verbose=0)
 
-    # one-hot encode play-by-play and match columns to training data
-    X_encoded = pd.get_dummies(X, columns=["event", "team", "event_zone", "home_zone", "strength"])
-    X_encoded = X_encoded.reindex(columns=one_hot_columns, fill_value=False)
+    return (3600 + selected_game["seconds_elapsed"], probabilities.flatten())
 
-    windows, targets = sliding_window_game_pbp(X_encoded, window_size)
+# play-by-play columns that are one-hot encoded, each value's column named like `pd.get_dummies` as `<column>_<value>`
+categorical_columns = ["event", "team", "event_zone", "home_zone", "strength"]
 
-    probabilities = model.predict(windows, verbose=0)
+class OvertimeEncoder:
+    """One-hot encoder with the fixed columns from training, writing each play's features straight into one array.
+    Gives the same values and type as `pd.get_dummies` reindexed to `one_hot_columns`, without the intermediate DataFrames.
 
-    return (3600 + selected_game["seconds_elapsed"], probabilities.flatten())
+    Args:
+        one_hot_columns (list[str]): one-hot encoding columns from training
+        window_size (int, optional): Size of the sliding window. Defaults to 3.
+    """
+
+    def __init__(self, one_hot_columns: list[str], window_size: int = 3):
+        self.columns = list(one_hot_columns)
+        self.window_size = window_size
+        # model features are the encoded columns without game, season, and winner
+        self.features = [column for column in self.columns if column not in ["game", "season", "winner"]]
+
+        # category: {value: feature position}, values without a column are dropped the same as by `reindex`
+        self.vocabulary = {category: {} for category in categorical_columns}
+        # features copied as they are, like the Elo ratings
+        self.numeric = []
+        for position, column in enumerate(self.features):
+            categories = [category for category in categorical_columns if column.startswith(f"{category}_")]
+            for category in categories:
+                self.vocabulary[category][column[len(category) + 1:]] = position
+            if not categories:
+                self.numeric.append((position, column))
+        self.numeric_positions = [position for position, _ in self.numeric]
+
+    @classmethod
+    def fit(cls, pbp: pd.DataFrame, window_size: int = 3) -> "OvertimeEncoder":
+        """Encoder with a column for every value in the play-by-play, in the same order as `pd.get_dummies`."""
+        columns = [column for column in pbp.columns if column not in categorical_columns]
+        for category in categorical_columns:
+            # sorted values, or the categories in order for categorical columns
+            columns += [f"{category}_{value}" for value in pd.Categorical(pbp[category]).categories]
+
+        return cls(columns, window_size)
+
+    def encode(self, plays: pd.DataFrame) -> np.ndarray:
+        """Features of each play with columns in `features`, typed like the numeric columns.
+
+        Args:
+            plays (pd.DataFrame): play-by-play data
+
+        Returns:
+            np.ndarray: One row of features per play
+        """
+        dtype = np.result_type(*[plays[column].dtype for _, column in self.numeric], np.bool_)
+        rows = np.zeros((len(plays), len(self.features)), dtype=dtype)
+        for position, column in self.numeric:
+            rows[:, position] = plays[column].to_numpy()
+
+        index = np.arange(len(plays))
+        for category, vocabulary in self.vocabulary.items():
+            values = pd.Categorical(plays[category])
+            # column of each category, with -1 for values without one and a trailing -1 for missing values, coded -1
+            lookup = np.array([vocabulary.get(str(value), -1) for value in values.categories] + [-1], dtype=np.intp)
+            positions = lookup[values.codes]
+            found = positions >= 0
+            rows[index[found], positions[found]] = 1
+
+        return rows
+
+    def windows(self, selected_game: pd.DataFrame) -> np.ndarray:
+        """Pad, encode, and window one game's overtime play-by-play for the overtime model.
+
+        Args:
+            selected_game (pd.DataFrame): overtime play-by-play data for a single game
+
+        Returns:
+            np.ndarray: Play-by-play windows
+        """
+        rows = self.encode(selected_game)
+        if not len(rows):
+            return np.empty((0, self.window_size, len(self.features)), dtype=rows.dtype)
+
+        # overtime finished in 2 plays? (minimum FAC, then GOAL)
+        # blank plays keeping the numeric columns are prepended, each time one for every play so far
+        source = np.arange(len(rows))
+        while len(source) < self.window_size:
+            source = np.concatenate([source, source])
+        blank = len(source) - len(rows)
+
+        padded = np.zeros((len(source), rows.shape[1]), dtype=rows.dtype)
+        padded[blank:] = rows
+        padded[:blank, self.numeric_positions] = rows[source[:blank]][:, self.numeric_positions]
+
+        views = np.lib.stride_tricks.sliding_window_view(padded, self.window_size, axis=0)
+        return np.ascontiguousarray(views.transpose(0, 2, 1))
+
+    def training_windows(self, pbp: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """Windows and targets over many games, the same as `sliding_window_game_pbp` of the one-hot encoded play-by-play.
+
+        Args:
+            pbp (pd.DataFrame): NHL play-by-play data with game, season, and winner columns
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Arrays of play-by-play windows and targets (winners), respectively.
+        """
+        encoded = pd.DataFrame(self.encode(pbp), columns=self.features, index=pbp.index)
+        encoded.insert(0, "season", pbp["season"].to_numpy())
+        encoded.insert(0, "game", pbp["game"].to_numpy())
+        encoded["winner"] = pbp["winner"].to_numpy()
+
+        return sliding_window_game_pbp(encoded, self.window_size)
+
+@functools.lru_cache(maxsize=8)
+def overtime_encoder(one_hot_columns: tuple[str, ...], window_size: int = 3) -> OvertimeEncoder:
+    # built once for the columns from training, rather than on every request
+    return OvertimeEncoder(list(one_hot_columns), window_size)
+
+def overtime_windows(selected_game: pd.DataFrame, one_hot_columns: list[str], window_size: int = 3) -> np.ndarray:
+    """Pad, one-hot encode, and window one game's overtime play-by-play for the overtime model.
+
+    Args:
+        selected_game (pd.DataFrame): overtime play-by-play data for a single game
+        one_hot_columns (list[str]): one-hot encoding columns from training
+        window_size (int, optional): Size of the sliding window. Defaults to 3.
+
+    Returns:
+        np.ndarray: Play-by-play windows
+    """
+    return overtime_encoder(tuple(one_hot_columns), window_size).windows(selected_game)
+
+def split_predictions(probabilities: np.ndarray, lengths: np.ndarray) -> list[np.ndarray]:
+    """Split one batch of predictions back into per-game arrays."""
+    return np.split(probabilities.flatten(), np.cumsum(lengths)[:-1])
+
+def predict_regulation_many(games: list[tuple[int, int]], slices: pd.DataFrame | GameIndex, model, batch_size: int = 4096) -> list[tuple[pd.Series, np.ndarray]]:
+    """Predict regulation win probabilities for many NHL games in a single model pass.
+
+    Args:
+        games (list[tuple[int, int]]): NHL Game ID and season pairs
+        slices (pd.DataFrame | GameIndex): regulation time slice data
+        model (Model): keras Model
+        batch_size (int, optional): Rows per model batch. Defaults to 4096.
+
+    Returns:
+        list[tuple[pd.Series, np.ndarray]]: Time series and win probability for each game, in order
+    """
+    with metrics.stage("predict_regulation_many", "index_lookup"):
+        selected_games, lengths = select_games(slices, games)
+
+    X = selected_games.drop(columns=["winner", "game", "season"])
+    with metrics.stage("predict_regulation_many", "model_inference"):
+        if len(X):
+            probabilities = model.predict(X, batch_size=batch_size, verbose=0)
+        else:
+            probabilities = np.empty((0, 1))
+
+    # convert from normalized 1 to 0, slices end on whole seconds that float32 only stores to within a few milliseconds
+    time_elapsed = (3600 - (selected_games["time_remaining"].astype(float) * 3600)).round()
+
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    return [
+        (time_elapsed.iloc[start:stop], probabilities_game)
+        for start, stop, probabilities_game in zip(offsets[:-1], offsets[1:], split_predictions(probabilities, lengths))
+    ]
+
+def predict_overtime_many(games: list[tuple[int, int]], ot_pbp: pd.DataFrame | GameIndex, model, one_hot_columns: list[str],
+                          batch_size: int = 4096) -> list[tuple[pd.Series, np.ndarray]]:
+    """Predict overtime win probabilities for many NHL games in a single model pass.
+
+    Args:
+        games (list[tuple[int, int]]): NHL Game ID and season pairs
+        ot_pbp (pd.DataFrame | GameIndex): overtime play-by-play data
+        model (Model): keras Model
+        one_hot_columns (list[str]): one-hot encoding columns from training
+        batch_size (int, optional): Windows per model batch. Defaults to 4096.
+
+    Returns:
+        list[tuple[pd.Series, np.ndarray]]: Time series and win probability for each game, in order
+    """
+    if not isinstance(ot_pbp, GameIndex):
+        ot_pbp = GameIndex(ot_pbp)
+
+    with metrics.stage("predict_overtime_many", "index_lookup"):
+        selected_games = [ot_pbp.get(game, season) for game, season in games]
+    with metrics.stage("predict_overtime_many", "encoding"):
+        windows = [overtime_windows(selected_game, one_hot_columns) for selected_game in selected_games]
+    lengths = np.array([len(w) for w in windows], dtype=int)
+
+    windows = [w for w in windows if len(w)]
+    with metrics.stage("predict_overtime_many", "model_inference"):
+        if windows:
+            probabilities = model.predict(np.concatenate(windows), batch_size=batch_size, verbose=0)
+        else:
+            probabilities = np.empty((0, 1))
+
+    return [
+        (3600 + selected_game["seconds_elapsed"], probabilities_game)
+        for selected_game, probabilities_game in zip(selected_games, split_predictions(probabilities, lengths))
+    ]
+
+def join_overtime(regulation: tuple[pd.Series, np.ndarray], overtime: tuple[pd.Series, np.ndarray] | None,
+                  selected_game: pd.DataFrame, game_data: pd.Series) -> tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray]]:
+    """Concatenate regulation and overtime predictions with scores into one win probability curve.
+
+    Args:
+        regulation (tuple[pd.Series, np.ndarray]): regulation time series and win probability
+        overtime (tuple[pd.Series, np.ndarray] | None): overtime time series and win probability, if played
+        selected_game (pd.DataFrame): regulation time slice data for the game
+        game_data (pd.Series): NHL game metadata for the game
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray]]: Time series, win probability,
+            and scores for home and away teams, respectively
+    """
+    time_elapsed, probabilities = regulation
+    scores = (selected_game["home_score"].values, selected_game["away_score"].values)
+
+    if overtime is not None:
+        time_elapsed_ot, probabilities_ot = overtime
+
+        # remove last data point of regulation to prevent overlap
+        time_elapsed = pd.concat([time_elapsed[:-1], time_elapsed_ot])
+        probabilities = np.concatenate((probabilities[:-1], probabilities_ot))
+
+        # extend scores with final score
+        length = max(len(probabilities_ot) - 2, 0)  # one data point each removed from end of regulation and overtime
+        scores = (
+            np.concatenate([scores[0], np.full(length, scores[0][-1]), [game_data["Home_Score"]]]),
+            np.concatenate([scores[1], np.full(length, scores[1][-1]), [game_data["Away_Score"]]])
+        )
+
+    # overtime has one time per play but one probability per window,
+    # keep only the points that are graphed so all series have the same length
+    length = len(probabilities)
+    return (time_elapsed.values[:length], probabilities, (scores[0][:length], scores[1][:length]))
+
+def predict_games(games_selected: list[tuple[int, int]], games: pd.DataFrame | GameIndex, slices: pd.DataFrame | GameIndex,
+                  ot_pbp: pd.DataFrame | GameIndex, model_regulation, model_overtime, one_hot_columns: list[str],
+                  batch_size: int = 4096) -> list[tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray]]]:
+    """Predict full win probability curves for many NHL games, one model pass each for regulation and overtime.
+
+    Args:
+        games_selected (list[tuple[int, int]]): NHL Game ID and season pairs
+        games (pd.DataFrame | GameIndex): NHL game metadata
+        slices (pd.DataFrame | GameIndex): regulation time slice data
+        ot_pbp (pd.DataFrame | GameIndex): overtime play-by-play data
+        model_regulation (Model): keras Model for regulation
+        model_overtime (Model): keras Model for overtime
+        one_hot_columns (list[str]): one-hot encoding columns from training
+        batch_size (int, optional): Rows or windows per model batch. Defaults to 4096.
+
+    Returns:
+        list[tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray]]]: Curve for each game, in order
+    """
+    if not isinstance(games, GameIndex):
+        games = GameIndex(games, "Game_Id", "Season")
+    if not isinstance(slices, GameIndex):
+        slices = GameIndex(slices)
+
+    game_data = [games.get(game, season).iloc[0] for game, season in games_selected]
+    overtime_games = [(game, season) for (game, season), data in zip(games_selected, game_data) if data["Period"] > 3]
+
+    regulation = predict_regulation_many(games_selected, slices, model_regulation, batch_size)
+    overtime = dict(zip(overtime_games, predict_overtime_many(overtime_games, ot_pbp, model_overtime, one_hot_columns, batch_size)))
+
+    return [
+        join_overtime(regulation_game, overtime.get((game, season)), slices.get(game, season), data)
+        for (game, season), regulation_game, data in zip(games_selected, regulation, game_data)
+    ]
+
+def predict_game(game: int, season: int, games: pd.DataFrame | GameIndex, slices: pd.DataFrame | GameIndex, ot_pbp: pd.DataFrame | GameIndex,
+                 model_regulation, model_overtime, one_hot_columns: list[str]) -> tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray]]:
+    """Predict the full win probability curve for given NHL game, concatenating overtime if played.
+
+    Args:
+        game (int): NHL Game ID
+        season (int): NHL season
+        games (pd.DataFrame | GameIndex): NHL game metadata
+        slices (pd.DataFrame | GameIndex): regulation time slice data
+        ot_pbp (pd.DataFrame | GameIndex): overtime play-by-play data
+        model_regulation (Model): keras Model for regulation
+        model_overtime (Model): keras Model for overtime
+        one_hot_columns (list[str]): one-hot encoding columns from training
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray]]: Time series, win probability,
+            and scores for home and away teams, respectively
+    """
+    regulation = predict_regulation(game, season, slices, model_regulation)
+
+    with metrics.stage("predict_game", "index_lookup"):
+        game_data = select_game(games, game, season, "Game_Id", "Season").iloc[0]
+    overtime = None
+    if game_data["Period"] > 3:
+        overtime = predict_overtime(game, season, ot_pbp, model_overtime, one_hot_columns)
+
+    return join_overtime(regulation, overtime, select_game(slices, game, season), game_data)
+
+def predict_game_features(game: int, season: int, games: pd.DataFrame | GameIndex, features, model_regulation, model_overtime
+                          ) -> tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray]]:
+    """Predict the full win probability curve for given NHL game from a memory-mapped feature store, the same as `predict_game`.
+
+    Args:
+        game (int): NHL Game ID
+        season (int): NHL season
+        games (pd.DataFrame | GameIndex): NHL game metadata
+        features (FeatureStore): exported features from `dev/features.py`
+        model_regulation (Model): keras Model for regulation
+        model_overtime (Model): keras Model for overtime
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray]]: Time series, win probability,
+            and scores for home and away teams, respectively
+    """
+    with metrics.stage("predict_game_features", "index_lookup"):
+        X = features.regulation(game, season)  # view of the mapped file
+        game_data = select_game(games, game, season, "Game_Id", "Season").iloc[0]
+
+    with metrics.stage("predict_game_features", "model_inference"):
+        probabilities = model_regulation.predict(X, verbose=0).flatten()
+
+    columns = features.columns
+    # convert from normalized 1 to 0, slices end on whole seconds that float32 only stores to within a few milliseconds
+    time_elapsed = pd.Series((3600 - X[:, columns.index("time_remaining")].astype(float) * 3600).round())
+    scores = pd.DataFrame({column: X[:, columns.index(column)].astype(int) for column in ["home_score", "away_score"]})
+
+    overtime = None
+    if game_data["Period"] > 3:
+        seconds, windows = features.overtime(game, season)
+        with metrics.stage("predict_game_features", "model_inference"):
+            probabilities_ot = model_overtime.predict(windows, verbose=0).flatten() if len(windows) else np.array([])
+        overtime = (pd.Series(3600 + seconds.astype(float)), probabilities_ot)
+
+    return join_overtime((time_elapsed, probabilities), overtime, scores, game_data)
@@ -0,0 +1,174 @@
+# Counters and latency histograms for serving graphs, exposed in Prometheus text format on the app's /metrics route
+# recording is a lock and a bisect per observation, set NHL_METER_METRICS=0 to skip even that and remove the route
+# each process keeps its own metrics, so every worker is scraped separately
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+enabled = os.environ.get("NHL_METER_METRICS", "1") != "0"
+
+# seconds, from a cached figure to a cold model load
+default_buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+collectors = []
+
+def escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+def format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    labels = [f'{name}="{escape(value)}"' for name, value in zip(names, values)] + ([extra] if extra else [])
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if value not in (float("inf"), float("-inf")) else ("+Inf" if value > 0 else "-Inf")
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        collectors.append(self)
+
+    def key(self, labels: dict) -> tuple:
+        return tuple(labels[name] for name in self.labels)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    """Total that only increases, like requests or cache hits."""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, description, labels)
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not enabled:
+            return
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self.values.get(self.key(labels), 0)
+
+    def render(self) -> list[str]:
+        with self.lock:
+            values = list(self.values.items())
+        return self.header() + [f"{self.name}{format_labels(self.labels, key)} {format_value(value)}" for key, value in values]
+
+class Gauge(Metric):
+    """Value read when scraped, like the figure cache's size or hit rate."""
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, function):
+        super().__init__(name, description)
+        self.function = function
+
+    def render(self) -> list[str]:
+        return self.header() + [f"{self.name} {format_value(self.function())}"]
+
+class Histogram(Metric):
+    """Distribution of durations in cumulative buckets, with their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = default_buckets):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}
+
+    def observe(self, value: float, **labels):
+        if not enabled:
+            return
+        key = self.key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self.values[key] = (counts, total + value)
+
+    def count(self, **labels) -> int:
+        counts, _ = self.values.get(self.key(labels), ([0], 0.0))
+        return sum(counts)
+
+    def time(self, **labels):
+        """Context manager observing the time spent inside it, nothing when disabled."""
+        return timer(self, labels) if enabled else nullcontext()
+
+    def render(self) -> list[str]:
+        with self.lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self.values.items()]
+
+        lines = self.header()
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket = 'le="' + format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, key, bucket)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+@contextmanager
+def timer(histogram: Histogram, labels: dict):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+callback_seconds = Histogram("nhl_meter_callback_seconds", "Time spent in each Dash callback.", ("callback",))
+callback_requests = Counter("nhl_meter_callback_requests_total", "Calls of each Dash callback by outcome.", ("callback", "status"))
+stage_seconds = Histogram("nhl_meter_stage_seconds", "Time spent in each stage of predicting and drawing a game.", ("function", "stage"))
+cache_requests = Counter("nhl_meter_cache_requests_total", "Lookups in the figure cache and curve store.", ("cache", "result"))
+batch_requests = Histogram("nhl_meter_batch_requests", "Requests combined into each model batch.", ("model",),
+                           (1, 2, 4, 8, 16, 32, 64, 128, 256))
+batch_queue_seconds = Histogram("nhl_meter_batch_queue_seconds", "Time each request waits for its model batch to start.", ("model",))
+batch_rejected = Counter("nhl_meter_batch_rejected_total", "Requests turned away because the inference queue stayed full.", ("model",))
+
+def stage(function: str, name: str):
+    """Time one stage, like `index_lookup`, `model_inference`, `figure_build`, or `serialization`."""
+    return stage_seconds.time(function=function, stage=name)
+
+def instrument_callback(name: str):
+    """Decorator counting and timing a callback, the function is unchanged when disabled."""
+    def decorator(function):
+        if not enabled:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = "error"
+            try:
+                result = function(*args, **kwargs)
+                status = "ok"
+                return result
+            finally:
+                callback_seconds.observe(time.perf_counter() - start, callback=name)
+                callback_requests.inc(callback=name, status=status)
+
+        return wrapper
+
+    return decorator
+
+def render() -> str:
+    """Every metric in Prometheus text format."""
+    return "\n".join(line for collector in collectors for line in collector.render()) + "\n"
+
+def register_route(server, path: str = "/metrics"):
+    """Serve `render` from a Flask server like `app.server`, unless metrics are disabled."""
+    if not enabled:
+        return
+
+    from flask import Response
+
+    server.add_url_rule(path, "metrics", lambda: Response(render(), mimetype="text/plain; version=0.0.4; charset=utf-8"))
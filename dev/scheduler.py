@@ -0,0 +1,150 @@
+# Combines model inputs from concurrent graph requests into one predict call per model, then hands each caller its rows
+# a request waits at most NHL_METER_BATCH_WAIT_MS for others to join, set it to 0 to call the model directly
+# only threads in the same process share a batch, like the threaded development server or gunicorn with NHL_METER_THREADS
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+try:
+    from dev import metrics
+except ModuleNotFoundError:
+    # imported from dev/ by the notebooks
+    import metrics
+
+class Request:
+    """Inputs from one caller, with the event it waits on for its rows of the batch's predictions."""
+
+    def __init__(self, x: np.ndarray):
+        self.x = x
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class BatchScheduler:
+    """Model wrapper whose `predict` queues its inputs for a dispatcher thread, which predicts every queued request at once.
+
+    Args:
+        model (Model): keras Model or NumpyModel
+        name (str): model name in the batching metrics, like `regulation` or `overtime`
+        max_wait (float, optional): Seconds the dispatcher waits for more requests after the first. Defaults to 0.002.
+        max_rows (int, optional): Rows per batch, a single larger request is predicted on its own. Defaults to 8192.
+        max_queue (int, optional): Requests waiting for the dispatcher before callers block. Defaults to 256.
+        timeout (float, optional): Seconds a caller waits for space in the queue and for its result. Defaults to 30.
+    """
+
+    def __init__(self, model, name: str, max_wait: float = 0.002, max_rows: int = 8192, max_queue: int = 256, timeout: float = 30):
+        self.model = model
+        self.name = name
+        self.max_wait = max_wait
+        self.max_rows = max_rows
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self.lock = threading.Lock()
+        self.pid = None
+        self.queue = None
+
+    def start(self):
+        # threads do not survive a fork, so each worker starts its own dispatcher on its first request
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.max_queue)
+            threading.Thread(target=self.dispatch, args=(self.queue,), name=f"batch-{self.name}", daemon=True).start()
+            self.pid = os.getpid()
+
+    def predict(self, x, batch_size: int | None = None, verbose: int = 0) -> np.ndarray:
+        """Predict once the batch holding these inputs has run, accepting the same inputs as `keras.Model.predict`.
+
+        Args:
+            x (np.ndarray | pd.DataFrame): Model inputs
+            batch_size (int | None, optional): Ignored, batches are up to `max_rows`. Defaults to None.
+            verbose (int, optional): Ignored, for compatibility with Keras. Defaults to 0.
+
+        Raises:
+            TimeoutError: queue stayed full or the batch did not finish within `timeout`
+
+        Returns:
+            np.ndarray: Predictions with one row per input row
+        """
+        # both backends compute in float32, converting here lets inputs from different callers stack
+        x = np.asarray(x, dtype=np.float32)
+        if not len(x):
+            return self.model.predict(x, verbose=0)
+
+        self.start()
+        request = Request(x)
+        try:
+            self.queue.put(request, timeout=self.timeout)
+        except queue.Full:
+            metrics.batch_rejected.inc(model=self.name)
+            raise TimeoutError(f"{self.name} inference queue is full")
+
+        if not request.done.wait(self.timeout):
+            raise TimeoutError(f"{self.name} inference did not finish in {self.timeout} seconds")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def collect(self, requests: queue.Queue, carried: Request | None) -> tuple[list[Request], Request | None]:
+        """Wait for the first request, then take more until `max_wait` passes or the next would pass `max_rows`,
+        returning the batch and any request held over for the next one."""
+        batch = [carried if carried is not None else requests.get()]
+        rows = len(batch[0].x)
+        deadline = time.perf_counter() + self.max_wait
+
+        while rows < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = requests.get(timeout=remaining) if remaining > 0 else requests.get_nowait()
+            except queue.Empty:
+                break
+            if rows + len(request.x) > self.max_rows:
+                return batch, request
+            batch.append(request)
+            rows += len(request.x)
+
+        return batch, None
+
+    def dispatch(self, requests: queue.Queue):
+        carried = None
+        while True:
+            batch, carried = self.collect(requests, carried)
+
+            start = time.perf_counter()
+            for request in batch:
+                metrics.batch_queue_seconds.observe(start - request.enqueued, model=self.name)
+            metrics.batch_requests.observe(len(batch), model=self.name)
+
+            lengths = [len(request.x) for request in batch]
+            try:
+                with metrics.stage(f"batch_{self.name}", "model_inference"):
+                    probabilities = self.model.predict(np.concatenate([request.x for request in batch]),
+                                                       batch_size=max(sum(lengths), 32), verbose=0)
+                results = np.split(probabilities, np.cumsum(lengths)[:-1])
+            except Exception as e:
+                # every caller in the batch sees the model's error
+                results = [None] * len(batch)
+                for request in batch:
+                    request.error = e
+
+            for request, result in zip(batch, results):
+                request.result = result
+                request.done.set()
+
+def from_environment(model, name: str):
+    """Scheduler waiting `NHL_METER_BATCH_WAIT_MS` (default 2) for up to `NHL_METER_BATCH_ROWS` rows (default 8192),
+    with up to `NHL_METER_BATCH_QUEUE` waiting requests (default 256), or the model itself if the wait is 0."""
+    max_wait = float(os.environ.get("NHL_METER_BATCH_WAIT_MS", 2)) / 1000
+    if max_wait <= 0:
+        return model
+
+    return BatchScheduler(
+        model, name, max_wait,
+        max_rows=int(os.environ.get("NHL_METER_BATCH_ROWS", 8192)),
+        max_queue=int(os.environ.get("NHL_METER_BATCH_QUEUE", 256))
+    )
@@ -0,0 +1,158 @@
+# Caches rendered figures so popular games are only built once per server, or once across workers with a shared directory
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class FigureCache:
+    """Least recently used cache of serialized figures, limited by total size and number of entries.
+
+    Args:
+        max_bytes (int, optional): Total size of cached figures in memory, encoded as UTF-8. Defaults to 64 MB.
+        max_items (int | None, optional): Number of cached figures, unlimited if None. Defaults to None.
+        directory (str | Path | None, optional): Shared on-disk tier checked on a memory miss,
+            disabled if None. Defaults to None.
+        max_disk_bytes (int, optional): Total size of the on-disk tier, least recently used files are deleted
+            past it. Defaults to 512 MB.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_items: int | None = None, directory: str | Path | None = None,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.max_disk_bytes = max_disk_bytes
+        self.directory = Path(directory) if directory else None
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.entries = OrderedDict()
+        self.bytes = 0
+        # size of the disk tier as of the last walk plus this process's writes since, None until the first write
+        self.disk_bytes = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(home: str, away: str, game: int, season: int, version: str) -> str:
+        return f"{version}/{season}/{game}/{home}/{away}"
+
+    def disk_path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha1(key.encode()).hexdigest()}.json"
+
+    def get(self, key: str) -> str | None:
+        """Serialized figure for key, checking memory then disk.
+
+        Args:
+            key (str): key from `FigureCache.key`
+
+        Returns:
+            str | None: Figure JSON, or None on a miss
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key].decode()
+
+        if self.directory:
+            path = self.disk_path(key)
+            try:
+                value = path.read_text(encoding="utf-8")
+                # recently read files are pruned last
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+            else:
+                with self.lock:
+                    self.disk_hits += 1
+                self.put(key, value, write_disk=False)
+                return value
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: str, write_disk: bool = True):
+        """Cache a serialized figure, evicting the least recently used figures over the limits.
+
+        Args:
+            key (str): key from `FigureCache.key`
+            value (str): Figure JSON
+            write_disk (bool, optional): Also write to the on-disk tier if enabled. Defaults to True.
+        """
+        # held as bytes, so the limit counts the memory used rather than characters
+        encoded = value.encode()
+        size = len(encoded)
+        if size <= self.max_bytes:
+            with self.lock:
+                if key in self.entries:
+                    self.bytes -= len(self.entries.pop(key))
+
+                self.entries[key] = encoded
+                self.bytes += size
+
+                while self.bytes > self.max_bytes or (self.max_items is not None and len(self.entries) > self.max_items):
+                    _, evicted = self.entries.popitem(last=False)
+                    self.bytes -= len(evicted)
+
+        if write_disk and self.directory:
+            # write then rename so other workers never read a partial file
+            with tempfile.NamedTemporaryFile("wb", dir=self.directory, suffix=".tmp", delete=False) as f:
+                f.write(encoded)
+            os.replace(f.name, self.disk_path(key))
+
+            # only walk the directory when this process's count passes the limit, the walk also counts other workers' files
+            with self.lock:
+                if self.disk_bytes is not None:
+                    self.disk_bytes += size
+                walk = self.disk_bytes is None or self.disk_bytes > self.max_disk_bytes
+            if walk:
+                self.prune_disk()
+
+    def prune_disk(self, headroom: float = 0.9):
+        """Count the figures on disk and, past `max_disk_bytes`, delete the least recently used until the tier fits
+        in `headroom` of the limit, so the next walk is not on the next write."""
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # pruned by another worker
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        if total > self.max_disk_bytes:
+            for _, size, path in sorted(files):
+                if total <= self.max_disk_bytes * headroom:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+        with self.lock:
+            self.disk_bytes = total
+
+    def stats(self) -> dict:
+        with self.lock:
+            requests = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / requests if requests else 0.0
+            }
+
+def from_environment() -> FigureCache:
+    """Cache configured by `NHL_METER_FIGURE_CACHE_MB` (default 64), `NHL_METER_FIGURE_CACHE_DIR` (unset disables the disk tier)
+    and `NHL_METER_FIGURE_CACHE_DISK_MB` (default 512)."""
+    return FigureCache(
+        max_bytes=int(float(os.environ.get("NHL_METER_FIGURE_CACHE_MB", 64)) * 1024 * 1024),
+        directory=os.environ.get("NHL_METER_FIGURE_CACHE_DIR") or None,
+        max_disk_bytes=int(float(os.environ.get("NHL_METER_FIGURE_CACHE_DISK_MB", 512)) * 1024 * 1024)
+    )
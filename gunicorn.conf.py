@@ -0,0 +1,35 @@
+# Production server settings, read by gunicorn when started from the project root: gunicorn app:server
+# the app and its data load once in the parent process before forking, so workers share those pages copy-on-write
+# NHL_METER_WORKERS sets the number of worker processes (default one per CPU), PORT the port (default 8050)
+import gc
+import os
+
+# app.py leaves warming to the hooks below
+os.environ["NHL_METER_PRELOAD"] = "1"
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8050)}"
+workers = int(os.environ.get("NHL_METER_WORKERS", os.cpu_count() or 1))
+threads = int(os.environ.get("NHL_METER_THREADS", 1))
+# a worker with one thread has no other requests to share a model batch with
+if threads == 1:
+    os.environ.setdefault("NHL_METER_BATCH_WAIT_MS", "0")
+preload_app = True
+# the first Keras prediction in a worker can take a few seconds
+timeout = 120
+
+# NumPy models are plain arrays, TensorFlow's thread pools do not survive a fork
+preload_models = os.environ.get("NHL_METER_BACKEND", "keras") == "numpy"
+
+def when_ready(server):
+    import registry
+
+    registry.warm(load_models=preload_models)
+    # objects loaded so far are never collected, so the collector does not write to the shared pages
+    gc.freeze()
+    server.log.info(f"Loaded data{' and models' if preload_models else ''} before forking {workers} workers")
+
+def post_fork(server, worker):
+    import registry
+
+    # only the models are left to load with Keras, /readyz reports when they are
+    registry.warm(background=True)
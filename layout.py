@@ -1,9 +1,8 @@
-import pandas as pd
 from dash import dcc, html
 
-games = pd.read_parquet("data/games.parquet")
-teams = games["Home_Team"].unique()
-teams.sort()
+import registry
+
+teams = registry.teams()
 
 linkedin_url = "https://www.linkedin.com/in/abarran/"
 github_url = "https://github.com/abarran02/nhl-meter"
@@ -46,7 +45,17 @@ app_layout = html.Div([
             html.Div([
                 html.Label("Games"),
                 dcc.Dropdown(id="game-dropdown"),
-            ], className="dropdown-container", style={"margin-top": "20px"})
+            ], className="dropdown-container", style={"margin-top": "20px"}),
+            dcc.Checklist(
+                options=[{"label": "Live replay", "value": "live"}],
+                value=[],
+                id="live-switch",
+                style={"margin-top": "20px"}
+            ),
+            # polls the live game while the replay is running
+            dcc.Interval(id="live-interval", interval=1000, disabled=True),
+            # identifies this browser tab's live replay, set on page load
+            dcc.Store(id="client-id", storage_type="session")
         ], style={"flex": "15%"}),
         html.Div([
             dcc.Loading(
@@ -0,0 +1,136 @@
+# Loads each data file and model once, on first use, for the layout, callbacks, and tests
+import functools
+import json
+import os
+import threading
+
+os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"  # silence TensorFlow warnings
+
+import numpy as np
+import pandas as pd
+
+import figure_cache
+from dev import curves, features, scheduler
+from dev.data import schema
+from dev.index import GameIndex
+from dev.inference import load_model  # backend selected by NHL_METER_BACKEND, keras or numpy
+
+
+def lazy(function):
+    """Cache a loader's result, locking so that concurrent first calls only load once."""
+    cached = functools.cache(function)
+    lock = threading.Lock()
+
+    @functools.wraps(function)
+    def wrapper():
+        with lock:
+            return cached()
+
+    wrapper.loaded = lambda: cached.cache_info().currsize > 0
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+@lazy
+def teams() -> np.ndarray:
+    # only the one column is needed to render the layout
+    teams = pd.read_parquet("data/games.parquet", columns=["Home_Team"])["Home_Team"].unique()
+    teams.sort()
+    return teams
+
+@lazy
+def games() -> pd.DataFrame:
+    return pd.read_parquet("data/games.parquet")
+
+@lazy
+def games_index() -> GameIndex:
+    return GameIndex(games(), "Game_Id", "Season")
+
+@lazy
+def slices() -> GameIndex:
+    # sorted once and indexed by (season, game) so each lookup is a contiguous slice
+    # compact types as well, for files written before the schema
+    return GameIndex(schema.compact(pd.read_parquet("data/time_slices.parquet"), "time_slices"))
+
+@lazy
+def ot_pbp() -> GameIndex:
+    return GameIndex(schema.concat([
+        pd.read_parquet("data/regular_ot_pbp.parquet"),
+        pd.read_parquet("data/playoff_ot_pbp.parquet")
+    ], "regular_ot_pbp"))
+
+@lazy
+def one_hot_columns() -> list[str]:
+    with open("dev/models/one_hot_columns.json", 'r') as f:
+        return json.load(f)
+
+@lazy
+def model_regulation():
+    return load_model("dev/models/meter_lstm16d2.keras")
+
+@lazy
+def model_overtime():
+    return load_model("dev/models/meter_ot_lstm16d1.keras")
+
+# graph requests share model batches, others like live mode and backtests call the models directly
+@lazy
+def batched_regulation():
+    return scheduler.from_environment(model_regulation(), "regulation")
+
+@lazy
+def batched_overtime():
+    return scheduler.from_environment(model_overtime(), "overtime")
+
+@lazy
+def curve_version() -> str:
+    # models and data files, so neither stored curves nor cached figures outlive a pipeline run
+    return curves.version()
+
+@lazy
+def curve_store() -> GameIndex | None:
+    # precomputed curves for the current models and data, None until `python -m dev.curves` is run
+    return curves.load_curves(curves.curve_path(curve_version()))
+
+@lazy
+def feature_store() -> features.FeatureStore | None:
+    # memory-mapped features shared by every worker, None until `python -m dev.features` is run
+    return features.load_features(features.feature_path(features.version()))
+
+@lazy
+def figure_cache_store() -> figure_cache.FigureCache:
+    return figure_cache.from_environment()
+
+loaders = [teams, games, games_index, feature_store, slices, ot_pbp, one_hot_columns, model_regulation, model_overtime, curve_version, curve_store]
+models = [model_regulation, model_overtime]
+
+def data_loaders() -> list:
+    # the feature store replaces a copy of the time slices and overtime play-by-play in each worker
+    return [loader for loader in loaders if loader not in models and not (loader in (slices, ot_pbp) and feature_store() is not None)]
+
+def ready() -> bool:
+    """Whether the data and models for drawing any game are loaded, so no request waits on loading."""
+    # without loading the feature store just to check
+    if not feature_store.loaded():
+        return False
+    return all(loader.loaded() for loader in data_loaders() + models)
+
+def warm(background: bool = False, load_models: bool = True) -> threading.Thread | None:
+    """Load every artifact ahead of the first request.
+
+    Args:
+        background (bool, optional): Load in a daemon thread so the app can start serving the layout first. Defaults to False.
+        load_models (bool, optional): Load the models as well as the data. Defaults to True.
+
+    Returns:
+        threading.Thread | None: Loading thread if in the background
+    """
+    def load_all():
+        for loader in data_loaders() + (models if load_models else []):
+            loader()
+
+    if not background:
+        load_all()
+        return None
+
+    thread = threading.Thread(target=load_all, name="registry-warm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,106 @@
+# Generates small play-by-play frames in the scraped format, for comparing pipeline stages against the reference loops
+import numpy as np
+import pandas as pd
+
+events = ["FAC", "SHOT", "HIT", "BLOCK", "MISS", "GIVE", "TAKE", "GOAL", "PENL", "STOP"]
+weights = [0.15, 0.2, 0.2, 0.1, 0.1, 0.07, 0.06, 0.03, 0.04, 0.05]
+penalties = [
+    "HOOKING(2 min)", "Tripping (2 min)", "#17 SMITH Slashing(2 min)", "FIGHTING(maj)",
+    "Roughing(4 min)", "Misconduct(10 min)", "Delay of game(bench)(2 min)", "Unsportsmanlike conduct", None
+]
+strengths = ["5x5", "5x4", "4x5", "4x4", "3x3", "6x5", "5x3", "0x0", "-1x-1"]
+zones = ["Off", "Def", "Neu", None]
+
+def make_pbp(games: pd.DataFrame, seed: int = 0) -> pd.DataFrame:
+    """Random plays for each game, including timing events, long gaps between plays, overtime and shootouts.
+
+    Args:
+        games (pd.DataFrame): NHL game metadata
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: NHL play-by-play data
+    """
+    rng = np.random.default_rng(seed)
+    frames = []
+
+    for game in games.itertuples(index=False):
+        periods = list(range(1, game.Period + 1))
+        rows = []
+        for period in periods:
+            rows.append((period, 0.0, "PSTR", None, None))
+            if period == 5 and not game.Playoff:
+                # shootout
+                rows.append((period, 0.0, "SHOT", game.Home_Team, None))
+                rows.append((period, 0.0, "GOAL", game.Away_Team, None))
+                continue
+
+            seconds = 0.0
+            while True:
+                seconds += float(rng.choice([rng.integers(0, 25), rng.integers(25, 120)], p=[0.85, 0.15]))
+                if seconds >= 1200 or (period >= 4 and len(rows) > 12 and rng.random() < 0.1):
+                    break
+
+                event = rng.choice(events, p=weights)
+                team = rng.choice([game.Home_Team, game.Away_Team])
+                if event == "STOP":
+                    team = None
+                description = rng.choice(penalties) if event == "PENL" else None
+                rows.append((period, seconds, event, team, description))
+
+            rows.append((period, min(seconds, 1200.0), "PEND", None, None))
+        rows.append((periods[-1], rows[-1][1], "GEND", None, None))
+
+        frame = pd.DataFrame(rows, columns=["Period", "Seconds_Elapsed", "Event", "Ev_Team", "Type"])
+        frame["Game_Id"] = game.Game_Id
+        frame["Date"] = game.Date
+        frame["Season"] = game.Season
+        frame["Home_Team"] = game.Home_Team
+        frame["Away_Team"] = game.Away_Team
+        frame["Strength"] = rng.choice(strengths, size=len(frame), p=[0.7, 0.08, 0.08, 0.04, 0.02, 0.03, 0.01, 0.02, 0.02])
+        frame["Ev_Zone"] = rng.choice(zones, size=len(frame))
+        frame["Home_Zone"] = rng.choice(zones, size=len(frame))
+        frames.append(frame)
+
+    return pd.concat(frames, ignore_index=True)
+
+def make_raw_season(games: pd.DataFrame, seed: int = 0) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Random play-by-play and shifts for each game in the format written by `dev/data/scrape.py`.
+
+    Args:
+        games (pd.DataFrame): NHL game metadata
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Play-by-play and shift data
+    """
+    rng = np.random.default_rng(seed)
+    pbp = make_pbp(games, seed).drop(columns="Season")
+
+    goals = pbp["Event"] == "GOAL"
+    pbp["Home_Score"] = (goals & (pbp["Ev_Team"] == pbp["Home_Team"])).groupby(pbp["Game_Id"]).cumsum()
+    pbp["Away_Score"] = (goals & (pbp["Ev_Team"] == pbp["Away_Team"])).groupby(pbp["Game_Id"]).cumsum()
+    pbp["Home_Coach"] = pbp["Home_Team"] + " COACH"
+    pbp["Away_Coach"] = pbp["Away_Team"] + " COACH"
+    pbp["Date"] = pbp["Date"].dt.strftime("%Y-%m-%d")
+    pbp["Game_Id"] = pbp["Game_Id"].astype(str)
+
+    # name column for each ID column
+    players = {f"{team}Player{number}_id": f"{team}Player{number}" for team in ["home", "away"] for number in range(1, 7)}
+    players |= {f"p{number}_ID": f"p{number}_name" for number in range(1, 4)}
+    players |= {"Home_Goalie_Id": "Home_Goalie", "Away_Goalie_Id": "Away_Goalie"}
+
+    shifts = []
+    for id_column, name_column in players.items():
+        ids = rng.integers(8470000, 8470060, size=len(pbp)).astype(float)
+        ids[rng.random(len(pbp)) < 0.03] = np.nan  # empty seat
+        pbp[name_column] = [None if np.isnan(i) else f"PLAYER {int(i) % 100}" for i in ids]
+        if id_column.endswith("Player1_id"):
+            shifts.append(pd.DataFrame({"Game_Id": pbp["Game_Id"], "Period": pbp["Period"], "Player": pbp[name_column], "Player_Id": ids}))
+
+        # player IDs are sometimes missing from the scraped play-by-play, most can be found in the shifts
+        ids[rng.random(len(pbp)) < 0.05] = np.nan
+        pbp[id_column] = ids
+
+    shifts = pd.concat(shifts, ignore_index=True).dropna()
+    return pbp, shifts
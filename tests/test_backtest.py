@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+import registry
+from dev import meter
+from dev.backtest import model_backtest
+from dev.backtest.main import NHL_METER, Backtest
+from dev.benchmark import reference
+
+rng = np.random.default_rng(0)
+size = 5000
+predictions = pd.DataFrame({
+    "season": rng.choice([2021, 2022, 2023], size),
+    "time_elapsed": rng.uniform(0, 4200, size),
+    "probability": rng.uniform(0, 1, size),
+    "home_won": rng.integers(0, 2, size)
+})
+
+def test_backtest_matches_whole_dataset():
+    backtest = Backtest(bins=10, bucket_seconds=1200)
+    # same sums whether predictions arrive together or in chunks
+    for start in range(0, size, 700):
+        chunk = predictions.iloc[start:start + 700]
+        backtest.update(chunk["probability"], chunk["home_won"], chunk["time_elapsed"], chunk["season"])
+
+    p, y = predictions["probability"].to_numpy(), predictions["home_won"].to_numpy()
+    summary = backtest.summary()
+    assert summary["count"].iloc[0] == size
+    np.testing.assert_allclose(summary["brier"].iloc[0], np.mean((p - y) ** 2))
+    np.testing.assert_allclose(summary["log_loss"].iloc[0], -np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+    np.testing.assert_allclose(summary["accuracy"].iloc[0], np.mean((p > 0.5) == y))
+
+    by_season = backtest.summary("season")
+    for season, group in predictions.groupby("season"):
+        np.testing.assert_allclose(by_season.loc[season, "brier"], np.mean((group["probability"] - group["home_won"]) ** 2))
+
+    by_time = backtest.summary("time")
+    assert by_time.index.tolist() == ["0-20", "20-40", "40-60", "OT"]
+    assert by_time.loc["OT", "count"] == (predictions["time_elapsed"] > 3600).sum()
+
+    calibration = backtest.calibration()
+    assert calibration["count"].sum() == size
+    in_bin = (p >= 0.3) & (p < 0.4)
+    np.testing.assert_allclose(calibration.loc[3, "actual"], y[in_bin].mean())
+
+def test_ranked_probability_matches_reference():
+    data = predictions.rename(columns={"probability": "Win_Prob", "home_won": "Home_Won"}).head(500)
+    np.testing.assert_allclose(NHL_METER().ranked_probability(data), reference.ranked_probability(data))
+
+def test_predict_chunks_matches_predict_game():
+    games = registry.games()
+    sample = pd.concat([games[games["Period"] == 3].head(3), games[games["Period"] > 3].head(2)])
+    chunks = list(model_backtest.predict_chunks(
+        sample, registry.slices(), registry.ot_pbp(), registry.model_regulation(), registry.model_overtime(),
+        registry.one_hot_columns(), chunk_size=2
+    ))
+    assert len(chunks) == 3
+    result = pd.concat(chunks, ignore_index=True)
+
+    expected = []
+    for game_data in sample.itertuples():
+        time_elapsed, probabilities, _ = meter.predict_game(
+            game_data.Game_Id, game_data.Season, registry.games_index(), registry.slices(), registry.ot_pbp(),
+            registry.model_regulation(), registry.model_overtime(), registry.one_hot_columns()
+        )
+        expected.append(pd.DataFrame({"time_elapsed": time_elapsed, "probability": probabilities,
+                                      "home_won": game_data.Home_Score > game_data.Away_Score}))
+    expected = pd.concat(expected, ignore_index=True)
+
+    np.testing.assert_allclose(result["time_elapsed"], expected["time_elapsed"])
+    np.testing.assert_allclose(result["probability"], expected["probability"], rtol=1e-5)
+    assert (result["home_won"] == expected["home_won"]).all()
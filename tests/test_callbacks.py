@@ -1,10 +1,15 @@
+import threading
+import time
 from typing import Callable
 
 import pytest
-from dash import Dash
+from dash import Dash, no_update
 from plotly.graph_objects import Figure
 
-from callbacks import register_callbacks, teams
+import registry
+from callbacks import live_polled, live_sessions, register_callbacks, start_live_session, teams
+from dev import live
+from tests.synthetic import make_pbp
 
 
 def get_callback(app: Dash, callback: str) -> Callable:
@@ -80,3 +85,105 @@ def test_update_figure_empty():
     updated_figure = update_figure_callback(home, away, game_season)
 
     assert updated_figure == Figure()  # blank Figure
+
+def test_update_figure_cached():
+    app = Dash(__name__)
+    register_callbacks(app)
+    update_figure_callback = get_callback(app, "probability-graph.figure")
+
+    home = "BOS"
+    away = "PHI"
+    game_season = "30227.2009"
+    registry.figure_cache_store.cache_clear()
+    first = update_figure_callback(home, away, game_season)
+    hits = registry.figure_cache_store().stats()["hits"]
+    second = update_figure_callback(home, away, game_season)  # served from the figure cache
+
+    assert registry.figure_cache_store().stats()["hits"] == hits + 1
+    assert type(second) is type(first)  # same type whether built or cached
+    assert Figure(second) == Figure(first)
+
+def test_update_live_figure():
+    app = Dash(__name__)
+    register_callbacks(app)
+    key = next(output for output in app.callback_map if "probability-graph.figure@" in output)
+    update_live_callback = get_callback(app, key)
+
+    # replay generated plays in place of the reduced play-by-play
+    game_season = "30227.2009"
+    game_data = registry.games_index().get(30227, 2009)
+    session = start_live_session(30227, 2009, live.ReplayFeed(make_pbp(game_data)))
+    live_sessions["tab"] = (game_season, session, threading.Lock())
+    live_polled["tab"] = time.monotonic()
+    figure, finished = update_live_callback(1, "BOS", "PHI", game_season, "tab")
+
+    assert finished
+    assert "tab" not in live_sessions
+    assert len(Figure(figure).data[0].x) == len(session.game.updates) > 1
+
+def test_live_sessions_per_tab(monkeypatch):
+    app = Dash(__name__)
+    register_callbacks(app)
+    toggle_live_callback = get_callback(app, "live-interval.disabled")
+    update_live_callback = get_callback(app, next(output for output in app.callback_map if "probability-graph.figure@" in output))
+
+    # every replay follows generated plays in place of the reduced play-by-play
+    games = registry.games_index()
+    monkeypatch.setattr("callbacks.start_live_session", lambda game, season: start_live_session(
+        game, season, live.ReplayFeed(make_pbp(games.get(game, season)), speed=60)
+    ))
+
+    assert not toggle_live_callback(["live"], "30227.2009", "first")
+    assert not toggle_live_callback(["live"], "30227.2009", "second")
+    # both tabs draw the game, instead of the first poll taking every new play
+    assert update_live_callback(1, "BOS", "PHI", "30227.2009", "first")[0] is not no_update
+    assert update_live_callback(1, "BOS", "PHI", "30227.2009", "second")[0] is not no_update
+
+    # turning live off or choosing another game only affects that tab
+    assert toggle_live_callback([], "30227.2009", "first")
+    assert "first" not in live_sessions
+    assert live_sessions["second"][0] == "30227.2009"
+    toggle_live_callback(["live"], "20001.2007", "second")
+    assert live_sessions["second"][0] == "20001.2007"
+
+    # a tab another worker is replaying turns its interval off
+    assert update_live_callback(2, "BOS", "PHI", "30227.2009", "third") == (no_update, True)
+    toggle_live_callback([], None, "second")
+
+def test_live_start_does_not_block_polls(monkeypatch):
+    app = Dash(__name__)
+    register_callbacks(app)
+    toggle_live_callback = get_callback(app, "live-interval.disabled")
+    update_live_callback = get_callback(app, next(output for output in app.callback_map if "probability-graph.figure@" in output))
+
+    games = registry.games_index()
+    loading = threading.Event()
+    loaded = threading.Event()
+    def slow_start(game, season):
+        if game == 20001:
+            # like reading the play-by-play and loading Keras
+            loading.set()
+            loaded.wait(10)
+        return start_live_session(game, season, live.ReplayFeed(make_pbp(games.get(game, season)), speed=60))
+    monkeypatch.setattr("callbacks.start_live_session", slow_start)
+
+    assert not toggle_live_callback(["live"], "30227.2009", "polling")
+    starting = threading.Thread(target=toggle_live_callback, args=(["live"], "20001.2007", "starting"))
+    starting.start()
+    polls = []
+    polling = threading.Thread(target=lambda: polls.append(update_live_callback(1, "BOS", "PHI", "30227.2009", "polling")))
+    try:
+        assert loading.wait(10)
+        polling.start()
+        # another tab's poll runs while the replay is still starting
+        polling.join(5)
+        assert not polling.is_alive()
+        assert polls[0][0] is not no_update
+    finally:
+        loaded.set()
+        starting.join()
+        polling.join()
+
+    assert live_sessions["starting"][0] == "20001.2007"
+    toggle_live_callback([], None, "polling")
+    toggle_live_callback([], None, "starting")
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from dev.benchmark import reference
+from dev.data import clean
+from tests.synthetic import make_raw_season
+
+games = pd.read_parquet("data/game_elo.parquet")
+pbp, shifts = make_raw_season(games[games["Season"] == 2012].head(20))
+# team penalties have no player ID
+pbp.loc[pbp.index[::50], ["p1_name", "p1_ID"]] = ["Team", None]
+
+on_ice = [f"{team}Player{number}_id" for team in ["home", "away"] for number in range(1, 7)]
+
+def test_fix_missing_ids_matches_reference():
+    expected = reference.fix_missing_ids(pbp.copy(), shifts)
+    result, _ = clean.fix_missing_ids(pbp.copy(), shifts)
+
+    # the original only repaired p3 of the event players
+    pd.testing.assert_frame_equal(result.drop(columns=["p1_ID", "p2_ID"]), expected.drop(columns=["p1_ID", "p2_ID"]))
+
+def test_fix_missing_ids_event_players():
+    result, unresolved = clean.fix_missing_ids(pbp.copy(), shifts)
+    found = set(zip(shifts["Game_Id"], shifts["Player"]))
+
+    for p in ["p1", "p2", "p3"]:
+        missing = result[result[p + "_ID"].isnull() & result[p + "_name"].notnull() & (result[p + "_name"] != "Team")]
+        pairs = set(zip(missing["Game_Id"], missing[p + "_name"]))
+        assert not pairs & found
+        assert unresolved[p + "_ID"] == len(pairs)
+
+    assert (result.loc[result["p1_name"] == "Team", "p1_ID"].isnull()).all()
+    assert sum(unresolved[column] for column in on_ice) > 0
+
+def test_clean_season_fixes_before_filling():
+    cleaned, _ = clean.clean_season(pbp.copy(), shifts.copy(), fix_ids=True)
+    unfixed, _ = clean.clean_season(pbp.copy(), shifts.copy(), fix_ids=False)
+
+    assert (cleaned[on_ice] != 0).sum().sum() > (unfixed[on_ice] != 0).sum().sum()
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pandas as pd
+from keras.models import load_model
+
+from dev import curves, meter
+
+# Load data and models
+games = pd.read_parquet("data/games.parquet")
+slices = pd.read_parquet("data/time_slices.parquet")
+ot_pbp = pd.concat([
+    pd.read_parquet("data/regular_ot_pbp.parquet"),
+    pd.read_parquet("data/playoff_ot_pbp.parquet")
+])
+one_hot_columns = json.load(open("dev/models/one_hot_columns.json", 'r'))
+model_regulation = load_model("dev/models/meter_lstm16d2.keras")
+model_overtime = load_model("dev/models/meter_ot_lstm16d1.keras")
+
+# one regulation and one overtime game, same as test_callbacks.py
+sample = games[((games["Game_Id"] == 30227) & (games["Season"] == 2009))
+               | ((games["Game_Id"] == 30311) & (games["Season"] == 2022))]
+
+def test_lookup_matches_prediction(tmp_path):
+    store = curves.build_curves(sample, slices, ot_pbp, model_regulation, model_overtime, one_hot_columns)
+    path = curves.curve_path("test", tmp_path)
+    path.parent.mkdir(parents=True)
+    store.to_parquet(path, index=False)
+    store = curves.load_curves(path)
+
+    for game in sample.itertuples(index=False):
+        expected = meter.predict_game(game.Game_Id, game.Season, games, slices, ot_pbp, model_regulation, model_overtime, one_hot_columns)
+        time_elapsed, probabilities, scores = curves.lookup_curve(store, game.Game_Id, game.Season)
+
+        np.testing.assert_array_equal(time_elapsed, expected[0])
+        np.testing.assert_allclose(probabilities, expected[1], rtol=1e-6)
+        np.testing.assert_array_equal(scores[0], expected[2][0])
+        np.testing.assert_array_equal(scores[1], expected[2][1])
+
+def test_lookup_miss(tmp_path):
+    assert curves.load_curves(curves.curve_path("missing", tmp_path)) is None
+    assert curves.lookup_curve(None, 30227, 2009) is None
+
+def test_model_version_stable():
+    assert curves.model_version() == curves.model_version()
+    assert len(curves.model_version()) == 12
+
+def test_version_follows_data(tmp_path):
+    data = tmp_path / "time_slices.parquet"
+    data.write_bytes(b"slices")
+    before = curves.version(data=[str(data)])
+
+    assert curves.version(data=[str(data)]) == before
+    # the data pipeline rewriting time slices for changed games
+    data.write_bytes(b"new slices")
+    assert curves.version(data=[str(data)]) != before
+    assert curves.version(data=[str(tmp_path / "missing.parquet")]) != before
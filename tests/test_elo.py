@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from dev.benchmark import reference
+from dev.data import elo
+
+games = pd.read_parquet("data/games.parquet")
+# includes copying the Thrashers' rating to Winnipeg
+sample = games[games["Season"].between(2010, 2012)].reset_index(drop=True)
+
+def test_elo_matches_reference():
+    expected = reference.add_and_run_elo_by_season(sample)
+    result = elo.add_and_run_elo_by_season(sample)
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+def test_sweep_matches_single_configurations():
+    k, regression = elo.config_grid([10, 20, 35], [0, 1/3., 0.5])
+    away_elo, home_elo = elo.elo_sweep(sample, k, regression)
+    assert away_elo.shape == (len(sample), 9)
+
+    for i in range(len(k)):
+        result, _ = elo.run_elo(sample, k=k[i], regression=regression[i])
+        np.testing.assert_array_equal(away_elo[:, i], result["Away_Starting_Elo"])
+        np.testing.assert_array_equal(home_elo[:, i], result["Home_Starting_Elo"])
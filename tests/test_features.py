@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from plotly.graph_objects import Figure
+
+import registry
+from dev import features, meter
+from dev.index import GameIndex
+
+games = registry.games()
+sample = pd.concat([games[games["Period"] == 3].head(5), games[games["Period"] > 3].head(5)])
+pairs = list(zip(sample["Game_Id"], sample["Season"]))
+
+def export(path) -> features.FeatureStore:
+    slices = GameIndex(pd.concat([registry.slices().get(game, season) for game, season in pairs]))
+    ot_pbp = GameIndex(pd.concat([registry.ot_pbp().get(game, season) for game, season in pairs]))
+    features.export_features(slices, ot_pbp, registry.one_hot_columns(), path / "features")
+    return features.load_features(path / "features")
+
+def test_predictions_match_predict_game(tmp_path):
+    store = export(tmp_path)
+    assert len(store) == len(pairs)
+
+    for game, season in pairs:
+        expected = meter.predict_game(game, season, registry.games_index(), registry.slices(), registry.ot_pbp(),
+                                      registry.model_regulation(), registry.model_overtime(), registry.one_hot_columns())
+        time_elapsed, probabilities, scores = meter.predict_game_features(game, season, registry.games_index(), store,
+                                                                          registry.model_regulation(), registry.model_overtime())
+
+        np.testing.assert_allclose(time_elapsed, expected[0])
+        np.testing.assert_allclose(probabilities, expected[1], rtol=1e-6)
+        np.testing.assert_array_equal(scores[0], expected[2][0])
+        np.testing.assert_array_equal(scores[1], expected[2][1])
+
+def test_games_are_views_of_mapped_files(tmp_path):
+    store = export(tmp_path)
+    game, season = pairs[-1]
+
+    assert np.shares_memory(store.regulation(game, season), store.regulation_features)
+    seconds, windows = store.overtime(game, season)
+    assert np.shares_memory(windows, store.overtime_windows)
+    assert isinstance(store.regulation_features, np.memmap)
+
+    assert (game, season) in store
+    assert len(store.regulation(0, season)) == 0
+
+def test_missing_store():
+    assert features.load_features("data/features/missing") is None
+
+def test_update_figure_uses_store(tmp_path, monkeypatch):
+    from dash import Dash
+
+    from callbacks import register_callbacks
+
+    def predict_game(*args):
+        raise AssertionError("predicted from the time slices")
+
+    store = export(tmp_path)
+    monkeypatch.setattr(registry, "feature_store", lambda: store)
+    monkeypatch.setattr(registry, "curve_store", lambda: None)
+    monkeypatch.setattr(meter, "predict_game", predict_game)
+    registry.figure_cache_store.cache_clear()
+
+    app = Dash(__name__)
+    register_callbacks(app)
+    update_figure = app.callback_map["probability-graph.figure"]["callback"].__wrapped__
+    row = sample.iloc[-1]
+    figure = update_figure(row["Home_Team"], row["Away_Team"], f"{row['Game_Id']}.{row['Season']}")
+
+    assert len(Figure(figure).data[0].x) > 0
+    registry.figure_cache_store.cache_clear()
+
+def test_version_follows_data(tmp_path):
+    data = tmp_path / "time_slices.parquet"
+    data.write_bytes(b"slices")
+    before = features.version(data=[str(data)])
+
+    assert features.version(data=[str(data)]) == before
+    # the data pipeline writing new outputs
+    data.write_bytes(b"new slices")
+    assert features.version(data=[str(data)]) != before
@@ -0,0 +1,84 @@
+import os
+
+from figure_cache import FigureCache
+
+
+def test_hits_and_misses():
+    cache = FigureCache()
+    key = cache.key("BOS", "PHI", 30227, 2009, "abc")
+
+    assert cache.get(key) is None
+    cache.put(key, '{"data": []}')
+    assert cache.get(key) == '{"data": []}'
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
+
+def test_evicts_least_recently_used():
+    cache = FigureCache(max_bytes=30)
+    cache.put("a", "x" * 10)
+    cache.put("b", "x" * 10)
+    cache.put("c", "x" * 10)
+    cache.get("a")  # most recently used
+    cache.put("d", "x" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["bytes"] <= 30
+
+def test_counts_encoded_bytes():
+    cache = FigureCache(max_bytes=30)
+    cache.put("a", "\u00e9" * 10)  # 10 characters, 20 bytes
+
+    assert cache.stats()["bytes"] == 20
+    assert cache.get("a") == "\u00e9" * 10
+    cache.put("b", "\u00e9" * 10)
+    assert cache.get("a") is None
+
+def test_item_limit_and_oversized():
+    cache = FigureCache(max_bytes=100, max_items=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.put("c", "3")
+    cache.put("big", "x" * 101)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get("a") is None
+    assert cache.get("big") is None
+
+def test_disk_tier_shared(tmp_path):
+    worker_a = FigureCache(directory=tmp_path)
+    worker_b = FigureCache(directory=tmp_path)
+    key = worker_a.key("CAR", "FLA", 30311, 2022, "abc")
+
+    worker_a.put(key, '{"data": [1]}')
+
+    assert worker_b.get(key) == '{"data": [1]}'
+    assert worker_b.stats()["disk_hits"] == 1
+    assert worker_b.get(key) == '{"data": [1]}'  # now in memory
+    assert worker_b.stats()["hits"] == 1
+
+def test_disk_tier_pruned(tmp_path):
+    cache = FigureCache(directory=tmp_path, max_disk_bytes=30)
+    for i, key in enumerate("abc"):
+        cache.put(key, "x" * 10)
+        os.utime(cache.disk_path(key), (i, i))  # a is the least recently used
+    cache.put("d", "x" * 10)
+
+    assert not cache.disk_path("a").exists()
+    assert cache.disk_path("d").exists()
+    assert sum(path.stat().st_size for path in tmp_path.glob("*.json")) <= 30
+
+def test_disk_tier_walked_past_limit(tmp_path, monkeypatch):
+    cache = FigureCache(directory=tmp_path, max_disk_bytes=30)
+    walks = []
+    prune_disk = cache.prune_disk
+    monkeypatch.setattr(cache, "prune_disk", lambda: walks.append(1) or prune_disk())
+
+    cache.put("a", "x" * 10)  # counts the existing files once
+    cache.put("b", "x" * 10)
+    cache.put("c", "x" * 10)
+    assert len(walks) == 1
+    cache.put("d", "x" * 10)
+    assert len(walks) == 2
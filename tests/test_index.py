@@ -0,0 +1,32 @@
+import pandas as pd
+
+from dev.index import GameIndex, select_game
+
+ot_pbp = pd.concat([
+    pd.read_parquet("data/regular_ot_pbp.parquet"),
+    pd.read_parquet("data/playoff_ot_pbp.parquet")
+])
+games = pd.read_parquet("data/games.parquet")
+
+def test_index_matches_mask():
+    index = GameIndex(ot_pbp)
+
+    for game, season in [(20003, 2007), (30112, 2007), (30311, 2022)]:
+        expected = select_game(ot_pbp, game, season)
+        selected = index.get(game, season)
+
+        assert not selected.empty
+        pd.testing.assert_frame_equal(selected.reset_index(drop=True), expected.reset_index(drop=True))
+
+def test_index_covers_all_games():
+    index = GameIndex(games, "Game_Id", "Season")
+
+    assert len(index) == len(games)
+    assert (20001, 2007) in index
+    assert index.get(20001, 2007).iloc[0]["Home_Team"] == "L.A"
+
+def test_index_missing_game():
+    index = GameIndex(ot_pbp)
+
+    assert (1, 1900) not in index
+    assert index.get(1, 1900).empty
@@ -0,0 +1,46 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from keras.models import load_model
+
+from dev import meter
+from dev.index import GameIndex
+from dev.inference import NumpyModel
+from dev.inference import load_model as load_model_backend
+
+slices = pd.read_parquet("data/time_slices.parquet")
+ot_pbp = GameIndex(pd.concat([
+    pd.read_parquet("data/regular_ot_pbp.parquet"),
+    pd.read_parquet("data/playoff_ot_pbp.parquet")
+]))
+one_hot_columns = json.load(open("dev/models/one_hot_columns.json", 'r'))
+
+def test_regulation_matches_keras():
+    X = slices.drop(columns=["winner", "game", "season"]).iloc[::50]
+
+    expected = load_model("dev/models/meter_lstm16d2.keras").predict(X, batch_size=4096, verbose=0)
+    probabilities = NumpyModel("dev/models/meter_lstm16d2.keras").predict(X)
+
+    assert probabilities.shape == expected.shape
+    np.testing.assert_allclose(probabilities, expected, atol=1e-5)
+
+def test_overtime_matches_keras():
+    windows = np.concatenate([
+        meter.overtime_windows(ot_pbp.frame.iloc[start:stop], one_hot_columns)
+        for start, stop in list(ot_pbp.offsets.values())[::20]
+    ])
+
+    expected = load_model("dev/models/meter_ot_lstm16d1.keras").predict(windows, batch_size=4096, verbose=0)
+    probabilities = NumpyModel("dev/models/meter_ot_lstm16d1.keras").predict(windows, batch_size=100)
+
+    assert probabilities.shape == expected.shape
+    np.testing.assert_allclose(probabilities, expected, atol=1e-5)
+
+def test_backend_switch(monkeypatch):
+    monkeypatch.setenv("NHL_METER_BACKEND", "numpy")
+    assert isinstance(load_model_backend("dev/models/meter_lstm16d2.keras"), NumpyModel)
+
+    with pytest.raises(ValueError):
+        load_model_backend("dev/models/meter_lstm16d2.keras", backend="torch")
@@ -0,0 +1,112 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from dev import live, meter
+from dev.data import slice_and_reduce
+from dev.inference import NumpyModel
+from tests.synthetic import make_pbp
+
+games = pd.read_parquet("data/game_elo.parquet")
+one_hot_columns = json.load(open("dev/models/one_hot_columns.json", 'r'))
+model_regulation = NumpyModel("dev/models/meter_lstm16d2.keras")
+model_overtime = NumpyModel("dev/models/meter_ot_lstm16d1.keras")
+
+# regulation, regular season overtime and shootout, and playoff overtime
+sample = pd.concat([
+    games[games["Period"] == 3].head(2),
+    games[~games["Playoff"] & (games["Period"] == 4)].head(2),
+    games[~games["Playoff"] & (games["Period"] == 5)].head(1),
+    games[games["Playoff"] & (games["Period"] > 4)].head(2)
+], ignore_index=True)
+pbp = make_pbp(sample)
+
+def replay(game_data: pd.Series, plays: pd.DataFrame) -> live.LiveGame:
+    game = live.LiveGame(game_data["Home_Team"], game_data["Away_Team"], game_data["Away_Starting_Elo"], game_data["Home_Starting_Elo"],
+                         game_data["Playoff"], model_regulation, model_overtime, one_hot_columns)
+    live.LiveSession(game, live.ReplayFeed(plays)).update()
+    return game
+
+def assert_matches_historical(sample: pd.DataFrame, pbp: pd.DataFrame):
+    slices = slice_and_reduce.slice_regulation(sample, pbp)
+    _, regular_ot, playoff_ot = slice_and_reduce.reduce_all(sample, pbp)
+    ot_pbp = pd.concat([regular_ot, playoff_ot], ignore_index=True)
+
+    for game_data in sample.itertuples(index=False):
+        game_data = pd.Series(game_data._asdict())
+        game, season = game_data["Game_Id"], game_data["Season"]
+        updates = replay(game_data, pbp[pbp["Game_Id"] == game]).updates
+
+        expected_time, expected = meter.predict_regulation(game, season, slices, model_regulation)
+        regulation = updates[:len(expected)]
+        np.testing.assert_allclose([u.probability for u in regulation], expected, rtol=1e-5)
+        # the historical times are converted back from normalized time remaining
+        np.testing.assert_allclose([u.time_elapsed for u in regulation], expected_time.values)
+
+        overtime = updates[len(expected):]
+        if game_data["Period"] == 3:
+            assert not overtime
+            continue
+
+        expected_time, expected = meter.predict_overtime(game, season, ot_pbp, model_overtime, one_hot_columns)
+        # one update per play, the historical windows start at the third play
+        assert len(overtime) == len(expected_time)
+        np.testing.assert_allclose([u.probability for u in overtime][-len(expected):], expected, rtol=1e-5)
+        np.testing.assert_array_equal([u.time_elapsed for u in overtime], expected_time.values)
+
+def test_live_matches_historical():
+    assert_matches_historical(sample, pbp)
+
+def test_live_overtime_opening_faceoff():
+    # real overtimes open with a faceoff at 0 seconds of period 4, exactly 3600 seconds into the game
+    overtime_games = sample[sample["Period"] > 3]
+    plays = pbp[pbp["Game_Id"].isin(overtime_games["Game_Id"])].reset_index(drop=True)
+    opening = plays[(plays["Period"] == 4) & (plays["Event"] == "PSTR")]
+    faceoffs = opening.assign(Event="FAC", Ev_Team=opening["Home_Team"], Ev_Zone="Neu", Home_Zone="Neu")
+    plays = pd.concat([plays, faceoffs]).sort_index(kind="stable").reset_index(drop=True)
+
+    assert_matches_historical(overtime_games.reset_index(drop=True), plays)
+
+def test_live_totals_match_slices():
+    game_data = sample.iloc[0]
+    plays = pbp[pbp["Game_Id"] == game_data["Game_Id"]]
+    slices = slice_and_reduce.slice_regulation(sample.iloc[:1], plays)
+    game = replay(game_data, plays)
+
+    assert len(game.updates) == len(slices)
+    assert [u.home_score for u in game.updates] == slices["home_score"].tolist()
+    assert [u.away_score for u in game.updates] == slices["away_score"].tolist()
+
+def test_replay_feed_releases_by_game_clock():
+    plays = pbp[pbp["Game_Id"] == sample["Game_Id"].iloc[0]]
+    now = [0.0]
+    feed = live.ReplayFeed(plays, speed=60, clock=lambda: now[0])
+
+    released = feed.poll()
+    now[0] = 10  # ten minutes of the first period
+    released += feed.poll()
+    elapsed = plays["Seconds_Elapsed"] + (plays["Period"] - 1) * 1200
+    assert len(released) == (elapsed <= 600).cummin().sum()
+
+    now[0] = 1000
+    released += feed.poll()
+    assert feed.finished
+    assert len(released) == len(plays)
+
+def test_queue_feed_matches_replay():
+    game_data = sample.iloc[2]
+    plays = pbp[pbp["Game_Id"] == game_data["Game_Id"]]
+    expected = replay(game_data, plays).updates
+
+    feed = live.QueueFeed()
+    session = live.LiveSession(live.LiveGame(game_data["Home_Team"], game_data["Away_Team"], game_data["Away_Starting_Elo"],
+                                             game_data["Home_Starting_Elo"], game_data["Playoff"], model_regulation, model_overtime,
+                                             one_hot_columns), feed)
+    for play in plays.to_dict("records"):
+        feed.put(play)
+        session.update()
+    feed.close()
+
+    assert session.finished
+    assert session.game.updates == expected
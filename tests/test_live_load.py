@@ -0,0 +1,18 @@
+import pytest
+
+import registry
+from dev.benchmark import live_load
+
+models = {
+    "regulation": registry.model_regulation(),
+    "overtime": registry.model_overtime(),
+    "one_hot_columns": registry.one_hot_columns()
+}
+
+@pytest.mark.parametrize("target", ["live", "callback", "meter"])
+def test_run_every_target(target):
+    # catches changes to the callbacks or predictors the load generator drives
+    summary = live_load.run(target, 2, None, 1, models)
+
+    assert summary["target"] == target
+    assert summary["updates"] > 0
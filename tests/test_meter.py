@@ -0,0 +1,114 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+import registry
+from dev import meter
+from dev.benchmark import reference
+
+ot_pbp = pd.concat([
+    pd.read_parquet("data/regular_ot_pbp.parquet"),
+    pd.read_parquet("data/playoff_ot_pbp.parquet")
+], ignore_index=True)
+one_hot_columns = json.load(open("dev/models/one_hot_columns.json", 'r'))
+
+def assert_same_windows(pbp: pd.DataFrame, window_size: int):
+    expected_windows, expected_targets = reference.sliding_window_game_pbp(pbp, window_size)
+    windows, targets = meter.sliding_window_game_pbp(pbp, window_size)
+
+    assert windows.shape == expected_windows.shape
+    assert windows.dtype == expected_windows.dtype
+    np.testing.assert_array_equal(windows, expected_windows)
+    np.testing.assert_array_equal(targets, expected_targets)
+
+def test_sliding_window_training():
+    # same preprocessing as lstm_ot.ipynb on a subset of seasons
+    df = ot_pbp[ot_pbp["season"] < 2010].drop("seconds_elapsed", axis=1).reset_index(drop=True)
+    df = meter.plays_preceding_goals(df, 3, convert_winner=True)
+    one_hot = pd.get_dummies(df, columns=["event", "team", "event_zone", "home_zone", "strength"])
+
+    assert_same_windows(one_hot, 3)
+
+def test_sliding_window_serving():
+    # same preprocessing as predict_overtime, unsorted games and several window sizes
+    df = ot_pbp.sample(frac=1, random_state=0).sort_values("game", kind="stable").head(2000)
+    X = pd.get_dummies(df.drop(["seconds_elapsed"], axis=1), columns=["event", "team", "event_zone", "home_zone", "strength"])
+    X = X.reindex(columns=one_hot_columns, fill_value=False)
+
+    for window_size in [1, 3, 10]:
+        assert_same_windows(X, window_size)
+
+def test_sliding_window_short():
+    X = ot_pbp.head(2).drop(["seconds_elapsed"], axis=1)
+    X = pd.get_dummies(X, columns=["event", "team", "event_zone", "home_zone", "strength"])
+
+    assert_same_windows(X, 3)
+
+def test_predict_many_matches_single():
+    games = registry.games()
+    slices = registry.slices()
+    ot_index = registry.ot_pbp()
+    model_regulation = registry.model_regulation()
+    model_overtime = registry.model_overtime()
+
+    sample = [(20003, 2007), (30227, 2009), (30311, 2022), (20001, 2007)]
+
+    regulation = meter.predict_regulation_many(sample, slices, model_regulation, batch_size=64)
+    for (game, season), (time_elapsed, probabilities) in zip(sample, regulation):
+        expected_time, expected_probabilities = meter.predict_regulation(game, season, slices, model_regulation)
+        np.testing.assert_array_equal(time_elapsed.values, expected_time.values)
+        np.testing.assert_allclose(probabilities, expected_probabilities, rtol=1e-5)
+
+    overtime = [(20003, 2007), (30311, 2022)]
+    predictions = meter.predict_overtime_many(overtime, ot_index, model_overtime, one_hot_columns, batch_size=64)
+    for (game, season), (time_elapsed, probabilities) in zip(overtime, predictions):
+        expected_time, expected_probabilities = meter.predict_overtime(game, season, ot_index, model_overtime, one_hot_columns)
+        np.testing.assert_array_equal(time_elapsed.values, expected_time.values)
+        np.testing.assert_allclose(probabilities, expected_probabilities, rtol=1e-5)
+
+    curves = meter.predict_games(sample, games, slices, ot_index, model_regulation, model_overtime, one_hot_columns)
+    for (game, season), curve in zip(sample, curves):
+        expected = meter.predict_game(game, season, games, slices, ot_index, model_regulation, model_overtime, one_hot_columns)
+        np.testing.assert_array_equal(curve[0], expected[0])
+        np.testing.assert_allclose(curve[1], expected[1], rtol=1e-5)
+        np.testing.assert_array_equal(curve[2][0], expected[2][0])
+        np.testing.assert_array_equal(curve[2][1], expected[2][1])
+
+def test_overtime_encoder_matches_reference():
+    # shortest and longest overtimes, with the raw and compact column types
+    for frame in [ot_pbp, registry.ot_pbp().frame]:
+        lengths = frame.groupby(["season", "game"], observed=True).size().sort_values(kind="stable")
+        for season, game in list(lengths.index[:5]) + list(lengths.index[-5:]):
+            selected_game = frame[(frame["season"] == season) & (frame["game"] == game)]
+            expected = reference.overtime_windows(selected_game, one_hot_columns)
+            windows = meter.overtime_windows(selected_game, one_hot_columns)
+
+            assert windows.dtype == expected.dtype
+            assert windows.shape == expected.shape
+            assert windows.tobytes() == expected.tobytes()
+
+def test_overtime_encoder_training():
+    df = ot_pbp[ot_pbp["season"] < 2010].drop("seconds_elapsed", axis=1).reset_index(drop=True)
+    df = meter.plays_preceding_goals(df, 3, convert_winner=True)
+    one_hot = pd.get_dummies(df, columns=meter.categorical_columns)
+    expected_windows, expected_targets = meter.sliding_window_game_pbp(one_hot, 3)
+
+    encoder = meter.OvertimeEncoder.fit(df, 3)
+    windows, targets = encoder.training_windows(df)
+
+    assert encoder.columns == list(one_hot.columns)
+    assert windows.dtype == expected_windows.dtype
+    assert windows.tobytes() == expected_windows.tobytes()
+    np.testing.assert_array_equal(targets, expected_targets)
+
+def test_overtime_encoder_unknown_values():
+    encoder = meter.OvertimeEncoder(one_hot_columns)
+    plays = ot_pbp.head(2).copy()
+    plays["event"] = ["PSTR", None]
+
+    rows = encoder.encode(plays)
+
+    assert not rows[:, [encoder.features.index(column) for column in encoder.features if column.startswith("event_")
+                        and not column.startswith("event_zone_")]].any()
+    np.testing.assert_array_equal(rows[:, encoder.features.index("away_elo")], plays["away_elo"])
@@ -0,0 +1,64 @@
+import pytest
+from dash import Dash
+
+import registry
+from callbacks import register_callbacks
+from dev import metrics
+from layout import app_layout
+
+
+@pytest.fixture
+def histogram():
+    histogram = metrics.Histogram("test_seconds", "Test durations.", ("name",), buckets=(0.1, 1.0))
+    yield histogram
+    metrics.collectors.remove(histogram)
+
+def test_histogram_render(histogram):
+    histogram.observe(0.05, name="a")
+    histogram.observe(0.5, name="a")
+    histogram.observe(5, name="a")
+
+    lines = histogram.render()
+    assert "# TYPE test_seconds histogram" in lines
+    # buckets are cumulative, ending with every observation
+    assert 'test_seconds_bucket{name="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{name="a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{name="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_sum{name="a"} 5.55' in lines
+    assert 'test_seconds_count{name="a"} 3' in lines
+    assert histogram.count(name="a") == 3
+
+def test_disabled(histogram, monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", False)
+
+    def function():
+        return 1
+
+    assert metrics.instrument_callback("test")(function) is function
+    with histogram.time(name="a"):
+        pass
+    assert histogram.count(name="a") == 0
+
+def test_metrics_route():
+    app = Dash(__name__)
+    app.layout = app_layout
+    register_callbacks(app)
+    metrics.register_route(app.server)
+    update_figure = app.callback_map["probability-graph.figure"]["callback"].__wrapped__
+
+    registry.figure_cache_store.cache_clear()
+    before = metrics.callback_requests.value(callback="update_figure", status="ok")
+    hits = metrics.cache_requests.value(cache="figure", result="hit")
+    update_figure("BOS", "PHI", "30227.2009")
+    update_figure("BOS", "PHI", "30227.2009")
+
+    assert metrics.callback_requests.value(callback="update_figure", status="ok") == before + 2
+    assert metrics.cache_requests.value(cache="figure", result="hit") == hits + 1
+
+    response = app.server.test_client().get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert 'nhl_meter_callback_seconds_count{callback="update_figure"}' in text
+    assert 'nhl_meter_stage_seconds_count{function="update_figure",stage="figure_build"}' in text
+    assert "nhl_meter_figure_cache_hit_ratio 0.5" in text
@@ -0,0 +1,123 @@
+import pandas as pd
+
+from dev.data import clean, elo, pipeline, schema, slice_and_reduce, tidy
+from tests.synthetic import make_raw_season
+
+games = pd.read_parquet("data/game_elo.parquet")
+
+# two season files, the second with playoff overtime
+sample = pd.concat([
+    games[games["Season"] == 2007].head(80),
+    games[games["Season"] == 2008].head(60),
+    games[(games["Season"] == 2008) & games["Playoff"] & (games["Period"] > 3)].head(10)
+])
+raw = {season: make_raw_season(season_games, seed=season) for season, season_games in sample.groupby("Season")}
+
+def serial(raw: dict[int, tuple[pd.DataFrame, pd.DataFrame]]) -> dict[str, pd.DataFrame]:
+    # same stages as raw_to_reduced.py
+    cleaned = [clean.clean_season(pbp.copy(), shifts.copy(), fix_ids=True)[0] for pbp, shifts in raw.values()]
+    pbp, games, players = tidy.tidy_pbp(pd.concat(cleaned, ignore_index=True))
+    games = elo.add_and_run_elo_by_season(games)
+    regulation, regular_ot, playoff_ot = slice_and_reduce.reduce_all(games, pbp)
+
+    outputs = {
+        "pbp_reduced": pbp,
+        "game_elo": games,
+        "players": players,
+        "time_slices": slice_and_reduce.slice_regulation(games, pbp),
+        "regulation_pbp": regulation,
+        "regular_ot_pbp": regular_ot,
+        "playoff_ot_pbp": playoff_ot
+    }
+    return {name: schema.compact(frame, name) for name, frame in outputs.items()}
+
+def write_raw(raw: dict[int, tuple[pd.DataFrame, pd.DataFrame]], data_path):
+    (data_path / "pbp").mkdir(exist_ok=True)
+    for year, (pbp, shifts) in raw.items():
+        pbp.to_parquet(data_path / "pbp" / f"game_{year}.parquet")
+        shifts.to_parquet(data_path / "pbp" / f"shift_{year}.parquet")
+
+def assert_matches_serial(raw: dict[int, tuple[pd.DataFrame, pd.DataFrame]], data_path):
+    for name, expected in serial(raw).items():
+        result = pd.read_parquet(data_path / f"{name}.parquet")
+        expected = expected.reset_index(drop=True)
+        if name == "players":
+            result = result.sort_values(["player", "playerId"], ignore_index=True)
+            expected = expected.sort_values(["player", "playerId"], ignore_index=True)
+
+        pd.testing.assert_frame_equal(result, expected, obj=name)
+
+def parts(data_path, name: str, year: int) -> list[str]:
+    return sorted(part.name for part in pipeline.partition_path(data_path, name, year).glob("*.parquet"))
+
+def test_pipeline_matches_serial(tmp_path):
+    write_raw(raw, tmp_path)
+
+    timings = pipeline.run_pipeline(tmp_path, workers=2)
+    assert {"clean", "tidy", "elo wall", "slice", "reduce"} <= set(timings)
+
+    assert_matches_serial(raw, tmp_path)
+    assert parts(tmp_path, "time_slices", 2008) == ["00001.parquet"]
+
+def test_pipeline_appends_new_games(tmp_path):
+    pbp, shifts = raw[2008]
+    first_games = pbp["Game_Id"].unique()[:25]
+    partial = {2007: raw[2007], 2008: (pbp[pbp["Game_Id"].isin(first_games)], shifts[shifts["Game_Id"].isin(first_games)])}
+    write_raw(partial, tmp_path)
+    pipeline.run_pipeline(tmp_path, workers=2)
+    unchanged = pipeline.partition_path(tmp_path, "time_slices", 2007) / "00001.parquet"
+    modified = unchanged.stat().st_mtime_ns
+
+    # the rest of the 2008 games are scraped
+    write_raw(raw, tmp_path)
+    pipeline.run_pipeline(tmp_path, workers=2)
+
+    assert_matches_serial(raw, tmp_path)
+    assert unchanged.stat().st_mtime_ns == modified
+    for name in ["pbp_reduced", "games", "time_slices", "regulation_pbp"]:
+        assert parts(tmp_path, name, 2008) == ["00001.parquet", "00002.parquet"]
+
+def test_pipeline_replays_changed_game(tmp_path):
+    write_raw(raw, tmp_path)
+    pipeline.run_pipeline(tmp_path, workers=2)
+
+    # correct the final score of an early game, changing Elo for every later game
+    pbp = raw[2007][0].copy()
+    game = pbp["Game_Id"].iloc[0]
+    last = pbp.index[pbp["Game_Id"] == game][-1]
+    pbp.loc[last, "Away_Score"] = pbp.loc[last, "Home_Score"] + 3
+    changed = raw | {2007: (pbp, raw[2007][1])}
+    write_raw(changed, tmp_path)
+    pipeline.run_pipeline(tmp_path, workers=2)
+
+    assert_matches_serial(changed, tmp_path)
+    assert parts(tmp_path, "time_slices", 2008) == ["00002.parquet"]
+
+def test_pipeline_without_changes(tmp_path):
+    write_raw(raw, tmp_path)
+    pipeline.run_pipeline(tmp_path, workers=2)
+
+    timings = pipeline.run_pipeline(tmp_path, workers=2)
+    assert "elo wall" not in timings
+    assert parts(tmp_path, "pbp_reduced", 2007) == ["00001.parquet"]
+
+def test_resumed_elo_matches_full_run():
+    season_games = pd.concat([tidy.tidy_pbp(clean.clean_season(pbp.copy(), shifts.copy(), fix_ids=True)[0])[1] for pbp, shifts in raw.values()])
+    season_games = season_games.reset_index(drop=True)
+    expected, checkpoints = elo.run_elo(season_games)
+
+    split = len(season_games) - 20
+    first, first_checkpoints = elo.run_elo(season_games.iloc[:split])
+    season = max(first_checkpoints)
+    rest, _ = elo.run_elo(season_games.iloc[split:], first_checkpoints[season]["ratings"], season)
+
+    pd.testing.assert_frame_equal(pd.concat([first, rest]), expected)
+    assert checkpoints[2007] == first_checkpoints[2007]
+
+def test_season_files_pairs_by_year(tmp_path):
+    for name in ["game_2008.parquet", "shift_2007.parquet", "game_2007.parquet", "shift_2008.parquet", "game_2009.parquet"]:
+        (tmp_path / name).touch()
+
+    files = pipeline.season_files(tmp_path)
+    assert list(files) == [2007, 2008]
+    assert files[2008] == (tmp_path / "game_2008.parquet", tmp_path / "shift_2008.parquet")
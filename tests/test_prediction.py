@@ -1,44 +1,49 @@
-import json
 import pytest
 
-import pandas as pd
-from keras.models import load_model
-
+import registry
 from dev import meter
 
-# Load data and models
-games = pd.read_parquet("data/games.parquet")
-slices = pd.read_parquet("data/time_slices.parquet")
-ot_pbp = pd.concat([
-    pd.read_parquet("data/regular_ot_pbp.parquet"),
-    pd.read_parquet("data/playoff_ot_pbp.parquet")
-])
-one_hot_columns = json.load(open("dev/models/one_hot_columns.json", 'r'))
-model_regulation = load_model("dev/models/meter_lstm16d2.keras")
-model_overtime = load_model("dev/models/meter_ot_lstm16d1.keras")
+# reuse data, indices and models loaded by the app
+games = registry.games()
+slices = registry.slices()
+ot_pbp = registry.ot_pbp()
+one_hot_columns = registry.one_hot_columns()
+model_regulation = registry.model_regulation()
+model_overtime = registry.model_overtime()
 
 def test_regulation():
+    # predict all games in one batch, then check each game has a prediction for every slice
+    pairs = list(zip(games["Game_Id"], games["Season"]))
+    predictions = meter.predict_regulation_many(pairs, slices, model_regulation)
+
     errors = []
-    for game in games.itertuples(index=False):
-        try:
-            meter.predict_regulation(game.Game_Id, game.Season, slices, model_regulation)
-        except Exception as e:
-            errors.append(f"Error for game {game.Game_Id}.{game.Season}: {e}")
+    for (game, season), (time_elapsed, probabilities) in zip(pairs, predictions):
+        if len(probabilities) == 0 or len(probabilities) != len(time_elapsed):
+            errors.append(f"Error for game {game}.{season}: {len(probabilities)} predictions for {len(time_elapsed)} slices")
 
     if errors:
         pytest.fail("\n".join(errors))
 
 def test_overtime():
-    errors = []
-    for game in games.itertuples(index=False):
-        if game.Period < 4:
-            # limit to overtime games
-            continue
+    # limit to overtime games
+    overtime = games[games["Period"] > 3]
+    pairs = list(zip(overtime["Game_Id"], overtime["Season"]))
 
+    errors = []
+    for game, season in pairs:
+        # preprocessing errors are reported per game
         try:
-            meter.predict_overtime(game.Game_Id, game.Season, ot_pbp, model_overtime, one_hot_columns)
+            meter.overtime_windows(ot_pbp.get(game, season), one_hot_columns)
         except Exception as e:
-            errors.append(f"Error for game {game.Game_Id}.{game.Season}: {e}")
+            errors.append(f"Error for game {game}.{season}: {e}")
+
+    if errors:
+        pytest.fail("\n".join(errors))
+
+    predictions = meter.predict_overtime_many(pairs, ot_pbp, model_overtime, one_hot_columns)
+    for (game, season), (time_elapsed, probabilities) in zip(pairs, predictions):
+        if len(probabilities) == 0:
+            errors.append(f"Error for game {game}.{season}: no predictions")
 
     if errors:
         pytest.fail("\n".join(errors))
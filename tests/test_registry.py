@@ -0,0 +1,53 @@
+import threading
+import time
+
+import registry
+
+
+def test_lazy_loads_once():
+    calls = []
+
+    @registry.lazy
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    assert not slow_loader.loaded()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(slow_loader())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert slow_loader.loaded()
+
+def test_teams_sorted():
+    teams = registry.teams()
+
+    assert list(teams) == sorted(teams)
+    assert teams[0] == "ANA"
+
+def test_readiness_routes():
+    import app
+
+    # wait for the background warm started by app.py
+    for thread in threading.enumerate():
+        if thread.name == "registry-warm":
+            thread.join()
+    client = app.server.test_client()
+
+    assert client.get("/healthz").status_code == 200
+    assert registry.ready()
+    assert client.get("/readyz").status_code == 200
+
+    registry.model_overtime.cache_clear()
+    assert not registry.ready()
+    assert client.get("/readyz").status_code == 503
+
+    registry.model_overtime()
+    assert client.get("/readyz").get_json() == {"status": "ready"}
@@ -0,0 +1,79 @@
+import threading
+
+import numpy as np
+import pytest
+
+import registry
+from dev import meter, scheduler
+
+class RecordingModel:
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, x, batch_size=None, verbose=0):
+        self.batches.append(len(x))
+        if not np.isfinite(x).all():
+            raise ValueError("not finite")
+        return x[:, :1] * 2
+
+def predict_concurrently(model, inputs):
+    results = [None] * len(inputs)
+    barrier = threading.Barrier(len(inputs))
+
+    def call(i):
+        barrier.wait()
+        results[i] = model.predict(inputs[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(inputs))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+def test_concurrent_requests_share_batches():
+    model = RecordingModel()
+    batched = scheduler.BatchScheduler(model, "test", max_wait=0.05)
+    inputs = [np.full((i + 1, 3), i, dtype=np.float32) for i in range(8)]
+
+    results = predict_concurrently(batched, inputs)
+
+    assert len(model.batches) < len(inputs)
+    assert sum(model.batches) == sum(len(x) for x in inputs)
+    for x, result in zip(inputs, results):
+        np.testing.assert_array_equal(result, x[:, :1] * 2)
+
+def test_batches_limited_by_rows():
+    model = RecordingModel()
+    batched = scheduler.BatchScheduler(model, "test", max_wait=0.05, max_rows=10)
+    inputs = [np.ones((4, 3), dtype=np.float32) for _ in range(6)] + [np.ones((12, 3), dtype=np.float32)]
+
+    results = predict_concurrently(batched, inputs)
+
+    # a request larger than the limit is predicted on its own
+    assert all(size <= 10 or size == 12 for size in model.batches)
+    assert [len(result) for result in results] == [len(x) for x in inputs]
+
+def test_model_errors_reach_callers():
+    batched = scheduler.BatchScheduler(RecordingModel(), "test", max_wait=0)
+
+    with pytest.raises(ValueError, match="not finite"):
+        batched.predict(np.full((2, 3), np.nan))
+    np.testing.assert_array_equal(batched.predict(np.ones((2, 3))), np.full((2, 1), 2))
+
+def test_batched_curve_matches_model(monkeypatch):
+    monkeypatch.setenv("NHL_METER_BATCH_WAIT_MS", "0")
+    assert scheduler.from_environment(registry.model_regulation(), "regulation") is registry.model_regulation()
+
+    games = registry.games()
+    game, season = games[games["Period"] > 3][["Game_Id", "Season"]].iloc[0]
+    batched = [scheduler.BatchScheduler(model, name) for model, name in
+               [(registry.model_regulation(), "regulation"), (registry.model_overtime(), "overtime")]]
+
+    expected = meter.predict_game(game, season, registry.games_index(), registry.slices(), registry.ot_pbp(),
+                                  registry.model_regulation(), registry.model_overtime(), registry.one_hot_columns())
+    result = meter.predict_game(game, season, registry.games_index(), registry.slices(), registry.ot_pbp(),
+                                *batched, registry.one_hot_columns())
+
+    np.testing.assert_array_equal(result[0], expected[0])
+    np.testing.assert_allclose(result[1], expected[1], rtol=1e-5, atol=1e-6)
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+import registry
+from dev import meter
+from dev.data import schema
+
+games = registry.games()
+sample = pd.concat([games[games["Period"] == 3].head(5), games[games["Period"] > 3].head(5)])
+pairs = list(zip(sample["Game_Id"], sample["Season"]))
+
+def test_registry_frames_are_compact():
+    slices, ot_pbp = registry.slices().frame, registry.ot_pbp().frame
+    assert slices["home_elo"].dtype == np.float32
+    assert slices["home_score"].dtype == np.int8
+    assert isinstance(ot_pbp["event"].dtype, pd.CategoricalDtype)
+    assert schema.memory_usage(slices) < schema.memory_usage(schema.default_types(slices)) / 2
+
+def test_predictions_match_default_types():
+    slices, ot_pbp = registry.slices(), registry.ot_pbp()
+    default_slices = schema.default_types(slices.get(*pairs[0]))
+    default_ot = schema.default_types(ot_pbp.frame)
+
+    expected_time, expected = meter.predict_regulation(*pairs[0], default_slices, registry.model_regulation())
+    time_elapsed, probabilities = meter.predict_regulation(*pairs[0], slices, registry.model_regulation())
+    np.testing.assert_array_equal(time_elapsed, expected_time)
+    np.testing.assert_allclose(probabilities, expected, rtol=1e-5)
+
+    for game, season in pairs[5:]:
+        selected_game = default_ot[(default_ot["game"] == game) & (default_ot["season"] == season)]
+        expected = meter.overtime_windows(selected_game, registry.one_hot_columns())
+        windows = meter.overtime_windows(ot_pbp.get(game, season), registry.one_hot_columns())
+        np.testing.assert_allclose(windows.astype(float), expected.astype(float), rtol=1e-6)
+
+def test_concat_unifies_categories():
+    first = schema.compact(pd.DataFrame({"game": [1], "season": [2007], "event": ["FAC"]}), "regular_ot_pbp")
+    second = schema.compact(pd.DataFrame({"game": [2], "season": [2007], "event": ["GOAL"]}), "regular_ot_pbp")
+    combined = schema.concat([first, second], "regular_ot_pbp")
+
+    assert combined["event"].tolist() == ["FAC", "GOAL"]
+    assert list(combined["event"].cat.categories) == ["FAC", "GOAL"]
+    assert combined["season"].dtype == np.int16
@@ -0,0 +1,103 @@
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from dev.data import scrape
+from tests.synthetic import make_raw_season
+
+games = pd.read_parquet("data/game_elo.parquet")
+pbp, shifts = make_raw_season(games[games["Season"] == 2009].head(12), seed=2009)
+
+class SyntheticFetcher:
+    # stands in for the NHL API when recording
+    def schedule(self, season):
+        return [{"game_id": int(game), "date": "2009-10-01"} for game in pbp["Game_Id"].unique()]
+
+    def game(self, game):
+        game_id = str(game["game_id"])
+        return pbp[pbp["Game_Id"] == game_id].reset_index(drop=True), shifts[shifts["Game_Id"] == game_id].reset_index(drop=True)
+
+class CountingFetcher:
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+        self.games = []
+
+    def schedule(self, season):
+        return self.fetcher.schedule(season)
+
+    def game(self, game):
+        self.games.append(game["game_id"])
+        return self.fetcher.game(game)
+
+def record(path):
+    fetcher = scrape.RecordingFetcher(SyntheticFetcher(), path)
+    for game in fetcher.schedule(2009):
+        fetcher.game(game)
+
+def test_scrape_from_replay(tmp_path):
+    record(tmp_path / "recorded")
+    server = scrape.serve(tmp_path / "recorded")
+    try:
+        fetcher = scrape.ReplayFetcher(f"http://localhost:{server.server_address[1]}")
+        progress = scrape.scrape(fetcher, [2009], tmp_path / "data", workers=4, rate=1000, burst=10)
+    finally:
+        server.shutdown()
+
+    assert progress[2009]["failed"] == {}
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "data" / "pbp" / "game_2009.parquet"), pbp)
+    # the generated shifts are ordered by player, scraped shifts by game
+    expected = shifts.sort_values("Game_Id", kind="stable", ignore_index=True)
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "data" / "pbp" / "shift_2009.parquet"), expected)
+
+def test_scrape_resumes_failed_games(tmp_path):
+    record(tmp_path / "recorded")
+    missing = sorted((tmp_path / "recorded" / "games").iterdir())[:3]
+    for game in missing:
+        shutil.move(game, tmp_path / game.name)
+
+    server = scrape.serve(tmp_path / "recorded")
+    try:
+        fetcher = CountingFetcher(scrape.ReplayFetcher(f"http://localhost:{server.server_address[1]}"))
+        progress = scrape.scrape(fetcher, [2009], tmp_path / "data", rate=1000, retries=1, backoff=0)
+        assert sorted(progress[2009]["failed"]) == [game.name for game in missing]
+        assert "HTTP Error 404" in progress[2009]["failed"][missing[0].name]
+
+        # the missing games are served again
+        for game in missing:
+            shutil.move(tmp_path / game.name, tmp_path / "recorded" / "games" / game.name)
+        fetcher.games.clear()
+        progress = scrape.scrape(fetcher, [2009], tmp_path / "data", rate=1000, retries=1, backoff=0)
+    finally:
+        server.shutdown()
+
+    assert sorted(fetcher.games) == [int(game.name) for game in missing]
+    assert progress[2009]["failed"] == {}
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "data" / "pbp" / "game_2009.parquet"), pbp)
+
+def test_scrape_season_skips_saved_games(tmp_path):
+    fetcher = CountingFetcher(SyntheticFetcher())
+    bucket = scrape.TokenBucket(1000)
+    with ThreadPoolExecutor(2) as executor:
+        scrape.scrape_season(fetcher, 2009, tmp_path, executor, bucket)
+        count = len(fetcher.games)
+        scrape.scrape_season(fetcher, 2009, tmp_path, executor, bucket)
+
+    assert count == pbp["Game_Id"].nunique()
+    assert len(fetcher.games) == count
+
+def test_token_bucket_rate():
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    bucket = scrape.TokenBucket(rate=2, capacity=3, clock=lambda: now[0], sleep=sleep)
+    for _ in range(7):
+        bucket.acquire()
+
+    # the burst is free, then one call every half second
+    assert waits == [0.5] * 4
+    assert now[0] == 2.0
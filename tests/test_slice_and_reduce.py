@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from dev.benchmark import reference
+from dev.data import slice_and_reduce
+from tests.synthetic import make_pbp
+
+games = pd.read_parquet("data/game_elo.parquet")
+
+# regular season, overtime, shootout and playoff overtime games across a few seasons
+sample = pd.concat([
+    games[games["Season"] == 2007].head(60),
+    games[(games["Season"] == 2015) & (games["Period"] > 3)].head(30),
+    games[(games["Season"] == 2022) & games["Playoff"]].head(30)
+], ignore_index=True)
+pbp = make_pbp(sample)
+
+def test_slice_regulation_matches_reference():
+    expected = reference.slice_regulation(sample, pbp)
+    slices = slice_and_reduce.slice_regulation(sample, pbp)
+
+    pd.testing.assert_frame_equal(slices, expected)
+
+def test_slice_regulation_out_of_order_times():
+    shuffled = pbp.copy()
+    # swap a few plays and drop a time so some games can't use the sorted search
+    shuffled.loc[[10, 11], "Seconds_Elapsed"] = shuffled.loc[[11, 10], "Seconds_Elapsed"].values + [90, 0]
+    shuffled.loc[500, "Seconds_Elapsed"] = np.nan
+
+    expected = reference.slice_regulation(sample, shuffled)
+    slices = slice_and_reduce.slice_regulation(sample, shuffled)
+
+    pd.testing.assert_frame_equal(slices, expected)
+
+def test_slice_regulation_slice_length():
+    expected = reference.slice_regulation(sample.head(10), pbp, slice_length=7)
+    slices = slice_and_reduce.slice_regulation(sample.head(10), pbp, slice_length=7)
+
+    pd.testing.assert_frame_equal(slices, expected)
+
+def test_slice_regulation_game_without_plays():
+    expected = reference.slice_regulation(sample.head(3), pbp[pbp["Game_Id"] != sample["Game_Id"].iloc[1]])
+    slices = slice_and_reduce.slice_regulation(sample.head(3), pbp[pbp["Game_Id"] != sample["Game_Id"].iloc[1]])
+
+    pd.testing.assert_frame_equal(slices, expected)
+
+def test_reduce_matches_reference():
+    pd.testing.assert_frame_equal(slice_and_reduce.reduce_regulation(sample, pbp), reference.reduce_regulation(sample, pbp))
+    pd.testing.assert_frame_equal(slice_and_reduce.reduce_regular_overtime(sample, pbp), reference.reduce_regular_overtime(sample, pbp))
+    pd.testing.assert_frame_equal(slice_and_reduce.reduce_playoff_overtime(sample, pbp), reference.reduce_playoff_overtime(sample, pbp))
+
+def test_reduce_all_matches_split_games():
+    regulation, regular_ot, playoff_ot = slice_and_reduce.reduce_all(sample, pbp)
+
+    overtime = sample["Period"] >= 4
+    pd.testing.assert_frame_equal(regulation, reference.reduce_regulation(sample[~overtime], pbp))
+    pd.testing.assert_frame_equal(regular_ot, reference.reduce_regular_overtime(sample[overtime & ~sample["Playoff"]], pbp))
+    pd.testing.assert_frame_equal(playoff_ot, reference.reduce_playoff_overtime(sample[overtime & sample["Playoff"]], pbp))
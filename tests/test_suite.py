@@ -0,0 +1,36 @@
+from dev.benchmark import suite
+
+
+def results(**medians: float) -> dict:
+    return {"results": {name: {"median_s": median} for name, median in medians.items()}}
+
+def test_compare_flags_regressions():
+    baseline = results(fast=1.0, steady=1.0, removed=1.0)
+    current = results(fast=0.5, steady=1.05, slow=2.0)
+    current["results"]["slow_again"] = {"median_s": 1.2}
+    baseline["results"]["slow_again"] = {"median_s": 1.0}
+
+    rows = {row["name"]: row for row in suite.compare(baseline, current, threshold=0.1)}
+
+    # only benchmarks in both runs are compared
+    assert set(rows) == {"fast", "steady", "slow_again"}
+    assert rows["fast"]["ratio"] == 0.5
+    assert not rows["steady"]["regression"]
+    assert rows["slow_again"]["regression"]
+
+def test_measure_runs_setup_outside_timing():
+    calls = []
+    result = suite.measure(lambda: calls.append("run"), 3, setup=lambda: calls.append("setup"))
+
+    assert calls == ["setup", "run"] * 4  # one warm up call
+    assert result["repeats"] == 3
+    assert result["min_s"] <= result["median_s"]
+
+def test_select_skips_unmatched_groups():
+    assert suite.select("clean") == {"pipeline": ["clean.clean_season"]}
+    assert suite.select("update_figure.overtime") == {"callbacks": ["update_figure.overtime", "update_figure.overtime.cached"]}
+    assert set(suite.select()) == set(suite.groups)
+
+def test_group_names_match_benchmarks():
+    for group, load in suite.groups.items():
+        assert list(load()) == suite.group_names[group]
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from dev.benchmark import reference
+from dev.data import clean, tidy
+from tests.synthetic import make_raw_season
+
+games = pd.read_parquet("data/game_elo.parquet")
+
+def cleaned(season_games: pd.DataFrame, seed: int = 0) -> pd.DataFrame:
+    pbp, shifts = make_raw_season(season_games, seed)
+    pbp, _ = clean.clean_season(pbp, shifts, fix_ids=True)
+    pbp["Date"] = pd.to_datetime(pbp["Date"])
+    pbp["Game_Id"] = pbp["Game_Id"].astype("int64")
+    return pbp
+
+# the 2019 file runs into the 2020 bubble playoffs, which cross the next season's cutoff
+bubble = cleaned(pd.concat([
+    games[games["Season"] == 2019].head(30),
+    games[(games["Season"] == 2019) & games["Playoff"]].head(10),
+    games[(games["Season"] == 2020) & (games["Date"] < "2020-12-31")]
+]))
+# two season files in the wrong order, so the first plays jump over several cutoffs
+out_of_order = pd.concat([
+    cleaned(games[games["Season"] == 2010].head(15)),
+    cleaned(games[games["Season"] == 2007].head(15))
+], ignore_index=True)
+
+def test_season_column_matches_reference():
+    for pbp, season in [(bubble, 2019), (out_of_order, 2007)]:
+        expected = pbp.copy()
+        reference.add_season_column(expected, season)
+        result = pbp.copy()
+        tidy.add_season_column(result, season)
+
+        pd.testing.assert_series_equal(result["Season"], expected["Season"])
+
+    assert set(expected["Season"]) == {2008, 2009, 2010}
+
+def test_extract_games_matches_reference():
+    pbp = bubble.copy()
+    tidy.add_season_column(pbp, 2019)
+
+    pd.testing.assert_frame_equal(tidy.extract_games(pbp), reference.extract_games(pbp))
+    assert (tidy.extract_games(pbp)["Season"] == 2020).any()
+
+def test_extract_players_matches_reference():
+    pd.testing.assert_frame_equal(tidy.extract_players(bubble), reference.extract_players(bubble))
+
+def test_tidy_leaves_input_unchanged():
+    pbp, shifts = make_raw_season(games[games["Season"] == 2007].head(5))
+    pbp, _ = clean.clean_season(pbp, shifts, fix_ids=True)
+    before = pbp.copy()
+
+    tidy.tidy_pbp(pbp)
+    pd.testing.assert_frame_equal(pbp, before)